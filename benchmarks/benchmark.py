@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Time gdalmethods functions on synthetic rasters and vectors and write the
+results to JSON. Nothing is downloaded, so runs can be compared across
+commits on the same machine.
+
+Each benchmark runs in a fresh process so that its peak resident set size
+is its own, including any pool workers it starts.
+
+Example:
+    python benchmarks/benchmark.py --size 4096 --dtype int16 --ncpu 4
+    python benchmarks/benchmark.py --compare old.json new.json
+"""
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import queue as queue_module
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from osgeo import gdal, ogr, osr
+
+import gdalmethods as gm
+
+
+# Constants
+BENCHMARKS = ["read_raster", "to_raster", "translate", "warp", "tile_raster",
+              "map_files", "rasterize", "reproject_vector",
+              "reproject_polygons", "ogr2ogr_polygons"]
+EXTENT = (-110, -90, 30, 45)
+
+
+# Synthetic data
+def make_raster(path, size, dtype):
+    """Write a square GeoTiff of random values in geographic coordinates.
+
+    Parameters
+    ----------
+    path : str
+        Path to the target raster file.
+    size : int
+        Number of grid cells along each side.
+    dtype : str
+        A key of gdalmethods.GDAL_TYPEMAP, e.g. "int16" or "float32".
+
+    Returns
+    -------
+    None.
+    """
+
+    xmin, xmax, ymin, ymax = EXTENT
+    geometry = (xmin, (xmax - xmin) / size, 0, ymax, 0, -(ymax - ymin) / size)
+    crs = osr.SpatialReference()
+    crs.ImportFromEPSG(4326)
+
+    # Write one band of small integers in strips to keep memory low
+    rng = np.random.default_rng(0)
+    with gm.Raster_Writer(path, size, size, crs=crs.ExportToWkt(),
+                          geometry=geometry, dtype=dtype, tiled=True,
+                          bigtiff="IF_SAFER") as image:
+        for yoff in range(0, size, 256):
+            ysize = min(256, size - yoff)
+            array = rng.integers(0, 100, (ysize, size))
+            image.write(array, 0, yoff)
+
+
+def make_points(path, n):
+    """Write a GeoPackage of random points with a value field.
+
+    Parameters
+    ----------
+    path : str
+        Path to the target GeoPackage.
+    n : int
+        Number of points.
+
+    Returns
+    -------
+    None.
+    """
+
+    xmin, xmax, ymin, ymax = EXTENT
+    rng = np.random.default_rng(0)
+    xs = rng.uniform(xmin, xmax, n)
+    ys = rng.uniform(ymin, ymax, n)
+    wkts = ["POINT ({} {})".format(x, y) for x, y in zip(xs, ys)]
+    write_layer(path, "points", ogr.wkbPoint, wkts)
+
+
+def make_polygons(path, n):
+    """Write a GeoPackage of a grid of square polygons with a value field.
+
+    Parameters
+    ----------
+    path : str
+        Path to the target GeoPackage.
+    n : int
+        Approximate number of polygons.
+
+    Returns
+    -------
+    None.
+    """
+
+    xmin, xmax, ymin, ymax = EXTENT
+    side = max(int(np.sqrt(n)), 1)
+    width = (xmax - xmin) / side
+    height = (ymax - ymin) / side
+    wkt = "POLYGON (({0} {1}, {2} {1}, {2} {3}, {0} {3}, {0} {1}))"
+    wkts = []
+    for row in range(side):
+        for col in range(side):
+            x = xmin + col * width
+            y = ymin + row * height
+            wkts.append(wkt.format(x, y, x + width * 0.9, y + height * 0.9))
+    write_layer(path, "polygons", ogr.wkbPolygon, wkts)
+
+
+def write_layer(path, name, geom_type, wkts):
+    """Write geometries, with a value field, to a GeoPackage layer."""
+
+    srs = osr.SpatialReference()
+    srs.ImportFromEPSG(4326)
+    ds = ogr.GetDriverByName("GPKG").CreateDataSource(path)
+    layer = ds.CreateLayer(name, srs, geom_type)
+    layer.CreateField(ogr.FieldDefn("value", ogr.OFTInteger))
+    defn = layer.GetLayerDefn()
+    layer.StartTransaction()
+    for i, wkt in enumerate(wkts):
+        feature = ogr.Feature(defn)
+        feature.SetField("value", i % 100)
+        feature.SetGeometry(ogr.CreateGeometryFromWkt(wkt))
+        layer.CreateFeature(feature)
+    layer.CommitTransaction()
+    ds = None
+
+
+def make_data(folder, size, dtype, nfeatures):
+    """Write every synthetic input to a folder and return their paths."""
+
+    paths = {"raster": os.path.join(folder, "raster.tif"),
+             "points": os.path.join(folder, "points.gpkg"),
+             "polygons": os.path.join(folder, "polygons.gpkg")}
+    make_raster(paths["raster"], size, dtype)
+    make_points(paths["points"], nfeatures)
+    make_polygons(paths["polygons"], nfeatures)
+
+    return paths
+
+
+# Benchmarks
+def run_benchmark(name, paths, folder, ncpu):
+    """Run one benchmark and return the amount of work done.
+
+    Parameters
+    ----------
+    name : str
+        A benchmark name from BENCHMARKS.
+    paths : dict
+        Synthetic input paths from make_data.
+    folder : str
+        Path to a folder for outputs.
+    ncpu : int
+        Number of cpus for functions that take them.
+
+    Returns
+    -------
+    tuple:
+        seconds : float
+            Wall time of the timed part of the benchmark.
+        units : int
+            Number of grid cells or features processed.
+        nbytes : int
+            Number of raster bytes processed, or 0 for vectors.
+    """
+
+    src = paths["raster"]
+    info = gm.DATASET_CACHE.info(src)
+    cells = info["nx"] * info["ny"]
+    nbytes = cells * gdal.GetDataTypeSize(info["dtype"]) // 8
+    dst = os.path.join(folder, name + ".tif")
+    temps = []
+
+    # Untimed setup comes before the start time
+    if name == "read_raster":
+        start = time.time()
+        gm.read_raster(src)
+
+    elif name == "to_raster":
+        array, geometry, crs = gm.read_raster(src)
+        start = time.time()
+        gm.to_raster(array, dst, crs, geometry, dtype=info["dtype"])
+
+    elif name == "translate":
+        start = time.time()
+        gm.translate(src, dst, overwrite=True)
+
+    elif name == "warp":
+        start = time.time()
+        gm.warp(src, dst, dtype=info["dtype"], overwrite=True, ncpu=ncpu,
+                dstSRS="epsg:3857")
+
+    # Tiles and mapped files that exist are skipped, so each run writes to
+    # new folders that are removed afterwards
+    elif name == "tile_raster":
+        temps.append(tempfile.mkdtemp(prefix="tiles_", dir=folder))
+        start = time.time()
+        gm.tile_raster(src, temps[0], ncpu * 4, ncpu)
+
+    elif name == "map_files":
+        temps.append(tempfile.mkdtemp(prefix="map_tiles_", dir=folder))
+        temps.append(tempfile.mkdtemp(prefix="mapped_", dir=folder))
+        tiles = gm.tile_raster(src, temps[0], ncpu * 4, ncpu)
+        mapper = gm.Map_Values({i: i * 2 for i in range(0, 100, 2)})
+        start = time.time()
+        mapper.map_files(tiles, temps[1], ncpu)
+
+    elif name == "rasterize":
+        start = time.time()
+        gm.rasterize(paths["polygons"], dst, "value", template_path=src,
+                     overwrite=True, tile_size=1024, ncpu=ncpu)
+
+    elif name == "reproject_vector":
+        start = time.time()
+        cells = gm.reproject_vector(paths["points"],
+                                    os.path.join(folder, name + ".gpkg"),
+                                    3857, ncpu=ncpu)
+        nbytes = 0
+
+    elif name == "reproject_polygons":
+        start = time.time()
+        cells = gm.reproject_vector(paths["polygons"],
+                                    os.path.join(folder, name + ".gpkg"),
+                                    3857)
+        nbytes = 0
+
+    # The same polygons through ogr2ogr, as a baseline for reproject_polygons
+    elif name == "ogr2ogr_polygons":
+        ds = ogr.Open(paths["polygons"])
+        cells = ds.GetLayer().GetFeatureCount()
+        del ds
+        target = os.path.join(folder, name + ".gpkg")
+        if os.path.exists(target):
+            os.remove(target)
+        start = time.time()
+        ds = gdal.VectorTranslate(target, paths["polygons"],
+                                  dstSRS="EPSG:3857", reproject=True)
+        del ds
+        nbytes = 0
+
+    else:
+        raise KeyError(name + " is not one of " + ", ".join(BENCHMARKS))
+
+    seconds = time.time() - start
+    for temp in temps:
+        shutil.rmtree(temp)
+
+    return seconds, cells, nbytes
+
+
+def _benchmark_process(name, paths, folder, ncpu, queue):
+    """Run one benchmark in a child process and send back its record."""
+
+    gm.Progress.silent = True
+    try:
+        seconds, units, nbytes = run_benchmark(name, paths, folder, ncpu)
+    except Exception as error:
+        queue.put({"name": name, "error": str(error)})
+        return
+
+    # Peak memory of this process and any pool workers it waited on, in kB
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    queue.put({"name": name,
+               "seconds": round(seconds, 4),
+               "units_per_second": round(units / seconds, 1),
+               "mb_per_second": round(nbytes / seconds / 1e6, 2),
+               "peak_rss_mb": round(max(own, children) / 1024, 1)})
+
+
+def benchmark(names=None, size=2048, dtype="int16", nfeatures=10000, ncpu=2,
+              folder=None):
+    """Run benchmarks on synthetic data and return the results.
+
+    Parameters
+    ----------
+    names : list
+        Benchmark names to run. (defaults to all of BENCHMARKS)
+    size : int
+        Number of grid cells along each side of the synthetic raster.
+        (defaults to 2,048)
+    dtype : str
+        Data type of the synthetic raster. (defaults to "int16")
+    nfeatures : int
+        Number of synthetic points and polygons. (defaults to 10,000)
+    ncpu : int
+        Number of cpus for functions that take them. (defaults to 2)
+    folder : str
+        Folder for synthetic data and outputs. (defaults to a temporary
+        folder that is removed afterwards)
+
+    Returns
+    -------
+    dict
+        Run metadata and a list of benchmark records.
+    """
+
+    names = names or BENCHMARKS
+    temp = None
+    if folder is None:
+        temp = tempfile.TemporaryDirectory()
+        folder = temp.name
+    os.makedirs(folder, exist_ok=True)
+
+    paths = make_data(folder, size, dtype, nfeatures)
+
+    # Each benchmark gets a fresh process for its own peak memory
+    records = []
+    for name in names:
+        queue = multiprocessing.Queue()
+        process = multiprocessing.Process(
+            target=_benchmark_process,
+            args=(name, paths, folder, ncpu, queue)
+        )
+        process.start()
+        record = None
+        while record is None:
+            try:
+                record = queue.get(timeout=1)
+            except queue_module.Empty:
+                if not process.is_alive():
+                    record = {"name": name, "error": "process exited with "
+                              "code {}".format(process.exitcode)}
+        process.join()
+        print(record)
+        records.append(record)
+
+    if temp is not None:
+        temp.cleanup()
+
+    return {"commit": git_commit(),
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "gdal": gdal.__version__,
+            "python": sys.version.split()[0],
+            "size": size,
+            "dtype": dtype,
+            "nfeatures": nfeatures,
+            "ncpu": ncpu,
+            "results": records}
+
+
+def compare(old, new):
+    """Print the ratio of new to old wall times for each benchmark.
+
+    Parameters
+    ----------
+    old : str
+        Path to an earlier benchmark JSON file.
+    new : str
+        Path to a later benchmark JSON file.
+
+    Returns
+    -------
+    dict
+        New over old wall time, keyed by benchmark name. Values above 1 are
+        slower.
+    """
+
+    with open(old) as file:
+        old = {r["name"]: r for r in json.load(file)["results"]}
+    with open(new) as file:
+        new = {r["name"]: r for r in json.load(file)["results"]}
+
+    ratios = {}
+    for name in new:
+        if "seconds" in new[name] and "seconds" in old.get(name, {}):
+            ratios[name] = new[name]["seconds"] / old[name]["seconds"]
+            print("{:<18} {:>8.3f}s {:>8.3f}s {:>6.2f}x".format(
+                name, old[name]["seconds"], new[name]["seconds"],
+                ratios[name]
+            ))
+
+    return ratios
+
+
+def git_commit():
+    """Return the current git commit hash, or None outside of a repo."""
+
+    try:
+        here = os.path.dirname(os.path.abspath(__file__))
+        commit = subprocess.check_output(["git", "rev-parse", "HEAD"],
+                                         cwd=here, stderr=subprocess.DEVNULL)
+        return commit.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    """Run benchmarks from the command line."""
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--names", nargs="+", choices=BENCHMARKS,
+                        help="benchmarks to run (defaults to all)")
+    parser.add_argument("--size", type=int, default=2048,
+                        help="raster side length in grid cells")
+    parser.add_argument("--dtype", default="int16",
+                        choices=sorted(gm.GDAL_TYPEMAP),
+                        help="raster data type")
+    parser.add_argument("--nfeatures", type=int, default=10000,
+                        help="number of points and polygons")
+    parser.add_argument("--ncpu", type=int, default=2,
+                        help="number of cpus for parallel functions")
+    parser.add_argument("--folder", help="keep data and outputs here")
+    parser.add_argument("--out", default="benchmark.json",
+                        help="path to the JSON results file")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"),
+                        help="compare two results files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    results = benchmark(args.names, args.size, args.dtype, args.nfeatures,
+                        args.ncpu, args.folder)
+    with open(args.out, "w") as file:
+        json.dump(results, file, indent=4)
+    print("Results written to " + args.out)
+
+
+if __name__ == "__main__":
+    main()
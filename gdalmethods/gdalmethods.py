@@ -17,21 +17,32 @@ Things to do:
       raise an exception here, will that cause overly grave problems?
 """
 
+from fnmatch import fnmatch
 from glob import glob
+import dask.array as da
 import geopandas as gpd
+import hashlib
+import json
+import multiprocessing
 import numpy as np
 import os
-import rasterio
+import pandas as pd
 import shutil
-import subprocess as sp
 import sys
+import tempfile
+import threading
+import time
 import requests
+import uuid
 import zipfile
 
-from multiprocessing import Pool
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from multiprocessing import Array, Pool
 from osgeo import gdal, ogr, osr
-from shapely.geometry import Point
+from requests.adapters import HTTPAdapter
 from tqdm import tqdm
+from urllib3.util.retry import Retry
 
 gdal.UseExceptions()
 
@@ -62,6 +73,25 @@ GDAL_TYPEMAP = {"byte": gdal.GDT_Byte,
                 "uint32": gdal.GDT_UInt32,
                 "unknown": gdal.GDT_Unknown}
 
+# Largest key span Map_Values will build a dense lookup table for
+LUT_MAX_SIZE = 2 ** 22
+
+# Warp options each warp_many worker process builds once
+_WARP_OPTIONS = None
+
+# State names and postal codes keyed by FIPS code, for state_stats
+FIPS_PATH = os.path.join(os.path.dirname(__file__), "data",
+                         "us-state-ansi-fips.csv")
+
+# OGR drivers for common vector file extensions
+VECTOR_DRIVERS = {".fgb": "FlatGeobuf",
+                  ".geojson": "GeoJSON",
+                  ".gpkg": "GPKG",
+                  ".json": "GeoJSON",
+                  ".parquet": "Parquet",
+                  ".shp": "ESRI Shapefile",
+                  ".sqlite": "SQLite"}
+
 # FUNCTIONS
 def gdal_options(module="translate", **kwargs):
     """Capture any availabe option for gdal functions. Print available options
@@ -120,45 +150,540 @@ def gdal_options(module="translate", **kwargs):
 
 
 
-def dlzip(url, path):
-    """Download, unzip, and remove zip file from url."""
-    if not os.path.exists(path):
-        r = requests.get(url)
-        with open(path, 'wb') as file:
-            file.write(r.content)
+def block_windows(nx, ny, xblock, yblock):
+    """Generate the pixel windows needed to cover a raster block by block.
+
+    Parameters
+    ----------
+    nx : int
+        Number of x-axis grid cells in the raster.
+    ny : int
+        Number of y-axis grid cells in the raster.
+    xblock : int
+        Number of x-axis grid cells in each window.
+    yblock : int
+        Number of y-axis grid cells in each window.
+
+    Yields
+    ------
+    tuple
+        (x offset, y offset, x size, y size) for each window, in row order.
+        Windows along the right and bottom edges are trimmed to fit.
+    """
+
+    for yoff in range(0, ny, yblock):
+        ysize = min(yblock, ny - yoff)
+        for xoff in range(0, nx, xblock):
+            xsize = min(xblock, nx - xoff)
+            yield xoff, yoff, xsize, ysize
+
+
+def creation_options(compress=None, **kwargs):
+    """Format GDAL raster creation options.
+
+    Parameters
+    ----------
+    compress : str
+        A compression technique. Available options are "DEFLATE", "JPEG",
+        "LZW"
+    **kwargs
+        Any creation options for the GeoTiff driver, e.g. tiled=True,
+        blockxsize=512, blockysize=512, predictor=2, num_threads="ALL_CPUS",
+        bigtiff="IF_SAFER". Booleans become "YES" or "NO".
+
+    Returns
+    -------
+    list
+        A list of "KEY=VALUE" strings.
+
+    Examples:
+        creation_options("DEFLATE", tiled=True, predictor=2,
+                         num_threads="ALL_CPUS")
+    """
+
+    # Keys are case insensitive, so upper case keeps them unique
+    options = {}
+    if compress:
+        options["COMPRESS"] = compress.upper()
+    for key, value in kwargs.items():
+        if isinstance(value, bool):
+            value = "YES" if value else "NO"
+        options[key.upper()] = str(value)
+
+    return ["=".join([k, v]) for k, v in options.items()]
+
+
+def _option_dict(options):
+    """Key a list of "KEY=VALUE" creation options, or a dictionary of them,
+    by upper case name so they can be passed over creation_options' and
+    cog_options' defaults."""
+
+    if not options:
+        return {}
+    if isinstance(options, dict):
+        items = options.items()
+    else:
+        items = [option.split("=", 1) for option in options]
+
+    return {key.upper(): value for key, value in items}
+
+
+def cog_options(compress=None, resampling="average", ncpu=None, blocksize=512,
+                **kwargs):
+    """Format creation options for GDAL's cloud-optimized GeoTiff (COG)
+    driver.
+
+    The COG driver tiles the image and builds its overviews in the same
+    pass, so zoomed out and windowed reads only touch the bytes they need.
+
+    Parameters
+    ----------
+    compress : str
+        A compression technique, e.g. "DEFLATE", "LZW", "ZSTD".
+        (defaults to "DEFLATE")
+    resampling : str
+        Resampling method for the overviews, e.g. "nearest", "average",
+        "mode", "bilinear". Use "nearest" or "mode" for categories.
+        (defaults to "average")
+    ncpu : int
+        Number of threads to compress tiles and build overviews with.
+        (defaults to all available cpus)
+    blocksize : int
+        Tile width and height in grid cells. (defaults to 512)
+    **kwargs
+        Any other COG creation options, e.g. predictor=2, bigtiff="YES".
+
+    Returns
+    -------
+    list
+        A list of "KEY=VALUE" strings.
+    """
+
+    options = {"blocksize": blocksize,
+               "resampling": resampling.upper(),
+               "num_threads": ncpu or "ALL_CPUS",
+               "bigtiff": "IF_SAFER"}
+    options.update(kwargs)
+
+    return creation_options(compress or "DEFLATE", **options)
+
+
+def window_size(band, window=None):
+    """Choose the window size to read or write a raster band with.
+
+    Parameters
+    ----------
+    band : osgeo.gdal.Band
+        An open raster band.
+    window : tuple
+        An (x size, y size) to use instead of the band's block size.
+
+    Returns
+    -------
+    tuple
+        (x size, y size) in grid cells. Defaults to the band's block size,
+        with single row strips grouped into windows of about a million
+        cells so each read is a useful size.
+    """
+
+    if window:
+        return tuple(window)
+
+    # Single row strips are grouped so each read is a useful size
+    xblock, yblock = band.GetBlockSize()
+    if xblock == band.XSize:
+        yblock *= max(1, 2 ** 20 // (xblock * yblock))
+
+    return xblock, yblock
+
+
+def nodata_mask(array, navalue):
+    """Flag the non-value cells of an array, including NaNs for floats."""
+
+    mask = array == navalue
+    if array.dtype.kind in "fc":
+        mask |= np.isnan(array)
+
+    return mask
+
+
+def csv_to_geo(src, dst, loncol="lon", latcol="lat", epsg=4326,
+               chunksize=1000000, overwrite=False, **kwargs):
+    """Convert a large CSV of point coordinates to a GeoPackage or GeoParquet
+    file one chunk at a time, without holding the whole table in memory.
+
+    Parameters
+    ----------
+    src : str
+        Path to a CSV file with longitude and latitude columns.
+    dst : str
+        Path to the target file. A ".gpkg" extension writes one GeoPackage
+        layer. A ".parquet" extension writes a folder of GeoParquet files,
+        one per chunk, which geopandas.read_parquet reads as one table.
+    loncol : str
+        The name of the longitude column.
+    latcol : str
+        The name of the latitude column.
+    epsg : int
+        EPSG code associated with the Coordinate Reference System.
+    chunksize : int
+        Number of rows to read and write at a time. (defaults to 1,000,000)
+    overwrite : boolean
+    **kwargs
+        Any other key word arguments for pandas.read_csv.
+
+    Returns
+    -------
+    int
+        The number of rows written, 0 if dst exists and isn't overwritten.
+    """
+
+    # Overwrite existing file
+    if os.path.exists(dst):
+        if overwrite:
+            if os.path.isfile(dst):
+                os.remove(dst)
+            else:
+                shutil.rmtree(dst)
+        else:
+            print(dst + " exists, use overwrite=True to replace this file.")
+            return 0
+
+    # Only these two formats can be written a chunk at a time here
+    ext = os.path.splitext(dst)[1].lower()
+    if ext not in [".gpkg", ".parquet"]:
+        raise ValueError("Use a '.gpkg' or '.parquet' extension for dst.")
+    if ext == ".parquet":
+        os.makedirs(dst, exist_ok=True)
+    layer = os.path.splitext(os.path.basename(dst))[0]
+
+    # Convert and write each chunk
+    count = 0
+    chunks = pd.read_csv(src, chunksize=chunksize, **kwargs)
+    for i, chunk in enumerate(chunks):
+        gdf = to_geo(chunk, loncol, latcol, epsg)
+        if ext == ".parquet":
+            part = os.path.join(dst, "part_{:05d}.parquet".format(i))
+            gdf.to_parquet(part, index=False)
+        else:
+            mode = "a" if i else "w"
+            gdf.to_file(dst, driver="GPKG", layer=layer, mode=mode,
+                        index=False)
+        count += len(gdf)
+
+    return count
+
+
+def download(url, path, session=None, chunk_size=2 ** 20, retries=3,
+             timeout=60):
+    """Stream a file from a url to disk, resuming partial downloads.
+
+    The file is written in chunks to "<path>.part", which is renamed to path
+    once it is as long as the server says the file is. If a ".part" file is
+    already there, only the rest of the file is requested with an HTTP Range
+    header. Servers that don't support ranges send the whole file again, and
+    a ".part" file that doesn't fit the remote file is started over.
+
+    Parameters
+    ----------
+    url : str
+        The url of the file.
+    path : str
+        Path to the target file.
+    session : requests.Session
+        A session to reuse connections from. (defaults to http_session())
+    chunk_size : int
+        Number of bytes to write at a time. (defaults to 1 MB)
+    retries : int
+        Number of times to resume after a dropped connection or a short
+        file. (defaults to 3)
+    timeout : int | float
+        Seconds to wait for the server to respond. (defaults to 60)
+
+    Returns
+    -------
+    str
+        Path to the target file.
+    """
+
+    session = session or http_session()
+    part = path + ".part"
+
+    for attempt in range(retries + 1):
+        # Ask for whatever is left
+        done = os.path.getsize(part) if os.path.exists(part) else 0
+        headers = {"Range": "bytes={}-".format(done)} if done else {}
+        try:
+            with session.get(url, headers=headers, stream=True,
+                             timeout=timeout) as r:
+                first, total = _content_range(r)
+
+                # Nothing is left only if the part file is the whole file,
+                # otherwise it's left from another file and we start over
+                if r.status_code == 416:
+                    if total is not None and done == total:
+                        break
+                    os.remove(part)
+                    continue
+                r.raise_for_status()
+
+                # Append to a partial response that starts where we stopped,
+                # start over on a full one
+                if r.status_code == 206 and first != done:
+                    os.remove(part)
+                    continue
+                mode = "ab" if r.status_code == 206 else "wb"
+                with open(part, mode) as file:
+                    for chunk in r.iter_content(chunk_size):
+                        file.write(chunk)
+        except (requests.ConnectionError, requests.Timeout,
+                requests.exceptions.ChunkedEncodingError):
+            if attempt == retries:
+                raise
+            continue
+
+        # Stop once the file is as long as the server says, a longer one
+        # can't be resumed
+        size = os.path.getsize(part)
+        if total is None or size == total:
+            break
+        if size > total:
+            os.remove(part)
+    else:
+        raise IOError(url + " could not be downloaded completely.")
+
+    os.replace(part, path)
+
+    return path
+
+
+def _content_range(response):
+    """Return the position of a response's first byte in the remote file and
+    the remote file's size, for download. Either is None if the server
+    doesn't say."""
+
+    # Partial and unsatisfiable responses, "bytes <first>-<last>/<total>" or
+    # "bytes */<total>"
+    content_range = response.headers.get("Content-Range")
+    if content_range:
+        span, _, total = content_range.partition(" ")[2].partition("/")
+        first = span.split("-")[0]
+        first = int(first) if first.isdigit() else None
+        total = int(total) if total.isdigit() else None
+        return first, total
+
+    # Full responses, unless they are decompressed on the way in
+    length = response.headers.get("Content-Length")
+    encoding = response.headers.get("Content-Encoding", "identity")
+    if response.status_code == 200:
+        if length and length.isdigit() and encoding == "identity":
+            return 0, int(length)
+        return 0, None
+
+    return None, None
+
+
+def download_many(urls, paths, max_workers=4, unzip=False, **kwargs):
+    """Download several files at once over one pool of connections.
+
+    Parameters
+    ----------
+    urls : list-like
+        The url of each file.
+    paths : list-like
+        Path to each target file.
+    max_workers : int
+        The most files to download at the same time. (defaults to 4)
+    unzip : boolean
+        Extract each file with dlzip rather than keeping it as is.
+        (defaults to False)
+    **kwargs
+        Any other key word arguments for download, e.g. chunk_size, retries.
+
+    Returns
+    -------
+    pandas.core.frame.DataFrame
+        The url, path, status ("downloaded" or "failed"), seconds, and error
+        message of each file.
+    """
+
+    # One session big enough for every thread
+    session = http_session(max_workers)
+    function = dlzip if unzip else download
+
+    def fetch(url, path):
+        start = time.time()
+        record = {"url": url, "path": path, "status": "downloaded",
+                  "seconds": 0.0, "error": None}
+        try:
+            function(url, path, session=session, **kwargs)
+        except Exception as error:
+            record["status"] = "failed"
+            record["error"] = str(error)
+        record["seconds"] = round(time.time() - start, 3)
+        return record
+
+    # Downloads wait on the network, so threads are enough
+    with ThreadPoolExecutor(max_workers) as executor:
+        futures = [executor.submit(fetch, url, path)
+                   for url, path in zip(urls, paths)]
+        results = as_completed(futures)
+        if not Progress.silent:
+            results = tqdm(results, total=len(futures), position=0,
+                           file=sys.stdout, desc="Downloading")
+        for _ in results:
+            pass
+
+    records = [future.result() for future in futures]
+    status = pd.DataFrame(records, columns=["url", "path", "status",
+                                            "seconds", "error"])
+
+    return status
+
+
+def dlzip(url, path, session=None, extract=True, remote=False,
+          pattern=None, **kwargs):
+    """Download, unzip, and remove zip file from url.
+
+    The archive is streamed to disk with download, so it never has to fit in
+    memory and an interrupted download picks up where it left off. Archives
+    can also be kept, or left on the server, and their members read in place
+    through GDAL's /vsizip/ paths. See zip_members.
+
+    Parameters
+    ----------
+    url : str
+        The url of the zip file.
+    path : str
+        Path to save the zip file to. It's extracted to a folder of the same
+        name without the extension.
+    session : requests.Session
+        A session to reuse connections from. (defaults to http_session())
+    extract : boolean
+        Extract the archive and remove it. Otherwise, keep the archive and
+        return /vsizip/ paths to its members. (defaults to True)
+    remote : boolean
+        Don't download anything, return "/vsizip//vsicurl/" paths that read
+        members straight from the url. (defaults to False)
+    pattern : str
+        A shell-style pattern to select members by when not extracting, e.g.
+        "*.tif". (defaults to None)
+    **kwargs
+        Any other key word arguments for download, e.g. chunk_size, retries.
+
+    Returns
+    -------
+    str | list
+        Path to the folder of extracted files, or a list of /vsizip/ paths
+        to the archive's members.
+    """
+
+    # Read members over the network or from the kept archive
+    if remote:
+        return zip_members(url, pattern)
+    if not extract:
+        if not os.path.exists(path):
+            download(url, path, session, **kwargs)
+        return zip_members(path, pattern)
+
+    save_dir = os.path.splitext(path.replace(".zip", ""))[0]
+    if not os.path.exists(save_dir):
+        if not os.path.exists(path):
+            download(url, path, session, **kwargs)
         with zipfile.ZipFile(path, 'r') as zip_ref:
-            save_dir = os.path.splitext(path.replace(".zip", ""))[0]
             zip_ref.extractall(save_dir)
         os.remove(path)
 
+    return save_dir
+
+
+def http_session(pool_size=10, retries=3):
+    """Return a requests session that reuses pooled connections and retries
+    busy and failing servers with backoff.
+
+    Dropped connections and timeouts aren't retried here. download resumes
+    those itself from where the stream stopped, so there is only one retry
+    layer for them.
+
+    Parameters
+    ----------
+    pool_size : int
+        The most connections to keep open to each host. (defaults to 10)
+    retries : int
+        Number of times to retry 429, 500, 502, 503, and 504 responses.
+        (defaults to 3)
+
+    Returns
+    -------
+    requests.Session
+    """
+
+    retry = Retry(total=retries, connect=0, read=0, backoff_factor=0.5,
+                  status_forcelist=[429, 500, 502, 503, 504])
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                          max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    return session
+
+
+def mosaic(src_files, dst, overwrite=False, **kwargs):
+    """Point one virtual raster (VRT) at a list of raster files, so that they
+    can be read as a single dataset without copying any data.
 
-def gdal_progress(complete, message, unknown):
-    """A progress callback that recreates the gdal printouts."""
+    Recreates this GDAL command:
 
-    # We don't need the message or unknown objects
-    del message, unknown
+        gdalbuildvrt dst src_files
+
+    Parameters
+    ----------
+    src_files : list-like
+        A list of paths to raster files, e.g. tiles from tile_raster or
+        map_files. Where files overlap, values come from the later file.
+    dst : str
+        Path to the target VRT file.
+    overwrite : boolean
+        Replace dst if it exists. (defaults to False)
+    **kwargs
+        Any available key word arguments for gdalbuildvrt. Available options
+        and descriptions can be found using gdal_options("buildvrt").
+
+    Returns
+    -------
+    str
+        Path to the VRT file.
+    """
 
-    # Complete is a number between 0 and 1
-    percent = int(complete * 100)
+    # Expand user paths
+    src_files = [os.path.expanduser(file) for file in src_files]
+    dst = os.path.expanduser(dst)
 
-    # Between numeric printouts we need three dots
-    dots = [[str(i) + d for d in ["2", "5", "8"]] for i in range(10)]
-    dots = [int(l) for sl in dots for l in sl]
+    # Overwrite existing file
+    if os.path.exists(dst):
+        if overwrite:
+            DATASET_CACHE.invalidate(dst)
+            os.remove(dst)
+        else:
+            print(dst + " exists, use overwrite=True to replace this file.")
+            return dst
 
-    # If divisible by ten, print the number
-    if percent % 10 == 0 and percent != 0:
-        print("{}".format(percent), end="")
+    # Create an options object
+    kwargs["callback"] = gdal_progress
+    ops = gdal_options("buildvrt", **kwargs)
 
-    # If one of three numbers between multiples of 10, print a dot
-    elif percent in dots:
-        print(".", end="")
+    # Only the file references and grid are written
+    ds = gdal.BuildVRT(dst, list(src_files), options=ops)
+    del ds
 
-    return 1
+    return dst
 
 
 def rasterize(src, dst, attribute, t_srs=None, transform=None, height=None,
               width=None, template_path=None, navalue=-9999, all_touch=False,
-              dtype=gdal.GDT_Float32, overwrite=False):
+              dtype=gdal.GDT_Float32, overwrite=False, tile_size=None,
+              ncpu=1, cache=None):
     """
     Use GDAL RasterizeLayer to rasterize a shapefile stored on disk and write
     outputs to a file.
@@ -192,6 +717,17 @@ def rasterize(src, dst, attribute, t_srs=None, transform=None, height=None,
         gdal.GDT_Float32, "GDT_Float32", "float32"). Available GDAL data types
         and descriptions can be found in the GDAL_TYPES dictionary.
     overwrite : boolean
+    tile_size : int
+        Rasterize the target grid in square windows of this many grid cells,
+        each burning only the features that intersect it, in parallel
+        processes. The windows are written into one GeoTiff or, if dst ends
+        with ".vrt", into tiles in a "<dst name>_tiles" folder with a VRT
+        mosaic at dst. Defaults to 2048 when ncpu is more than 1.
+    ncpu : int
+        Number of cpus to use for tiled rasterization. (defaults to 1)
+    cache : Result_Cache
+        A cache to serve unchanged results from and store new ones in. VRT
+        mosaics are not cached. (defaults to None)
 
     Returns
     -------
@@ -206,6 +742,7 @@ def rasterize(src, dst, attribute, t_srs=None, transform=None, height=None,
     # Overwrite existing file
     if os.path.exists(dst):
         if overwrite:
+            DATASET_CACHE.invalidate(dst)
             if os.path.isfile(dst):
                 os.remove(dst)
             else:
@@ -218,29 +755,9 @@ def rasterize(src, dst, attribute, t_srs=None, transform=None, height=None,
     src_data = ogr.Open(src)
     layer = src_data.GetLayer()
 
-    # Create a spatial reference object
-    refs = osr.SpatialReference()
-
-    # If a template is provided
-    if template_path:
-        temp = gdal.Open(template_path)
-        transform = temp.GetGeoTransform()
-        width = temp.RasterXSize
-        height = temp.RasterYSize
-        t_srs = temp.GetProjection()
-        refs.ImportFromWkt(t_srs)
-    else:
-        try:
-            refs.ImportFromEPSG(t_srs)
-        except TypeError:
-            refs.ImportFromProj4(t_srs)
-
-    # Use transform to derive coordinates and dimensions
-    xmin, xres, xrot, ymax, yrot, yres = transform
-    xs = [xmin + xres * i for i in range(width)]
-    ys = [ymax + yres * i for i in range(height)]
-    nx = len(xs)
-    ny = len(ys)
+    # Get the target grid from the template or the arguments
+    transform, nx, ny, crs = _target_grid(t_srs, transform, height, width,
+                                          template_path)
 
     # Specifying data types shouldn't be so difficult
     if isinstance(dtype, str):
@@ -252,21 +769,44 @@ def rasterize(src, dst, attribute, t_srs=None, transform=None, height=None,
                   "Choose a value from this list:")
             print(str(list(GDAL_TYPEMAP.keys())))
 
+    # Set options
+    ops = ["ATTRIBUTE=" + attribute]
+    if all_touch is True:
+        ops.append("ALL_TOUCHED=TRUE")
+
+    # Skip unchanged work, the template is resolved into the grid
+    if dst.lower().endswith(".vrt"):
+        cache = None
+    if cache:
+        options = {"attribute": attribute, "transform": transform, "nx": nx,
+                   "ny": ny, "crs": crs, "navalue": navalue,
+                   "all_touch": all_touch, "dtype": dtype}
+        key = cache.key("rasterize", [src], options)
+        if cache.get(key, dst):
+            print("Using cached result for " + dst)
+            return
+
+    # Split the grid into windows and burn them in parallel
+    if ncpu > 1 and not tile_size:
+        tile_size = 2048
+    if tile_size:
+        del src_data
+        _rasterize_tiled(src, dst, transform, nx, ny, crs, ops, dtype,
+                         navalue, tile_size, ncpu)
+        if cache:
+            cache.put(key, dst)
+        return
+
     # Create the target raster layer
     driver = gdal.GetDriverByName("GTiff")
     trgt = driver.Create(dst, nx, ny, 1, dtype)
-    trgt.SetGeoTransform((xmin, xres, xrot, ymax, yrot, yres))
-    trgt.SetProjection(refs.ExportToWkt())
+    trgt.SetGeoTransform(transform)
+    trgt.SetProjection(crs)
 
     # Set no value
     band = trgt.GetRasterBand(1)
     band.SetNoDataValue(navalue)
-
-    # Set options
-    if all_touch is True:
-        ops = ["-at", "ATTRIBUTE=" + attribute]
-    else:
-        ops = ["ATTRIBUTE=" + attribute]
+    band.Fill(navalue)
 
     # Finally rasterize
     gdal.RasterizeLayer(trgt, [1], layer, options=ops, callback=gdal_progress)
@@ -275,868 +815,3682 @@ def rasterize(src, dst, attribute, t_srs=None, transform=None, height=None,
     del trgt
     del src_data
 
+    if cache:
+        cache.put(key, dst)
 
-def read_raster(rasterpath, band=1, navalue=-9999):
-    """Converts a raster file on disk into a numpy array along with
-    spatial features needed to write results to a raster file.
+
+def _burn_index(src, attributes, transform, nx, ny, crs, all_touch=False):
+    """Burn each feature's position in a vector layer into an in memory
+    raster and read the feature's attribute values, in one pass over the
+    features.
 
     Parameters
     ----------
-    rasterpath : str
-        Path to a raster file.
-    band : int
-        The band number desired.
-    navalue : int | float
-        The number used for non-values in the raster data set
+    src : str
+        File path for the source vector file.
+    attributes : list
+        Attribute names to read.
+    transform : tuple
+        Geotransform of the target grid.
+    nx : int
+        Number of x-axis grid cells.
+    ny : int
+        Number of y-axis grid cells.
+    crs : str
+        Target coordinate reference system in Well-Known Text format.
+    all_touch : boolean
+        Wether or not to associate features with all intersecting grid
+        cells. (defaults to False)
 
     Returns
     -------
-        tuple:
-             raster values : numpy.ndarray
-             affine transformation : tuple
-                 (top left x coordinate, x resolution, row rotation,
-                  top left y coordinate, column rotation, y resolution)),
-            coordinate reference system : str
-                 Well-Known Text format
+    tuple:
+        index : numpy.ndarray
+            Each grid cell's feature position, -1 where there are none.
+        values : list
+            A list of each attribute's values in feature order.
     """
 
-    # Open raster file and read in parts necessary for rewriting
-    raster = gdal.Open(rasterpath)
-    geometry = raster.GetGeoTransform()
-    arrayref = raster.GetProjection()
-    array = np.array(raster.GetRasterBand(band).ReadAsArray())
-    raster = None
-
-    # This helped for some old use-case, but might not be necessary
-    array = array.astype(float)
-    if np.nanmin(array) < navalue:
-        navalue = np.nanmin(array)
-    array[array == navalue] = np.nan
-
-    return(array, geometry, arrayref)
-
+    # Open shapefile, retrieve the layer and attribute field indices
+    src_data = ogr.Open(src)
+    layer = src_data.GetLayer()
+    src_defn = layer.GetLayerDefn()
+    fields = [src_defn.GetFieldIndex(a) for a in attributes]
+    missing = [a for a, f in zip(attributes, fields) if f < 0]
+    if missing:
+        raise KeyError("Attribute(s) not found in " + src + ": "
+                       + ", ".join(missing))
+
+    # An in memory layer to hold each feature's position
+    memory = ogr.GetDriverByName("Memory").CreateDataSource("")
+    index_layer = memory.CreateLayer("index", layer.GetSpatialRef(),
+                                     layer.GetGeomType())
+    index_layer.CreateField(ogr.FieldDefn("index", ogr.OFTInteger))
+    index_defn = index_layer.GetLayerDefn()
+
+    # Read each feature once, keeping its attribute values and geometry
+    values = [[] for a in attributes]
+    for i, src_feature in enumerate(layer):
+        for vals, field in zip(values, fields):
+            vals.append(src_feature.GetField(field))
+        feature = ogr.Feature(index_defn)
+        feature.SetField(0, i)
+        feature.SetGeometry(src_feature.GetGeometryRef())
+        index_layer.CreateFeature(feature)
+
+    # Burn every feature's position into an in memory raster once
+    trgt = gdal.GetDriverByName("MEM").Create("", nx, ny, 1, gdal.GDT_Int32)
+    trgt.SetGeoTransform(transform)
+    trgt.SetProjection(crs)
+    band = trgt.GetRasterBand(1)
+    band.Fill(-1)
+    ops = ["ATTRIBUTE=index"]
+    if all_touch is True:
+        ops.append("ALL_TOUCHED=TRUE")
+    gdal.RasterizeLayer(trgt, [1], index_layer, options=ops)
+    index = band.ReadAsArray()
 
-def reproject_polygon(src, dst, t_srs):
-    """Reproject a shapefile of polygons and write results to disk. Recreates
-    this GDAL command:
-        ogr2ogr -s_srs <source_projection> -t_srs <target_projection> dst src
+    # Close target and source data sets
+    del band, trgt
+    del memory, src_data
 
-    Parameters
-    ----------
-    src : str
-        Path to source shapefile.
-    dst : str
-        Path to target file.
-    tproj (int | str):
-        Target coordinate projection system as an epsg code or proj4 string.
-        Sometimes EPSG codes aren't available to GDAL installations, but
-        they're easier to use when they are so this will try both.
+    return index, values
 
-    Note
-    ----
-    This only handles ESRI Shapefiles at the moment, but can be written to
-    handle any available driver.
-    """
 
-    # Create target directory
-    save_path = os.path.dirname(dst)
-    os.makedirs(save_path, exist_ok=True)
+def _target_grid(t_srs, transform, height, width, template_path):
+    """Return the geotransform, x and y sizes, and Well-Known Text crs of a
+    rasterization target, from a template raster or from the arguments."""
 
-    # Create Shapefile driver
-    driver = ogr.GetDriverByName("ESRI Shapefile")
+    # Create a spatial reference object
+    refs = osr.SpatialReference()
 
-    # Source reference information
-    src_file = driver.Open(src)
-    src_layer = src_file.GetLayer()
-    src_srs = src_layer.GetSpatialRef()
-    src_defn = src_layer.GetLayerDefn()
+    # If a template is provided
+    if template_path:
+        temp = DATASET_CACHE.info(template_path)
+        transform = temp["geometry"]
+        width = temp["nx"]
+        height = temp["ny"]
+        t_srs = temp["crs"]
+        refs.ImportFromWkt(t_srs)
+    else:
+        try:
+            refs.ImportFromEPSG(t_srs)
+        except TypeError:
+            refs.ImportFromProj4(t_srs)
 
-    # Target reference information
-    trgt_srs = osr.SpatialReference()
-    try:
-        trgt_srs.ImportFromEPSG(t_srs)
-    except Exception:
-        trgt_srs.ImportFromProj4(t_srs)
+    return tuple(transform), width, height, refs.ExportToWkt()
 
-    # The transformation equation
-    transform = osr.CoordinateTransformation(src_srs, trgt_srs)
 
-    # Target file and layer
-    if os.path.exists(dst):
-        driver.DeleteDataSource(dst)
-    trgt_file = driver.CreateDataSource(dst)
-    trgt_layer = trgt_file.CreateLayer('', trgt_srs, ogr.wkbMultiPolygon)
+def _rasterize_tiled(src, dst, transform, nx, ny, crs, ops, dtype, navalue,
+                     tile_size, ncpu):
+    """Rasterize a vector file one window at a time in parallel processes,
+    into one GeoTiff or a VRT mosaic of tiles, for rasterize."""
 
-    # Add Fields
-    for i in range(0, src_defn.GetFieldCount()):
-        defn = src_defn.GetFieldDefn(i)
-        trgt_layer.CreateField(defn)
+    # Split the target grid into windows
+    windows = list(block_windows(nx, ny, tile_size, tile_size))
 
-    # Get the target layer definition
-    trgt_defn = trgt_layer.GetLayerDefn()
+    # A VRT mosaic needs a file for each window
+    vrt = dst.lower().endswith(".vrt")
+    if vrt:
+        tile_folder = os.path.splitext(dst)[0] + "_tiles"
+        os.makedirs(tile_folder, exist_ok=True)
+        name = os.path.splitext(os.path.basename(dst))[0]
+        tile_paths = [os.path.join(tile_folder,
+                                   "{}_{:02d}.tif".format(name, i))
+                      for i in range(len(windows))]
+    else:
+        tile_paths = [None] * len(windows)
 
-    # You have to reproject each feature
-    src_feature = src_layer.GetNextFeature()
-    while src_feature:
-        # Get geometry
-        geom = src_feature.GetGeometryRef()
+    # Wrap arguments into one object
+    args = [[src, window, transform, crs, ops, dtype, navalue, tile_path]
+            for window, tile_path in zip(windows, tile_paths)]
 
-        # Reproject geometry
-        geom.Transform(transform)
+    # Track progress in pixels burned
+    progress = Pool_Progress(len(args), nx * ny, desc="Rasterizing")
 
-        # Create target feature
-        trgt_feature = ogr.Feature(trgt_defn)
-        trgt_feature.SetGeometry(geom)
-        for i in range(0, trgt_defn.GetFieldCount()):
-            trgt_feature.SetField(trgt_defn.GetFieldDefn(i).GetNameRef(),
-                                  src_feature.GetField(i))
+    # Run each, writing windows into the target as they finish
+    with Pool(ncpu, *progress.initializer()) as pool:
+        results = progress.imap(pool, _rasterize_window, args)
+        if vrt:
+            for _ in results:
+                pass
+            mosaic(tile_paths, dst, overwrite=True)
+        else:
+            with Raster_Writer(dst, nx, ny, crs=crs, geometry=transform,
+                               dtype=dtype, navalue=navalue, tiled=True,
+                               bigtiff="IF_SAFER") as image:
+                for window, array in results:
+                    image.write(array, window[0], window[1])
 
-        # Add feature to target file
-        trgt_layer.CreateFeature(trgt_feature)
 
-        # Close current feature
-        trgt_feature = None
+def _rasterize_window(arg):
+    """Burn the features that intersect one window of a target grid.
 
-        # Get the next feature
-        src_feature = src_layer.GetNextFeature()
+    Parameters
+    ----------
+    arg : list-like
+        A list containing a vector file path, a pixel window (x offset,
+        y offset, x size, y size), the target grid's geotransform, the target
+        crs in Well-Known Text format, RasterizeLayer options, a GDAL data
+        type, a non-value, and a tile file path or None (bundled for
+        multiprocessing).
 
-    # Close both shapefiles
-    src_file = None
-    trgt_file = None
+    Returns
+    -------
+    tuple:
+        window : tuple
+            The pixel window.
+        result : numpy.ndarray | str
+            The burned values, or the tile file path if one was given.
+    """
 
+    # Separate arguments
+    src, window, geom, crs, ops, dtype, navalue, tile_path = arg
+    xoff, yoff, xsize, ysize = window
+
+    # The geotransform and extent of this window
+    xmin = geom[0] + geom[1] * xoff
+    ymax = geom[3] + geom[5] * yoff
+    xmax = xmin + geom[1] * xsize
+    ymin = ymax + geom[5] * ysize
+    transform = (xmin, geom[1], geom[2], ymax, geom[4], geom[5])
+
+    # Create an in memory raster for this window
+    trgt = gdal.GetDriverByName("MEM").Create("", xsize, ysize, 1, dtype)
+    trgt.SetGeoTransform(transform)
+    trgt.SetProjection(crs)
+    band = trgt.GetRasterBand(1)
+    band.SetNoDataValue(navalue)
+    band.Fill(navalue)
 
-def reproject_point(src, dst, tproj):
-    """Reproject a shapefile of points and write results to disk. Recreates
-    this GDAL command:
+    # Open the vector file and its layer
+    src_data = ogr.Open(src)
+    layer = src_data.GetLayer()
 
-        ogr2ogr -s_srs <source_projection> -t_srs <target_projection> dst src
+    # Only read features that intersect this window, in the layer's crs
+    box = ogr.CreateGeometryFromWkt(
+        "POLYGON (({0} {1}, {2} {1}, {2} {3}, {0} {3}, {0} {1}))".format(
+            xmin, ymin, xmax, ymax
+        )
+    )
+    refs = osr.SpatialReference()
+    refs.ImportFromWkt(crs)
+    layer_refs = layer.GetSpatialRef()
+    if layer_refs is not None and not layer_refs.IsSame(refs):
+        if hasattr(osr, "OAMS_TRADITIONAL_GIS_ORDER"):
+            refs.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+            layer_refs.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+        box.Segmentize(max(abs(xmax - xmin), abs(ymax - ymin)) / 16)
+        box.Transform(osr.CoordinateTransformation(refs, layer_refs))
+    layer.SetSpatialFilter(box)
+
+    # Burn the features into the window
+    gdal.RasterizeLayer(trgt, [1], layer, options=ops)
+
+    # Write the window to its own tile or send the values back
+    if tile_path:
+        tile = gdal.GetDriverByName("GTiff").CreateCopy(tile_path, trgt)
+        del tile
+        result = tile_path
+    else:
+        result = band.ReadAsArray()
 
-    Parameters
-    ----------
-    src : str
-        Path to source shapefile.
-    dst : str
-        Path to target file.
-    tproj (int | str):
-        Target coordinate projection system as an epsg code or proj4 string.
-        Sometimes EPSG codes aren't available to GDAL installations, but
-        they're easier to use when they are so this will try both.
+    # Close target and source data sets
+    del band, trgt
+    del src_data
 
-    Note
-    ----
-    This only handles ESRI Shapefiles at the moment, but can be written to
-    handle any available driver.
+    return window, result
+
+
+def rasterize_array(src, attribute, t_srs=None, transform=None, height=None,
+                    width=None, template_path=None, navalue=-9999,
+                    all_touch=False, dtype=np.float32):
     """
+    Rasterize one or more attributes of a vector file into a numpy array
+    in memory, without writing anything to disk.
 
-    # Create Shapefile driver
-    driver = ogr.GetDriverByName("ESRI Shapefile")
+    The features are read once and each feature's position in the layer is
+    burned into an in memory raster once. Each attribute's values are then
+    looked up from that, so any number of attributes costs a single pass
+    over the features.
 
-    # Source reference information
-    src_file = driver.Open(src)
-    src_layer = src_file.GetLayer()
-    src_srs = src_layer.GetSpatialRef()
-    src_defn = src_layer.GetLayerDefn()
+    Parameters
+    ----------
+    src : str
+        File path for the source file to rasterize.
+    attribute : str | list
+        Attribute name being rasterized, or a list of names for a multi-band
+        result.
+    t_srs : int
+        EPSG Code associated with target coordinate reference system.
+    transform : list | tuple | array
+        Geometric affine transformation:
+            (x-min, x-resolution, x-rotation, y-max, y-rotation, y-resoltution)
+    height : int
+        Number of y-axis grid cells.
+    width : int
+        Number of x-axis grid cells.
+    template_path : str
+        The path to a raster with target geometries.
+    navalue : int | float
+        The value to assign to non-value grid cells. (defaults to -9999)
+    all_touch : boolean
+        Wether or not to associate vector values with all intersecting grid
+        cells. (defaults to False)
+    dtype : numpy.dtype
+        The data type of the returned array. (defaults to numpy.float32)
 
-    # Target reference information
-    trgt_srs = osr.SpatialReference()
-    try:
-        trgt_srs.ImportFromEPSG(tproj)
-    except Exception:
-        trgt_srs.ImportFromProj4(tproj)
+    Returns
+    -------
+        tuple:
+             raster values : numpy.ndarray
+                 A 2D array for one attribute name, or a 3D array with one
+                 layer per attribute for a list of them.
+             affine transformation : tuple
+                 (top left x coordinate, x resolution, row rotation,
+                  top left y coordinate, column rotation, y resolution)),
+            coordinate reference system : str
+                 Well-Known Text format
+    """
 
-    # The transformation equation
-    transform = osr.CoordinateTransformation(src_srs, trgt_srs)
+    # Get the target grid from the template or the arguments
+    transform, nx, ny, crs = _target_grid(t_srs, transform, height, width,
+                                          template_path)
+    if isinstance(attribute, str):
+        attributes = [attribute]
+    else:
+        attributes = list(attribute)
 
-    # Target file and layer
-    if os.path.exists(dst):
-        driver.DeleteDataSource(dst)
-    trgt_file = driver.CreateDataSource(dst)
-    trgt_layer = trgt_file.CreateLayer('', trgt_srs, ogr.wkbPoint)
+    # Burn each feature's position once and read the attribute values
+    index, values = _burn_index(src, attributes, transform, nx, ny, crs,
+                                all_touch)
 
-    # Add Fields
-    for i in range(0, src_defn.GetFieldCount()):
-        defn = src_defn.GetFieldDefn(i)
-        trgt_layer.CreateField(defn)
+    # Look up each attribute, the last value is for cells with no features
+    layers = []
+    for vals in values:
+        vals = [navalue if v is None else v for v in vals] + [navalue]
+        layers.append(np.array(vals, dtype=dtype)[index])
 
-    # Get the target layer definition
-    trgt_defn = trgt_layer.GetLayerDefn()
+    # Return a single band for a single attribute name
+    if isinstance(attribute, str):
+        array = layers[0]
+    else:
+        array = np.stack(layers)
 
-    # You have to reproject each feature
-    src_feature = src_layer.GetNextFeature()
-    while src_feature:
-        # Get geometry
-        geom = src_feature.GetGeometryRef()
+    return(array, transform, crs)
 
-        # Reproject geometry
-        geom.Transform(transform)
 
-        # Create target feature
-        trgt_feature = ogr.Feature(trgt_defn)
-        trgt_feature.SetGeometry(geom)
-        for i in range(0, trgt_defn.GetFieldCount()):
-            trgt_feature.SetField(trgt_defn.GetFieldDefn(i).GetNameRef(),
-                                  src_feature.GetField(i))
+def read_blocks(rasterpath, band=1, window=None, navalue=-9999,
+                masked=True):
+    """Read a raster file one window at a time so that large rasters can be
+    processed in constant memory.
 
-        # Add feature to target file
-        trgt_layer.CreateFeature(trgt_feature)
+    Parameters
+    ----------
+    rasterpath : str
+        Path to a raster file.
+    band : int
+        The band number desired.
+    window : tuple
+        The (x size, y size) of each window in grid cells. Defaults to the
+        raster's own block size.
+    navalue : int | float
+        The number used for non-values if the band doesn't have one.
+    masked : boolean
+        Return masked arrays with the non-value cells masked. Otherwise,
+        return plain arrays. (defaults to True)
 
-        # Close current feature
-        trgt_feature = None
+    Yields
+    ------
+        tuple:
+            window : tuple
+                (x offset, y offset, x size, y size)
+            raster values : numpy.ndarray | numpy.ma.MaskedArray
+                The values in this window in the raster's own data type.
+    """
 
-        # Get the next feature
-        src_feature = src_layer.GetNextFeature()
+    # Open raster file and find the window size
+    raster = gdal.Open(rasterpath)
+    rband = raster.GetRasterBand(band)
+    nodata = rband.GetNoDataValue()
+    if nodata is None:
+        nodata = navalue
+    xblock, yblock = window_size(rband, window)
 
-    # Close both shapefiles
-    src_file = None
-    trgt_file = None
+    # Read each window
+    for win in block_windows(rband.XSize, rband.YSize, xblock, yblock):
+        array = rband.ReadAsArray(*win)
+        if masked:
+            array = np.ma.masked_array(array, mask=nodata_mask(array, nodata))
+        yield win, array
 
 
-def split_extent(raster_file, n=100):
-    """Split a raster files extent into n extent pieces."""
+def read_dask(rasterpath, band=1, window=None, navalue=-9999, masked=False):
+    """Read a raster band into a lazy dask array chunked on the raster's own
+    blocks.
 
-    # Get raster geometry
-    rstr = rasterio.open(raster_file)
-    geom = rstr.get_transform()
-    ny = rstr.height
-    nx = rstr.width
-    xs = [geom[0] + geom[1] * i for i in range(nx)]
-    ys = [geom[3] + geom[-1] * i for i in range(ny)]
+    Nothing is read until the array, or something computed from it, is
+    computed. Each chunk is then read with GDAL by the dask scheduler, so
+    rasters larger than memory can be processed on every core.
 
-    # Get number of chunks along each axis
-    nc = np.sqrt(n)
+    Parameters
+    ----------
+    rasterpath : str
+        Path to a raster file.
+    band : int
+        The band number desired.
+    window : tuple
+        The (x size, y size) of each chunk in grid cells. Defaults to the
+        raster's own block size. See window_size.
+    navalue : int | float
+        The number used for non-values if the band doesn't have one.
+    masked : boolean
+        Return a masked dask array with the non-value cells masked.
+        (defaults to False)
 
-    # Split coordinates into 10 pieces along both axes...
-    xchunks = np.array(np.array_split(xs, nc))
-    ychunks = np.array(np.array_split(ys, nc))
+    Returns
+    -------
+    dask.array.Array
+        A (y, x) array in the raster's own data type.
+    """
 
-    # Get min/max of each coordinate chunk...
-    sides = lambda x: [min(x), max(x)]
-    xmap = map(sides, xchunks)
-    ymap = map(sides, ychunks)
-    xext = np.array([v for v in xmap])
-    yext = np.array([v for v in ymap])
+    # Chunk on the raster's blocks so each chunk is a whole block read
+    reader = Band_Array(rasterpath, band)
+    rband = DATASET_CACHE.open(rasterpath).GetRasterBand(band)
+    xblock, yblock = window_size(rband, window)
+    nodata = rband.GetNoDataValue()
+    if nodata is None:
+        nodata = navalue
 
-    # Combine these in this order [xmin, ymin, xmax, ymax]....
-    extents = []
-    for xex in xext:
-        for yex in yext:
-            extents.append([xex[0], yex[0], xex[1], yex[1]])
+    # Build the lazy array
+    array = da.from_array(reader, chunks=(yblock, xblock), name=False,
+                          meta=np.empty((0, 0), reader.dtype))
+    if masked:
+        mask = array.map_blocks(nodata_mask, nodata, dtype=bool)
+        array = da.ma.masked_array(array, mask=mask)
 
-    return extents
+    return array
 
 
-def tile_raster(raster_file, out_folder, ntiles, ncpu):
-    """ Take a raster and write n tiles from it.
+def read_raster(rasterpath, band=1, navalue=-9999, masked=False):
+    """Converts a raster file on disk into a numpy array along with
+    spatial features needed to write results to a raster file.
 
     Parameters
     ----------
-    raster_file : str
-        Path to a GeoTiff
-    out_folder : str
-        Path to a folder in which to store tiles. Will create if not present.
-    ntiles : int
-        Number of tiles to write.
-    ncpu : int
-        Number of cpus to use for processing.
+    rasterpath : str
+        Path to a raster file, or a GDAL virtual path, e.g. from zip_members.
+    band : int
+        The band number desired.
+    navalue : int | float
+        The number used for non-values in the raster data set
+    masked : boolean
+        Keep the raster's own data type and return a masked array with the
+        non-value cells masked, using the band's non-value if it has one.
+        Otherwise, convert to floats with NaNs for non-values. Masked arrays
+        are much smaller for integer rasters. (defaults to False)
 
     Returns
     -------
-    None.
+        tuple:
+             raster values : numpy.ndarray | numpy.ma.MaskedArray
+             affine transformation : tuple
+                 (top left x coordinate, x resolution, row rotation,
+                  top left y coordinate, column rotation, y resolution)),
+            coordinate reference system : str
+                 Well-Known Text format
     """
 
-    # Create the output folder
-    if not out_folder:
-        base_name = os.path.splitext(raster_file)[0]
-        out_folder = "_".join([base_name, "tiles"])
-    os.makedirs(out_folder, exist_ok=True)
+    # Open raster file and read in parts necessary for rewriting
+    raster = gdal.Open(rasterpath)
+    geometry = raster.GetGeoTransform()
+    arrayref = raster.GetProjection()
+    rband = raster.GetRasterBand(band)
+    nodata = rband.GetNoDataValue()
+    array = rband.ReadAsArray()
+    del rband
+    raster = None
 
-    # Get all of the extents needed to make n tiles
-    extents = split_extent(raster_file, n=ntiles)
+    # Mask non-values in the native data type
+    if masked:
+        if nodata is None:
+            nodata = navalue
+        array = np.ma.masked_array(array, mask=nodata_mask(array, nodata))
+        return(array, geometry, arrayref)
 
-    # Wrap arguments into one object
-    raster_files = np.repeat(raster_file, len(extents))
-    chunknumbers = [i for i in range(len(extents))]
-    out_folders = np.repeat(out_folder, len(extents))
-    args = list(zip(extents, raster_files, chunknumbers, out_folders))
+    # This helped for some old use-case, but might not be necessary
+    array = array.astype(float, copy=False)
+    if np.nanmin(array) < navalue:
+        navalue = np.nanmin(array)
+    array[array == navalue] = np.nan
 
-    # Run each
-    with Pool(ncpu) as pool:
-        tfiles = []
-        for tfile in tqdm(pool.imap(tile_single, args), total=len(extents),
-                          position=0, file=sys.stdout):
-            tfiles.append(tfile)
+    return(array, geometry, arrayref)
 
-    return tfiles
 
+def reproject_polygon(src, dst, t_srs):
+    """Reproject a shapefile of polygons and write results to disk. Recreates
+    this GDAL command:
+        ogr2ogr -s_srs <source_projection> -t_srs <target_projection> dst src
 
-def tile_single(arg):
-    """Use gdal to cut a raster into a smaller pieces.
+    Parameters
+    ----------
+    src : str
+        Path to source shapefile.
+    dst : str
+        Path to target file.
+    tproj (int | str):
+        Target coordinate projection system as an epsg code or proj4 string.
+        Sometimes EPSG codes aren't available to GDAL installations, but
+        they're easier to use when they are so this will try both.
 
-    Note:
-        This is made for tile_raster and is not intuitive as a standalone.
-        Add in a check to make sure each output file is good. Moving to
-        a class method soon.
+    Note
+    ----
+    This is a wrapper for reproject_vector, which handles any driver.
     """
 
-    # Separate arguments
-    extent = arg[0]
-    rfile = arg[1]
-    chunk = arg[2]
-    outfolder = arg[3]
-
-    # Get everything in order
-    extent = [str(e) for e in extent]
-    chunk = "{:02d}".format(chunk)
-    outbase = os.path.basename(rfile).split(".")[0]
-    outfile = os.path.join(outfolder, outbase + "_" + chunk + ".tif")
-
-    # Let's not overwrite - use the warp function from below here instead
-    if not os.path.exists(outfile):
-        sp.call(["gdalwarp",
-                 "-q",
-                 "-te", extent[0], extent[1], extent[2], extent[3],
-                 rfile,
-                 outfile],
-                stdout=sp.PIPE, stderr=sp.PIPE)
+    reproject_vector(src, dst, t_srs, geom_type=ogr.wkbMultiPolygon)
 
-    return outfile
 
+def reproject_point(src, dst, tproj):
+    """Reproject a shapefile of points and write results to disk. Recreates
+    this GDAL command:
 
-def to_geo(data_frame, loncol="lon", latcol="lat", epsg=4326):
-    """Convert a Pandas DataFrame object to a GeoPandas GeoDataFrame object.
+        ogr2ogr -s_srs <source_projection> -t_srs <target_projection> dst src
 
     Parameters
     ----------
-    df : pandas.core.frame.DataFrame
-        A pandas data frame with latitude and longitude coordinates.
-    loncol : str
-        The name of the longitude column.
-    latcol : str
-        The name of the latitude column.
-    epsg : int
-        EPSG code associated with the Coordinate Reference System.
+    src : str
+        Path to source shapefile.
+    dst : str
+        Path to target file.
+    tproj (int | str):
+        Target coordinate projection system as an epsg code or proj4 string.
+        Sometimes EPSG codes aren't available to GDAL installations, but
+        they're easier to use when they are so this will try both.
 
-    Returns
-    -------
-    geopandas.geodataframe.GeoDataFrame
-        A GeoPandas GeoDataFrame object.
+    Note
+    ----
+    This is a wrapper for reproject_vector, which handles any driver.
     """
 
-    crs = {"init": "epsg:{}".format(epsg)}
-    to_point = lambda x: Point((x[loncol], x[latcol]))
-    data_frame["geometry"] = data_frame.apply(to_point, axis=1)
-    gdf = gpd.GeoDataFrame(data_frame, geometry="geometry", crs=crs)
+    reproject_vector(src, dst, tproj, geom_type=ogr.wkbPoint)
 
-    return gdf
 
+def reproject_vector(src, dst, t_srs, driver=None, geom_type=None,
+                     batch_size=10000, ncpu=1, merge=True):
+    """Reproject a vector file of any geometry type and write results to
+    disk. Recreates this GDAL command:
 
-def to_raster(array, savepath, crs=None, geometry=None, template=None,
-              dtype=gdal.GDT_Float32, compress=None, navalue=-9999):
-    """Takes in a numpy array and writes data to a GeoTiff.
+        ogr2ogr -s_srs <source_projection> -t_srs <target_projection> dst src
+
+    Features are written in batches, inside a transaction where the driver
+    supports them, with fields copied by index. Point coordinates are
+    transformed one batch at a time, other geometries one feature at a time.
 
     Parameters
     ----------
-    array : numpy.ndarray
-        Numpy array to write to raster file.
-    savepath : str
-        Path to the target raster file.
-    crs : str
-        Coordinate reference system in Well-Known Text format.
-    geometry : tuple
-        Affine transformation information in this order:
-            (top left x coordinate, x resolution, row rotation,
-            top left y coordinate, column rotation, y resolution)
-    template : str
-        Path to a raster file with desired target raster geometry, crs, and na
-        value. This will overwrite other arguments provided for these
-        parameters.
-    dtype : str | gdal object
-        GDAL data type. Can be a string or a gdal type object (e.g.
-        gdal.GDT_Float32, "GDT_Float32", "float32"). Available GDAL data types
-        and descriptions can be found in the GDAL_TYPES dictionary.
-    compress : str
-        A compression technique. Available options are "DEFLATE", "JPEG",
-        "LZW"
-    navalue : int | float
-        The number used for non-values in the raster data set. Defaults to
-        -9999.
+    src : str
+        Path to source vector file, in any format OGR can read.
+    dst : str
+        Path to target file.
+    t_srs : int | str
+        Target coordinate projection system as an epsg code or proj4 string.
+        Sometimes EPSG codes aren't available to GDAL installations, but
+        they're easier to use when they are so this will try both.
+    driver : str
+        OGR driver name for the target file, e.g. "GPKG" or "FlatGeobuf".
+        Defaults to the driver for dst's extension in VECTOR_DRIVERS.
+    geom_type : int
+        OGR geometry type of the target layer, e.g. ogr.wkbMultiPolygon.
+        Geometries are converted if needed. Defaults to the source layer's
+        geometry type.
+    batch_size : int
+        Number of features to write in each batch. (defaults to 10,000)
+    ncpu : int
+        Number of cpus to use for processing. With more than one, the source
+        features are split into one range per cpu, by feature id where the
+        driver can't jump to a feature index, and each range is reprojected
+        to its own file in a "<dst name>_parts" folder by a separate
+        process. (defaults to 1)
+    merge : boolean
+        Merge the parallel parts into dst and remove them. Parts are
+        appended with gdal.VectorTranslate where the driver can reopen dst
+        for writing, and copied feature by feature otherwise. Or, keep the
+        parts and write an OGR VRT union layer over them next to dst, with a
+        ".vrt" extension. (defaults to True)
+
+    Returns
+    -------
+    int
+        The number of features written.
     """
 
-    # Retrieve needed raster elements
-    xpixels = array.shape[1]
-    ypixels = array.shape[0]
+    start = time.time()
 
-    # This helps sometimes
-    savepath = savepath.encode('utf-8')
+    # Create target directory
+    save_path = os.path.dirname(dst)
+    if save_path and not dst.startswith("/vsi"):
+        os.makedirs(save_path, exist_ok=True)
 
-    # Specifying data types shouldn't be so difficult
-    if isinstance(dtype, str):
-        dtype = dtype.lower().replace("gdt_", "")
+    # Find the target driver
+    if not driver:
+        ext = os.path.splitext(dst)[1].lower()
         try:
-            dtype = GDAL_TYPEMAP[dtype]
+            driver = VECTOR_DRIVERS[ext]
         except KeyError:
-            print("\n'" + dtype + "' is not an available data type. "
-                  "Choose a value from this list:")
-            print(str(list(GDAL_TYPEMAP.keys())))
+            raise ValueError("No driver known for '" + ext + "' files, "
+                             "specify one with driver.")
 
-    # Create file
-    driver = gdal.GetDriverByName("GTiff")
+    # Reproject in one process or split the features across several
+    if ncpu > 1:
+        count = _reproject_parallel(src, dst, t_srs, driver, geom_type,
+                                    batch_size, ncpu, merge)
+    else:
+        arg = [src, dst, t_srs, driver, geom_type, batch_size, 0, None,
+               None]
+        count = _reproject_part(arg)
+
+    # Report throughput, unless progress output is off
+    seconds = time.time() - start
+    if not Progress.silent:
+        print("Reprojected {:,} features in {:.2f} seconds "
+              "({:,.0f} features/s).".format(count, seconds,
+                                             count / max(seconds, 1e-9)))
+
+    return count
+
+
+def _reproject_parallel(src, dst, t_srs, driver, geom_type, batch_size, ncpu,
+                        merge):
+    """Reproject ranges of features in separate processes for
+    reproject_vector, then merge the parts or union them in a VRT."""
+
+    # Split the source features into one range per cpu
+    ranges = _feature_ranges(src, ncpu)
+
+    # Each range gets its own file
+    base, ext = os.path.splitext(dst)
+    name = os.path.basename(base)
+    part_folder = base + "_parts"
+    os.makedirs(part_folder, exist_ok=True)
+    parts = [os.path.join(part_folder, "{}_{:02d}{}".format(name, i, ext))
+             for i in range(len(ranges))]
+    args = [[src, part, t_srs, driver, geom_type, batch_size] + list(rng)
+            for part, rng in zip(parts, ranges)]
+
+    # Create the merged target first, so a target that can't be written
+    # fails before any work is done
+    if merge:
+        src_file = ogr.Open(src)
+        src_layer = src_file.GetLayer()
+        if geom_type is None:
+            geom_type = src_layer.GetGeomType()
+        trgt_file, _ = _create_target(dst, driver, _target_srs(t_srs),
+                                      geom_type, src_layer.GetLayerDefn())
+        trgt_file = None
+        src_file = None
 
-    # Get options here - not built out yet
-    if compress:
-        creation_ops = ["compress=LZW"]
-        image = driver.Create(savepath, xpixels, ypixels, 1, dtype,
-                              options=creation_ops)
+    # Run each
+    progress = Pool_Progress(len(args), desc="Reprojecting")
+    with Pool(ncpu, *progress.initializer()) as pool:
+        counts = list(progress.imap(pool, _reproject_part, args))
+
+    # Append the parts to the target in GDAL where the driver can
+    if merge and _can_append(dst):
+        for part in parts:
+            ds = gdal.VectorTranslate(dst, part, accessMode="append",
+                                      layerName=name)
+            del ds
+        shutil.rmtree(part_folder)
+
+    # Or create the target again and write the parts' features into it,
+    # which works for drivers that can only write a file as it is created
+    # (e.g. FlatGeobuf)
+    elif merge:
+        part_file = ogr.Open(parts[0])
+        part_layer = part_file.GetLayer()
+        trgt_file, trgt_layer = _create_target(dst, driver,
+                                               part_layer.GetSpatialRef(),
+                                               geom_type,
+                                               part_layer.GetLayerDefn())
+        part_file = None
+        trgt_defn = trgt_layer.GetLayerDefn()
+        field_map = list(range(trgt_defn.GetFieldCount()))
+        transactions = trgt_layer.TestCapability(ogr.OLCTransactions)
+        for part in parts:
+            part_file = ogr.Open(part)
+            batch = []
+            for feature in part_file.GetLayer():
+                batch.append(feature)
+                if len(batch) == batch_size:
+                    _write_batch(batch, _clone_geometries(batch), trgt_layer,
+                                 trgt_defn, field_map, transactions)
+                    batch = []
+            if batch:
+                _write_batch(batch, _clone_geometries(batch), trgt_layer,
+                             trgt_defn, field_map, transactions)
+            part_file = None
+        trgt_file = None
+        shutil.rmtree(part_folder)
+
+    # Or leave them where they are and point a virtual layer at them
     else:
-        image = driver.Create(savepath, xpixels, ypixels, 1, dtype)
+        layers = []
+        for part in parts:
+            layer = os.path.splitext(os.path.basename(part))[0]
+            layers.append("<OGRVRTLayer name=\"{0}\"><SrcDataSource>{1}"
+                          "</SrcDataSource><SrcLayer>{0}</SrcLayer>"
+                          "</OGRVRTLayer>".format(layer, part))
+        vrt = ("<OGRVRTDataSource><OGRVRTUnionLayer name=\"{}\">{}"
+               "</OGRVRTUnionLayer></OGRVRTDataSource>"
+               .format(name, "".join(layers)))
+        with open(base + ".vrt", "w") as file:
+            file.write(vrt)
 
-    # Use a template file to extract affine transformation, crs, and na value
-    if template:
-        template_file = gdal.Open(template)
-        geometry = template_file.GetGeoTransform()
-        crs = template_file.GetProjection()
+    return sum(counts)
 
-    # Write raster data and attributes to file
-    image.SetGeoTransform(geometry)
-    image.SetProjection(crs)
-    image.GetRasterBand(1).WriteArray(array)
-    image.GetRasterBand(1).SetNoDataValue(navalue)
 
+def _can_append(dst):
+    """Check whether a closed vector file can be reopened to add features to
+    its layer, for _reproject_parallel."""
+
+    try:
+        ds = gdal.OpenEx(dst, gdal.OF_VECTOR | gdal.OF_UPDATE)
+    except RuntimeError:
+        return False
+    layer = ds.GetLayer(0) if ds is not None else None
+    able = layer is not None and layer.TestCapability(ogr.OLCSequentialWrite)
+    del layer, ds
+
+    return bool(able)
 
-def translate(src, dst, overwrite=False, compress=None, **kwargs):
+
+def _feature_ranges(src, ncpu):
+    """Split a vector layer's features into one range per cpu, for
+    _reproject_parallel.
+
+    Drivers that can jump to a feature index get index ranges. Others would
+    read every skipped feature to get there, so their ranges are attribute
+    filters on feature ids, found in one pass that reads nothing else.
+
+    Returns
+    -------
+    list
+        The index of the first feature, the number of features (or None),
+        and an attribute filter (or None) for each range.
     """
-    Translate a raster dataset from one format to another.
+
+    src_file = ogr.Open(src)
+    layer = src_file.GetLayer()
+    nfeatures = layer.GetFeatureCount()
+    size = max(int(np.ceil(nfeatures / ncpu)), 1)
+
+    # Skip straight to each index
+    if layer.TestCapability(ogr.OLCFastSetNextByIndex):
+        ranges = [(start, size, None)
+                  for start in range(0, max(nfeatures, 1), size)]
+
+    # Or split the sorted feature ids
+    else:
+        defn = layer.GetLayerDefn()
+        fields = [defn.GetFieldDefn(i).GetName()
+                  for i in range(defn.GetFieldCount())]
+        layer.SetIgnoredFields(["OGR_GEOMETRY", "OGR_STYLE"] + fields)
+        fids = np.sort([feature.GetFID() for feature in layer])
+        column = layer.GetFIDColumn() or "FID"
+        firsts = list(fids[::size])
+        lasts = firsts[1:] + [None]
+        ranges = []
+        for first, last in zip(firsts, lasts):
+            where = "{} >= {}".format(column, first)
+            if last is not None:
+                where += " AND {} < {}".format(column, last)
+            ranges.append((0, None, where))
+        ranges = ranges or [(0, None, None)]
+
+    src_file = None
+
+    return ranges
+
+
+def _reproject_part(arg):
+    """Reproject a range of features from one vector file to a new one.
 
     Parameters
     ----------
-    src : str
-        Path to source raster file or containing folder for ESRI Grids.
-    dst : str
-        Path to target raster file.
-    overwrite : boolean
-    compress : str
-        A compression technique. Available options are "DEFLATE", "JPEG",
-        "LZW"
-    **kwargs
-        Any available key word arguments for gdal_translate. Available options
-        and descriptions can be found using gdal_options("translate").
+    arg : list-like
+        A list containing a source path, a target path, the target
+        projection, an OGR driver name, a target geometry type (or None),
+        a batch size, the index of the first feature, the number of
+        features to reproject (or None for all of them), and an attribute
+        filter selecting the features (or None), bundled for
+        multiprocessing.
 
     Returns
     -------
-    None.
+    int
+        The number of features written.
+    """
 
-    Notes
-    -----
+    # Separate arguments
+    src, dst, t_srs, driver, geom_type, batch_size, start, size, where = arg
 
-    The progress bar needs work.
+    # Source reference information
+    src_file = ogr.Open(src)
+    src_layer = src_file.GetLayer()
+    if where:
+        src_layer.SetAttributeFilter(where)
+    src_srs = src_layer.GetSpatialRef()
+    src_defn = src_layer.GetLayerDefn()
+    if geom_type is None:
+        geom_type = src_layer.GetGeomType()
 
-    """
+    # Target reference information
+    trgt_srs = _target_srs(t_srs)
 
-    # Create progress callback - these behave differently by module
-    def translate_progress(percent, message, unknown):
-        """A progress callback that recreates the gdal printouts."""
+    # Keep x/y coordinate order with GDAL 3+
+    if hasattr(osr, "OAMS_TRADITIONAL_GIS_ORDER"):
+        src_srs.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
 
-        # We don't need the message or unknown objects
-        del message, unknown
+    # The transformation equation
+    transform = osr.CoordinateTransformation(src_srs, trgt_srs)
 
-        # Between numeric printouts we need three dots
-        dots = [[str(i) + d for d in ["2", "5", "8"]] for i in range(10)]
-        dots = [int(l) for sl in dots for l in sl]
+    # Target file and layer, with the source's fields
+    trgt_file, trgt_layer = _create_target(dst, driver, trgt_srs, geom_type,
+                                           src_defn)
 
-        # If divisible by ten, print the number
-        if percent % 10 == 0 and percent != 0:
-            print("{}".format(percent), end="")
+    # Get the target layer definition and the field index map
+    trgt_defn = trgt_layer.GetLayerDefn()
+    field_map = list(range(trgt_defn.GetFieldCount()))
+    points = ogr.GT_Flatten(geom_type) == ogr.wkbPoint
+    transactions = trgt_layer.TestCapability(ogr.OLCTransactions)
 
-        # If one of three numbers between multiples of 10, print a dot
-        elif percent in dots:
-            print(".", end="")
+    # Start at the first feature in this range
+    if start:
+        src_layer.SetNextByIndex(start)
 
-        return 1
+    # Reproject and write features one batch at a time
+    count = 0
+    batch = []
+    src_feature = src_layer.GetNextFeature()
+    while src_feature and (size is None or count + len(batch) < size):
+        batch.append(src_feature)
+        if len(batch) == batch_size:
+            count += _reproject_batch(batch, trgt_layer, trgt_defn, field_map,
+                                      transform, geom_type, points,
+                                      transactions)
+            batch = []
+        src_feature = src_layer.GetNextFeature()
+    if batch:
+        count += _reproject_batch(batch, trgt_layer, trgt_defn, field_map,
+                                  transform, geom_type, points, transactions)
 
-    # Expand user paths
-    src = os.path.expanduser(src)
-    dst = os.path.expanduser(dst)
+    # Close both files
+    src_file = None
+    trgt_file = None
 
-    # Overwrite existing file
+    return count
+
+
+def _reproject_batch(batch, trgt_layer, trgt_defn, field_map, transform,
+                     geom_type, points, transactions):
+    """Reproject and write a batch of features for reproject_vector."""
+
+    # Get geometries, converting them to the target type if needed
+    geoms = []
+    for src_feature in batch:
+        geom = src_feature.GetGeometryRef()
+        if geom is not None:
+            geom = geom.Clone()
+            if geom.GetGeometryType() != geom_type:
+                geom = ogr.ForceTo(geom, geom_type)
+        geoms.append(geom)
+
+    # Transform point coordinates all at once, anything else individually
+    if points:
+        valid = [g for g in geoms if g is not None and not g.IsEmpty()]
+        if valid:
+            coords = transform.TransformPoints([g.GetPoint() for g in valid])
+            for geom, (x, y, z) in zip(valid, coords):
+                if geom.GetCoordinateDimension() == 2:
+                    geom.SetPoint_2D(0, x, y)
+                else:
+                    geom.SetPoint(0, x, y, z)
+    else:
+        for geom in geoms:
+            if geom is not None:
+                geom.Transform(transform)
+
+    return _write_batch(batch, geoms, trgt_layer, trgt_defn, field_map,
+                        transactions)
+
+
+def _clone_geometries(batch):
+    """Copy the geometry of each feature in a batch, or None."""
+
+    geoms = []
+    for feature in batch:
+        geom = feature.GetGeometryRef()
+        geoms.append(geom.Clone() if geom is not None else None)
+
+    return geoms
+
+
+def _create_target(dst, driver, srs, geom_type, src_defn):
+    """Create a vector file with one layer that has a source layer's fields,
+    for reproject_vector. Returns the open file and layer."""
+
+    driver = ogr.GetDriverByName(driver)
     if os.path.exists(dst):
-        if overwrite:
-            if os.path.isfile(dst):
-                os.remove(dst)
-            else:
-                shutil.rmtree(dst)
-        else:
-            print(dst + " exists, use overwrite=True to replace this file.")
-            return
+        driver.DeleteDataSource(dst)
+    trgt_file = driver.CreateDataSource(dst)
+    name = os.path.splitext(os.path.basename(dst))[0]
+    trgt_layer = trgt_file.CreateLayer(name, srs, geom_type)
 
-    # What is the best way to deal with ESRI grids?
-    if not os.path.isfile(src):
-        files = os.listdir(src)
-        if not "hdr.adf" in files:
-            raise FileNotFoundError("Cannot find a translatable file.")
+    # Add Fields
+    for i in range(0, src_defn.GetFieldCount()):
+        defn = src_defn.GetFieldDefn(i)
+        trgt_layer.CreateField(defn)
 
-    # Add in key word arguments
-    kwargs["callback"] = gdal_progress
+    return trgt_file, trgt_layer
 
-    # Compress
-    if compress:
-        kwargs["creationOptions"] = ["COMPRESS=" + compress]
 
-    # Create an options object
-    ops = gdal_options("translate", **kwargs)
+def _target_srs(t_srs):
+    """Build a target spatial reference from an EPSG code or proj4 string,
+    in x/y coordinate order, for reproject_vector."""
 
-    # We need to open the src data set
-    src = gdal.Open(src)
+    trgt_srs = osr.SpatialReference()
+    try:
+        trgt_srs.ImportFromEPSG(t_srs)
+    except Exception:
+        trgt_srs.ImportFromProj4(t_srs)
 
-    # Call
-    print("Processing " + dst + " :")
-    ds = gdal.Translate(destName=dst, srcDS=src, options=ops)
-    del ds
+    # Keep x/y coordinate order with GDAL 3+
+    if hasattr(osr, "OAMS_TRADITIONAL_GIS_ORDER"):
+        trgt_srs.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
 
+    return trgt_srs
 
-def warp(src, dst, dtype="Float32", template=None, overwrite=False,
-         compress=None, **kwargs):
+
+def _write_batch(batch, geoms, trgt_layer, trgt_defn, field_map,
+                 transactions):
+    """Write a batch of features with new geometries in one transaction,
+    for reproject_vector."""
+
+    if transactions:
+        trgt_layer.StartTransaction()
+    for src_feature, geom in zip(batch, geoms):
+        trgt_feature = ogr.Feature(trgt_defn)
+        trgt_feature.SetFromWithMap(src_feature, 1, field_map)
+        if geom is not None:
+            trgt_feature.SetGeometryDirectly(geom)
+        trgt_layer.CreateFeature(trgt_feature)
+    if transactions:
+        trgt_layer.CommitTransaction()
+
+    return len(batch)
+
+
+def split_extent(raster_file, n=100):
+    """Split a raster files extent into about n extent pieces.
+
+    Parameters
+    ----------
+    raster_file : str
+        Path to a raster file.
+    n : int
+        Number of pieces to split the extent into.
+
+    Returns
+    -------
+    list
+        A list of [xmin, ymin, xmax, ymax] extents that follow the outer
+        edges of each piece's grid cells. See tile_grid.
     """
-    Warp a raster to a new geometry.
+
+    return [tile["extent"] for tile in tile_grid(raster_file, ntiles=n)]
+
+
+def state_stats(states, rasters, fips_field="STATEFP", ncpu=1,
+                all_touch=False):
+    """Summarize aligned rasters within US states, with the state names and
+    postal codes from the bundled FIPS table.
 
     Parameters
     ----------
-    src : str
-        Path to source raster file.
-    dst : str
-        Path to target raster file.
-    dtype : str | gdal object
-        GDAL data type. Can be a string or a gdal type object (e.g.
-        gdal.GDT_Float32, "GDT_Float32", "float32"). Available GDAL data types
-        and descriptions can be found in the GDAL_TYPES dictionary.
-    template : str
-        Path to a raster file with desired target raster geometry, crs,
-        resolution, and extent values. This will overwrite other arguments
-        provided for these parameters. Template-derived arguments will
-        overwrite **kwargs.
-    overwrite : boolean
-    compress : str
-        A compression technique. Available options are "DEFLATE", "JPEG",
-        "LZW"
-    **kwargs
-        Any available key word arguments for gdalwarp. Available options
-        and descriptions can be found using gdal_options("warp").
+    states : str
+        Path to a vector file of US state polygons, e.g. a Census
+        cartographic boundary file.
+    rasters : str | list
+        Path to a raster file, or a list of paths to aligned raster files.
+    fips_field : str
+        The name of the field holding each state's two digit FIPS code.
+        (defaults to "STATEFP")
+    ncpu : int
+        Number of cpus to use for processing several rasters.
+    all_touch : boolean
+        Wether or not to count all grid cells that touch a state.
+        (defaults to False)
 
     Returns
     -------
-    None.
+    pandas.core.frame.DataFrame
+        See zonal_stats. Adds stname (state name) and stusps (postal code)
+        columns.
+    """
 
-    Example:
-        warp(src="/Users/twillia2/Box/WETO 1.2/data/rasters/agcounty_product.tif",
-             dst="/Users/twillia2/Box/WETO 1.2/data/rasters/test.tif",
-             template="/Users/twillia2/Box/WETO 1.2/data/rasters/albers/acre/cost_codes_ac.tif",
-             dstSRS="epsg:102008")
+    # Summarize by FIPS code
+    stats = zonal_stats(states, rasters, fips_field, ncpu, all_touch)
+
+    # Join the state names and codes
+    fips = pd.read_csv(FIPS_PATH, dtype=str, skipinitialspace=True)
+    fips = fips.rename(columns={"st": fips_field})
+    index = stats.index.names
+    stats = stats.reset_index()
+    stats[fips_field] = stats[fips_field].astype(str).str.zfill(2)
+    stats = stats.merge(fips, on=fips_field, how="left").set_index(index)
+
+    return stats
+
+
+def tile_grid(raster_file, ntiles=None, tile_size=None, block_multiple=None,
+              halo=0):
+    """Divide a raster into pixel aligned tiles.
+
+    Windows are calculated arithmetically, so this takes time in proportion
+    to the number of tiles rather than the number of grid cells. Give one of
+    ntiles, tile_size, or block_multiple.
+
+    Parameters
+    ----------
+    raster_file : str
+        Path to a raster file.
+    ntiles : int
+        Approximate number of tiles. The raster is split into the grid of
+        columns and rows closest to its aspect ratio that has at least this
+        many tiles.
+    tile_size : int | tuple
+        Tile size in grid cells, as one number for square tiles or as
+        (x size, y size).
+    block_multiple : int | tuple
+        Tile size as a multiple of the raster's block size, as one number or
+        as (x multiple, y multiple). Tiles that line up with blocks read
+        the fewest bytes.
+    halo : int
+        Number of overlapping grid cells to add to each side of each tile,
+        trimmed at the raster's edges. (defaults to 0)
+
+    Returns
+    -------
+    list
+        A list of dictionaries, one per tile in row order, with these keys:
+            window : tuple
+                (x offset, y offset, x size, y size) of the tile and its halo.
+            core : tuple
+                (x offset, y offset, x size, y size) of the tile without its
+                halo. Cores cover the raster without overlapping.
+            extent : list
+                [xmin, ymin, xmax, ymax] of the outer edges of the window's
+                grid cells.
+    """
+
+    # Get raster geometry
+    raster = gdal.Open(raster_file)
+    nx = raster.RasterXSize
+    ny = raster.RasterYSize
+    geom = raster.GetGeoTransform()
+    blocks = raster.GetRasterBand(1).GetBlockSize()
+    del raster
+
+    # Find the size of each tile
+    if ntiles:
+        ideal = np.sqrt(ntiles * nx / ny)
+        options = {min(max(int(c), 1), ntiles)
+                   for c in [np.floor(ideal), np.ceil(ideal)]}
+        ncols = min(options, key=lambda c: c * int(np.ceil(ntiles / c)))
+        nrows = int(np.ceil(ntiles / ncols))
+        xsize = int(np.ceil(nx / ncols))
+        ysize = int(np.ceil(ny / nrows))
+    elif tile_size:
+        if isinstance(tile_size, int):
+            tile_size = (tile_size, tile_size)
+        xsize, ysize = tile_size
+    elif block_multiple:
+        if isinstance(block_multiple, int):
+            block_multiple = (block_multiple, block_multiple)
+        xsize = blocks[0] * block_multiple[0]
+        ysize = blocks[1] * block_multiple[1]
+    else:
+        raise ValueError("Provide one of ntiles, tile_size, or "
+                         "block_multiple.")
+
+    # Add the halo to each core window
+    tiles = []
+    for core in block_windows(nx, ny, xsize, ysize):
+        xoff = max(core[0] - halo, 0)
+        yoff = max(core[1] - halo, 0)
+        xend = min(core[0] + core[2] + halo, nx)
+        yend = min(core[1] + core[3] + halo, ny)
+
+        # Use the outer edges of the cells for the extent
+        xs = [geom[0] + geom[1] * xoff, geom[0] + geom[1] * xend]
+        ys = [geom[3] + geom[5] * yoff, geom[3] + geom[5] * yend]
+        extent = [min(xs), min(ys), max(xs), max(ys)]
+
+        window = (xoff, yoff, xend - xoff, yend - yoff)
+        tiles.append({"window": window, "core": core, "extent": extent})
+
+    return tiles
+
+
+def tile_raster(raster_file, out_folder, ntiles, ncpu, tile_size=None,
+                block_multiple=None, halo=0, vrt=None):
+    """ Take a raster and write n tiles from it.
+
+    Parameters
+    ----------
+    raster_file : str
+        Path to a GeoTiff
+    out_folder : str
+        Path to a folder in which to store tiles. Will create if not present.
+    ntiles : int
+        Approximate number of tiles to write. Set to None to use tile_size or
+        block_multiple instead.
+    ncpu : int
+        Number of cpus to use for processing.
+    tile_size : int | tuple
+        Tile size in grid cells. See tile_grid.
+    block_multiple : int | tuple
+        Tile size as a multiple of the raster's block size. See tile_grid.
+    halo : int
+        Number of overlapping grid cells to add to each side of each tile.
+        (defaults to 0)
+    vrt : str
+        Path to a VRT file to build over the tiles with mosaic, so that they
+        read as one raster again. (defaults to None)
+
+    Returns
+    -------
+    tfiles : list
+        A list of paths to the tile files.
     """
 
-    # Create progress callback - these behave differently by module
-    def warp_progress(percent, message, unknown):
-        """A progress callback that recreates the gdal printouts."""
+    # Create the output folder
+    if not out_folder:
+        base_name = os.path.splitext(raster_file)[0]
+        out_folder = "_".join([base_name, "tiles"])
+    os.makedirs(out_folder, exist_ok=True)
+
+    # Get the pixel windows needed to make the tiles
+    tiles = tile_grid(raster_file, ntiles, tile_size, block_multiple, halo)
+    windows = [tile["window"] for tile in tiles]
+
+    # Wrap arguments into one object
+    raster_files = np.repeat(raster_file, len(windows))
+    chunknumbers = [i for i in range(len(windows))]
+    out_folders = np.repeat(out_folder, len(windows))
+    args = list(zip(windows, raster_files, chunknumbers, out_folders))
+
+    # Track progress in pixels and bytes copied
+    info = DATASET_CACHE.info(raster_file)
+    pixels = sum(window[2] * window[3] for window in windows)
+    nbytes = pixels * info["nbands"] * gdal.GetDataTypeSize(info["dtype"]) // 8
+    progress = Pool_Progress(len(args), pixels, nbytes, desc="Tiling")
+
+    # Run each
+    with Pool(ncpu, *progress.initializer()) as pool:
+        tfiles = []
+        failures = []
+        for tfile, error in progress.imap(pool, tile_single, args):
+            tfiles.append(tfile)
+            if error:
+                failures.append(tfile)
+                print("\n" + tfile + ": " + error)
+
+    # Don't let failed tiles pass silently
+    if failures:
+        raise RuntimeError("{} of {} tiles failed: {}".format(
+            len(failures), len(tfiles), ", ".join(failures)
+        ))
+
+    # Put the tiles back together without copying them
+    if vrt:
+        mosaic(tfiles, vrt, overwrite=True)
+
+    return tfiles
+
+
+def tile_single(arg):
+    """Use gdal to cut a raster into a smaller pieces.
+
+    Tiles are copied from exact pixel windows of the source with
+    gdal.Translate, so there is no resampling. Each process opens a source
+    raster once and reuses it for every tile it cuts from that raster.
+
+    Parameters
+    ----------
+    arg : list-like
+        A list containing a pixel window (x offset, y offset, x size,
+        y size), a source raster file path, a tile number, and an output
+        folder path (bundled for multiprocessing).
+
+    Returns
+    -------
+    tuple:
+        outfile : str
+            Path to the tile file.
+        error : str | None
+            The error message if the tile could not be written.
+
+    Note:
+        This is made for tile_raster and is not intuitive as a standalone.
+    """
+
+    # Separate arguments
+    window = arg[0]
+    rfile = arg[1]
+    chunk = arg[2]
+    outfolder = arg[3]
+
+    # Get everything in order
+    window = [int(w) for w in window]
+    chunk = "{:02d}".format(chunk)
+    outbase = os.path.basename(rfile).split(".")[0]
+    outfile = os.path.join(outfolder, outbase + "_" + chunk + ".tif")
+
+    # Let's not overwrite
+    if not os.path.exists(outfile):
+        try:
+            source = DATASET_CACHE.open(rfile)
+            ops = gdal.TranslateOptions(format="GTiff", srcWin=window,
+                                        callback=gdal_progress)
+            ds = gdal.Translate(outfile, source, options=ops)
+            del ds
+        except Exception as error:
+            if os.path.exists(outfile):
+                os.remove(outfile)
+            return outfile, str(error)
+
+    return outfile, None
+
+
+def to_geo(data_frame, loncol="lon", latcol="lat", epsg=4326):
+    """Convert a Pandas DataFrame object to a GeoPandas GeoDataFrame object.
+
+    Parameters
+    ----------
+    df : pandas.core.frame.DataFrame
+        A pandas data frame with latitude and longitude coordinates.
+    loncol : str
+        The name of the longitude column.
+    latcol : str
+        The name of the latitude column.
+    epsg : int
+        EPSG code associated with the Coordinate Reference System.
+
+    Returns
+    -------
+    geopandas.geodataframe.GeoDataFrame
+        A GeoPandas GeoDataFrame object.
+    """
+
+    # Build every point at once, leaving the caller's data frame as is
+    crs = "epsg:{}".format(epsg)
+    points = gpd.points_from_xy(data_frame[loncol], data_frame[latcol])
+    gdf = gpd.GeoDataFrame(data_frame, geometry=points, crs=crs)
+
+    return gdf
+
+
+def to_raster(array, savepath, crs=None, geometry=None, template=None,
+              dtype=gdal.GDT_Float32, compress=None, navalue=-9999, cog=False,
+              resampling="average", **kwargs):
+    """Takes in a numpy array and writes data to a GeoTiff.
+
+    Parameters
+    ----------
+    array : numpy.ndarray
+        Numpy array to write to raster file. A 3D array is written as one
+        band per layer along the first axis.
+    savepath : str
+        Path to the target raster file.
+    crs : str
+        Coordinate reference system in Well-Known Text format.
+    geometry : tuple
+        Affine transformation information in this order:
+            (top left x coordinate, x resolution, row rotation,
+            top left y coordinate, column rotation, y resolution)
+    template : str
+        Path to a raster file with desired target raster geometry, crs, and na
+        value. This will overwrite other arguments provided for these
+        parameters.
+    dtype : str | gdal object
+        GDAL data type. Can be a string or a gdal type object (e.g.
+        gdal.GDT_Float32, "GDT_Float32", "float32"). Available GDAL data types
+        and descriptions can be found in the GDAL_TYPES dictionary.
+    compress : str
+        A compression technique. Available options are "DEFLATE", "JPEG",
+        "LZW"
+    navalue : int | float
+        The number used for non-values in the raster data set. Defaults to
+        -9999.
+    cog : boolean
+        Write a cloud-optimized GeoTiff, with internal tiles and overviews.
+        The array is written to memory first, then copied. (defaults to
+        False)
+    resampling : str
+        Resampling method for COG overviews. (defaults to "average")
+    **kwargs
+        Any GeoTiff creation options, e.g. tiled=True, blockxsize=512,
+        predictor=2, num_threads="ALL_CPUS", bigtiff="IF_SAFER". See
+        creation_options. With cog=True, any COG creation options instead.
+        See cog_options.
+    """
+
+    # Retrieve needed raster elements, a 3D array has one band per layer
+    xpixels = array.shape[-1]
+    ypixels = array.shape[-2]
+    nbands = array.shape[0] if array.ndim == 3 else 1
+
+    # The COG driver can only copy, so write to memory first
+    if cog:
+        target = "/vsimem/{}.tif".format(uuid.uuid4().hex)
+        with Raster_Writer(target, xpixels, ypixels, nbands, crs, geometry,
+                           template, dtype, navalue=navalue) as image:
+            image.write(array)
+        try:
+            _to_cog(target, savepath, compress, resampling, **kwargs)
+        finally:
+            gdal.Unlink(target)
+        return
+
+    # Write raster data and attributes to file
+    with Raster_Writer(savepath, xpixels, ypixels, nbands, crs, geometry,
+                       template, dtype, compress, navalue, **kwargs) as image:
+        image.write(array)
+
+
+def _to_cog(src, dst, compress=None, resampling="average", ncpu=None,
+            **kwargs):
+    """Copy a raster dataset or file into a cloud-optimized GeoTiff, for
+    warp and to_raster. See cog_options for the arguments."""
+
+    options = cog_options(compress, resampling, ncpu, **kwargs)
+    ops = gdal.TranslateOptions(format="COG", creationOptions=options,
+                                callback=gdal_progress)
+    ds = gdal.Translate(dst, src, options=ops)
+    del ds
+
+
+def translate(src, dst, overwrite=False, compress=None, cog=False,
+              resampling="average", ncpu=None, cache=None, **kwargs):
+    """
+    Translate a raster dataset from one format to another.
+
+    Parameters
+    ----------
+    src : str
+        Path to source raster file or containing folder for ESRI Grids, or a
+        GDAL virtual path, e.g. from zip_members.
+    dst : str
+        Path to target raster file.
+    overwrite : boolean
+    compress : str
+        A compression technique. Available options are "DEFLATE", "JPEG",
+        "LZW"
+    cog : boolean
+        Write a cloud-optimized GeoTiff, with internal tiles and overviews
+        built in the same pass. See cog_options. (defaults to False)
+    resampling : str
+        Resampling method for COG overviews. (defaults to "average")
+    ncpu : int
+        Number of threads for COG compression and overviews. (defaults to
+        all available cpus)
+    cache : Result_Cache
+        A cache to serve unchanged results from and store new ones in.
+        (defaults to None)
+    **kwargs
+        Any available key word arguments for gdal_translate. Available options
+        and descriptions can be found using gdal_options("translate").
+        creationOptions are kept over the compress and cog defaults.
+
+    Returns
+    -------
+    None.
+    """
+
+    # Expand user paths
+    src = os.path.expanduser(src)
+    dst = os.path.expanduser(dst)
+
+    # Overwrite existing file
+    if os.path.exists(dst):
+        if overwrite:
+            DATASET_CACHE.invalidate(dst)
+            if os.path.isfile(dst):
+                os.remove(dst)
+            else:
+                shutil.rmtree(dst)
+        else:
+            print(dst + " exists, use overwrite=True to replace this file.")
+            return
+
+    # What is the best way to deal with ESRI grids?
+    if not src.startswith("/vsi") and not os.path.isfile(src):
+        files = os.listdir(src)
+        if not "hdr.adf" in files:
+            raise FileNotFoundError("Cannot find a translatable file.")
+
+    # Skip unchanged work
+    if cache:
+        options = dict(kwargs, compress=compress, cog=cog,
+                       resampling=resampling)
+        key = cache.key("translate", [src], options)
+        if cache.get(key, dst):
+            print("Using cached result for " + dst)
+            return
+
+    # Add in key word arguments
+    kwargs["callback"] = gdal_progress
+
+    # Compress, or tile, compress, and build overviews, the caller's own
+    # creation options win
+    user_ops = _option_dict(kwargs.get("creationOptions"))
+    if cog:
+        kwargs["format"] = "COG"
+        kwargs["creationOptions"] = cog_options(compress, resampling, ncpu,
+                                                **user_ops)
+    elif compress:
+        kwargs["creationOptions"] = creation_options(compress, **user_ops)
+
+    # Create an options object
+    ops = gdal_options("translate", **kwargs)
+
+    # We need to open the src data set
+    src = DATASET_CACHE.open(src)
+
+    # Call
+    print("Processing " + dst + " :")
+    ds = gdal.Translate(destName=dst, srcDS=src, options=ops)
+    del ds
+
+    if cache:
+        cache.put(key, dst)
+
+
+def warp(src, dst, dtype="Float32", template=None, overwrite=False,
+         compress=None, ncpu=None, cog=False, resampling="average",
+         cache=None, **kwargs):
+    """
+    Warp a raster to a new geometry.
+
+    Parameters
+    ----------
+    src : str
+        Path to source raster file, or a GDAL virtual path, e.g. from
+        zip_members.
+    dst : str
+        Path to target raster file.
+    dtype : str | gdal object
+        GDAL data type. Can be a string or a gdal type object (e.g.
+        gdal.GDT_Float32, "GDT_Float32", "float32"). Available GDAL data types
+        and descriptions can be found in the GDAL_TYPES dictionary.
+    template : str
+        Path to a raster file with desired target raster geometry, crs,
+        resolution, and extent values. This will overwrite other arguments
+        provided for these parameters. Template-derived arguments will
+        overwrite **kwargs.
+    overwrite : boolean
+    compress : str
+        A compression technique. Available options are "DEFLATE", "JPEG",
+        "LZW"
+    ncpu : int
+        Number of threads for the warper to use. Defaults to all available
+        cpus. Sets the NUM_THREADS warp option and, unless given in
+        **kwargs, multithread=True and a warpMemoryLimit of 128 MB per
+        thread (up to 2 GB). Also the number of threads for COG compression.
+    cog : boolean
+        Write a cloud-optimized GeoTiff. The warp is set up as a virtual
+        raster and copied into the COG, which tiles, compresses, and builds
+        overviews in the same pass. See cog_options. (defaults to False)
+    resampling : str
+        Resampling method for COG overviews. The warp's own method is set
+        with resampleAlg. (defaults to "average")
+    cache : Result_Cache
+        A cache to serve unchanged results from and store new ones in.
+        (defaults to None)
+    **kwargs
+        Any available key word arguments for gdalwarp. Available options
+        and descriptions can be found using gdal_options("warp").
+
+    Returns
+    -------
+    None.
+
+    Example:
+        warp(src="/Users/twillia2/Box/WETO 1.2/data/rasters/agcounty_product.tif",
+             dst="/Users/twillia2/Box/WETO 1.2/data/rasters/test.tif",
+             template="/Users/twillia2/Box/WETO 1.2/data/rasters/albers/acre/cost_codes_ac.tif",
+             dstSRS="epsg:102008")
+    """
+
+    # Overwrite existing file
+    if os.path.exists(dst):
+        if overwrite:
+            DATASET_CACHE.invalidate(dst)
+            if os.path.isfile(dst):
+                os.remove(dst)
+            else:
+                shutil.rmtree(dst)
+        else:
+            print(dst + " exists, use overwrite=True to replace this file.")
+            return
+
+    # Skip unchanged work
+    if cache:
+        options = dict(kwargs, dtype=dtype, compress=compress, cog=cog,
+                       resampling=resampling)
+        key = cache.key("warp", [src, template], options)
+        if cache.get(key, dst):
+            print("Using cached result for " + dst)
+            return
+
+    # Specifying data types shouldn't be so difficult
+    if isinstance(dtype, str):
+        dtype = dtype.lower().replace("gdt_", "")
+        try:
+            dtype = GDAL_TYPEMAP[dtype]
+        except KeyError:
+            print("\n'" + dtype + "' is not an available data type. "
+                  "Choose a value from this list:")
+            print(str(list(GDAL_TYPEMAP.keys())))
+
+    # Create a spatial reference object
+    spatial_ref = osr.SpatialReference()
+
+    # If a template is provided, use its geometry for target figures
+    if template:
+        kwargs.update(_template_options(template, dtype))
+    elif not kwargs:
+        print("No warp options provided.")
+        gdal_options("warp")
+        return
+
+    # Get source srs
+    spatial_ref.ImportFromWkt(DATASET_CACHE.info(src)["crs"])
+    srs = spatial_ref.ExportToProj4()
+    kwargs["srcSRS"] = srs
+
+    # Use the progress callback
+    kwargs["callback"] = gdal_progress
+
+    # Use every thread with enough working memory to keep them busy
+    if not ncpu:
+        ncpu = os.cpu_count()
+    kwargs.setdefault("multithread", True)
+    kwargs.setdefault("warpMemoryLimit", min(128 * ncpu, 2048))
+    kwargs["warpOptions"] = _thread_options(kwargs.get("warpOptions"), ncpu)
+
+    # A COG is copied from a virtual warp, so the warp runs as it's written
+    # and the caller's creation options go to the copy
+    target = dst
+    if cog:
+        target = "/vsimem/{}.vrt".format(uuid.uuid4().hex)
+        kwargs["format"] = "VRT"
+        user_ops = _option_dict(kwargs.pop("creationOptions", None))
+
+    # Compress, the caller's own creation options win
+    elif compress:
+        kwargs["creationOptions"] = creation_options(
+            compress, **_option_dict(kwargs.get("creationOptions"))
+        )
+
+    # Check Options: https://gdal.org/python/osgeo.gdal-module.html#WarpOptions
+    ops = gdal_options("warp", **kwargs)
+
+    # Call
+    print("Processing " + dst + " :")
+    ds = gdal.Warp(target, DATASET_CACHE.open(src), options=ops)
+    del ds
+
+    # Tile, compress, and build overviews in one pass
+    if cog:
+        try:
+            _to_cog(target, dst, compress, resampling, ncpu, **user_ops)
+        finally:
+            gdal.Unlink(target)
+
+    if cache:
+        cache.put(key, dst)
+
+
+def warp_many(src_files, out_folder, template, ncpu=1, dtype="Float32",
+              overwrite=False, compress=None, threads=1, cache_mb=256,
+              **kwargs):
+    """Warp many rasters onto one template's grid in parallel processes.
+
+    The template's crs, bounds, and resolution are read once and every
+    worker builds its gdalwarp options once, so each task only carries a
+    pair of paths.
+
+    Parameters
+    ----------
+    src_files : list-like
+        A list of paths to source raster files.
+    out_folder : str
+        Path to a folder for the warped files, which keep their source file
+        names. Will be created if it does not exist.
+    template : str
+        Path to a raster file with the target grid's crs, extent, and
+        resolution.
+    ncpu : int
+        Number of processes to warp with. (defaults to 1)
+    dtype : str | gdal object
+        GDAL data type of the outputs. See warp. (defaults to "Float32")
+    overwrite : boolean
+        Replace existing outputs. Otherwise, they are skipped.
+        (defaults to False)
+    compress : str
+        A compression technique. Available options are "DEFLATE", "JPEG",
+        "LZW"
+    threads : int
+        Number of warper threads in each process. (defaults to 1)
+    cache_mb : int
+        The most GDAL block cache each process may use, in megabytes.
+        (defaults to 256)
+    **kwargs
+        Any other key word arguments for gdalwarp, e.g. resampleAlg="mode".
+        See gdal_options("warp").
+
+    Returns
+    -------
+    pandas.core.frame.DataFrame
+        The source, target, status ("warped", "skipped", or "failed"),
+        seconds, and error message of each file.
+    """
+
+    # Create the output paths
+    os.makedirs(out_folder, exist_ok=True)
+    dst_files = [os.path.join(out_folder, os.path.basename(file))
+                 for file in src_files]
+
+    # Specifying data types shouldn't be so difficult
+    if isinstance(dtype, str):
+        dtype = GDAL_TYPEMAP[dtype.lower().replace("gdt_", "")]
+
+    # Resolve the template and the rest of the options once
+    kwargs.update(_template_options(template, dtype))
+    kwargs.setdefault("multithread", threads > 1)
+    kwargs.setdefault("warpMemoryLimit", min(128 * threads, 2048))
+    kwargs["warpOptions"] = _thread_options(kwargs.get("warpOptions"),
+                                            threads)
+    if compress:
+        kwargs["creationOptions"] = creation_options(
+            compress, **_option_dict(kwargs.get("creationOptions"))
+        )
+
+    # Send the options to each worker once, tasks only get paths
+    args = [(src, dst, overwrite) for src, dst in zip(src_files, dst_files)]
+    progress = Pool_Progress(len(args), desc="Warping")
+    initializer = progress.initializer(_warp_many_init, (kwargs, cache_mb))
+    with Pool(ncpu, *initializer) as pool:
+        records = list(progress.imap(pool, _warp_many_single, args))
+
+    # Report each file
+    status = pd.DataFrame(records, columns=["src", "dst", "status",
+                                            "seconds", "error"])
+    failures = (status["status"] == "failed").sum()
+    if failures:
+        print("\n{} of {} warps failed.".format(failures, len(status)))
+
+    return status
+
+
+def _thread_options(warp_ops, threads):
+    """Add a NUM_THREADS warp option unless the caller gave one, for warp
+    and warp_many."""
+
+    warp_ops = list(warp_ops or [])
+    if not any(o.upper().startswith("NUM_THREADS") for o in warp_ops):
+        warp_ops.append("NUM_THREADS={}".format(threads))
+
+    return warp_ops
+
+
+def _template_options(template, dtype):
+    """Return gdalwarp options for a template raster's grid, for warp and
+    warp_many."""
+
+    temp = DATASET_CACHE.info(template)
+    width = temp["nx"]
+    height = temp["ny"]
+
+    # Bounds are the outer edges of the template's corner cells
+    xmin, xres, xrot, ymax, yrot, yres = temp["geometry"]
+    xs = [xmin, xmin + xres * width]
+    ys = [ymax, ymax + yres * height]
+    extent = [min(xs), min(ys), max(xs), max(ys)]
+
+    return {"dstSRS": temp["crs"], "outputBounds": extent, "xRes": abs(xres),
+            "yRes": abs(yres), "outputType": dtype}
+
+
+def _warp_many_init(kwargs, cache_mb):
+    """Build the shared warp options in a worker process and bound its
+    block cache (a Pool initializer for warp_many)."""
+
+    global _WARP_OPTIONS
+    gdal.SetCacheMax(int(cache_mb) * 1024 ** 2)
+    _WARP_OPTIONS = gdal.WarpOptions(callback=gdal_progress, **kwargs)
+
+
+def _warp_many_single(arg):
+    """Warp one file with the worker's shared options, for warp_many.
+
+    Parameters
+    ----------
+    arg : list-like
+        A list containing a source raster path, a target raster path, and
+        whether to overwrite the target (bundled for multiprocessing).
+
+    Returns
+    -------
+    dict
+        The source, target, status, seconds, and error message.
+    """
+
+    src, dst, overwrite = arg
+    record = {"src": src, "dst": dst, "status": "skipped", "seconds": 0.0,
+              "error": None}
+
+    # Let's not overwrite unless asked
+    if os.path.exists(dst):
+        if not overwrite:
+            return record
+        os.remove(dst)
+
+    start = time.time()
+    try:
+        ds = gdal.Warp(dst, src, options=_WARP_OPTIONS)
+        del ds
+        record["status"] = "warped"
+    except Exception as error:
+        if os.path.exists(dst):
+            os.remove(dst)
+        record["status"] = "failed"
+        record["error"] = str(error)
+    record["seconds"] = round(time.time() - start, 3)
+
+    return record
+
+
+def write_dask(array, savepath, crs=None, geometry=None, template=None,
+               dtype=gdal.GDT_Float32, compress=None, navalue=-9999,
+               scheduler="threads", **kwargs):
+    """Compute a dask array and write it to a GeoTiff one chunk at a time.
+
+    Chunks are computed in parallel by the dask scheduler and written as
+    they finish, behind a lock since GeoTiffs can't be written to
+    concurrently. Chunks that line up with the output's blocks write
+    fastest. Masked cells are written as navalue.
+
+    Parameters
+    ----------
+    array : dask.array.Array
+        A 2D array or a 3D array with one layer per band.
+    savepath : str
+        Path to the target raster file.
+    crs : str
+        Coordinate reference system in Well-Known Text format.
+    geometry : tuple
+        Affine transformation information in this order:
+            (top left x coordinate, x resolution, row rotation,
+            top left y coordinate, column rotation, y resolution)
+    template : str
+        Path to a raster file with desired target raster geometry and crs.
+        This will overwrite other arguments provided for these parameters.
+    dtype : str | gdal object
+        GDAL data type. Can be a string or a gdal type object (e.g.
+        gdal.GDT_Float32, "GDT_Float32", "float32").
+    compress : str
+        A compression technique. Available options are "DEFLATE", "JPEG",
+        "LZW"
+    navalue : int | float
+        The number used for non-values in the raster data set. Defaults to
+        -9999.
+    scheduler : str
+        The dask scheduler to compute chunks with. Only schedulers that share
+        memory, "threads" or "synchronous", can write to the open file.
+        (defaults to "threads")
+    **kwargs
+        Any GeoTiff creation options. See creation_options.
+
+    Returns
+    -------
+    None.
+    """
+
+    # Retrieve needed raster elements, a 3D array has one band per layer
+    xpixels = array.shape[-1]
+    ypixels = array.shape[-2]
+    nbands = array.shape[0] if array.ndim == 3 else 1
+
+    # Masked cells become non-values
+    array = da.ma.filled(array, navalue)
+
+    # Compute chunks in parallel and write them one at a time
+    with Raster_Writer(savepath, xpixels, ypixels, nbands, crs, geometry,
+                       template, dtype, compress, navalue, **kwargs) as image:
+        da.store(array, image, lock=True, scheduler=scheduler)
+
+
+def zip_members(archive, pattern=None):
+    """Return GDAL virtual paths to the files in a zip archive, so that they
+    can be read in place without extracting anything.
+
+    Parameters
+    ----------
+    archive : str
+        Path or url to a zip file, or another GDAL virtual path to one (e.g.
+        a zip inside a zip). Urls are read through /vsicurl/, which only
+        fetches the byte ranges that are read.
+    pattern : str
+        A shell-style pattern to select members by their path inside the
+        archive, e.g. "*.tif". (defaults to None)
+
+    Returns
+    -------
+    list
+        A "/vsizip/<archive>/<member>" path for each file. These can be
+        passed to read_raster, warp, translate, Map_Values and the rest.
+    """
+
+    # Remote archives are read with range requests
+    if archive.startswith(("http://", "https://", "ftp://")):
+        archive = "/vsicurl/" + archive
+    elif not archive.startswith("/vsi"):
+        archive = os.path.abspath(os.path.expanduser(archive))
+    root = "/vsizip/" + archive
+
+    # Folders end with a slash
+    members = [name for name in gdal.ReadDirRecursive(root) or []
+               if not name.endswith("/")]
+    if pattern:
+        members = [name for name in members if fnmatch(name, pattern)]
+
+    return [root + "/" + name for name in members]
+
+
+def zonal_stats(zones, rasters, attribute, ncpu=1, all_touch=False):
+    """Summarize the values of aligned rasters within polygons.
+
+    The polygons are rasterized onto the first raster's grid once, to a
+    temporary tiled file, then each raster and the zones are read block by
+    block and summarized with numpy.bincount. Several rasters are summarized
+    in parallel processes. See Zonal_Stats.
+
+    Parameters
+    ----------
+    zones : str
+        Path to a vector file of zone polygons.
+    rasters : str | list
+        Path to a raster file, or a list of paths to raster files that share
+        the same grid.
+    attribute : str
+        The name of the field identifying each zone. Polygons with the same
+        value are one zone.
+    ncpu : int
+        Number of cpus to use for processing several rasters.
+    all_touch : boolean
+        Wether or not to count all grid cells that touch a zone.
+        (defaults to False)
+
+    Returns
+    -------
+    pandas.core.frame.DataFrame
+        count, sum, mean, min, max, and std of the non-value free grid cells
+        in each zone, indexed by zone. A list of rasters adds a raster path
+        level to the index.
+    """
+
+    if isinstance(rasters, str):
+        template = rasters
+    else:
+        template = rasters[0]
+    with Zonal_Stats(zones, attribute, template, all_touch) as zonal:
+        stats = zonal.stats(rasters, ncpu)
+
+    return stats
+
+
+# CLASSES
+class Band_Array:
+    """A read-only, array-like view of one raster band that reads windows
+    with GDAL on demand, for read_dask.
+
+    Each thread opens its own copy of the dataset, since GDAL datasets can't
+    be shared between threads, and only the path is pickled.
+    """
+
+    def __init__(self, rasterpath, band=1):
+        """Initialize Band_Array.
+
+        Parameters
+        ----------
+        rasterpath : str
+            Path to a raster file.
+        band : int
+            The band number desired. (defaults to 1)
+        """
+
+        self.rasterpath = rasterpath
+        self.band = band
+        rband = DATASET_CACHE.open(rasterpath).GetRasterBand(band)
+        self.shape = (rband.YSize, rband.XSize)
+        self.dtype = rband.ReadAsArray(0, 0, 1, 1).dtype
+        self.ndim = 2
+        self._local = threading.local()
+
+    def __getitem__(self, key):
+        """Read the window covered by a pair of slices."""
+
+        rows, cols = key
+        ystart, ystop, _ = rows.indices(self.shape[0])
+        xstart, xstop, _ = cols.indices(self.shape[1])
+        ysize = max(ystop - ystart, 0)
+        xsize = max(xstop - xstart, 0)
+        if not xsize or not ysize:
+            return np.empty((ysize, xsize), self.dtype)
+
+        # Open the dataset once per thread
+        rband = getattr(self._local, "band", None)
+        if rband is None:
+            self._local.ds = gdal.Open(self.rasterpath)
+            rband = self._local.ds.GetRasterBand(self.band)
+            self._local.band = rband
+
+        return rband.ReadAsArray(xstart, ystart, xsize, ysize)
+
+    def __getstate__(self):
+        """Pickle everything but the open datasets."""
+
+        state = self.__dict__.copy()
+        del state["_local"]
+
+        return state
+
+    def __repr__(self):
+
+        msg = "<Band_Array rasterpath={} band={} shape={}>".format(
+            self.rasterpath, self.band, self.shape
+        )
+        return msg
+
+    def __setstate__(self, state):
+        """Restore a Band_Array in another process."""
+
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+
+class Data_Path:
+    """Data_Path joins a root directory path to data file paths."""
+
+    def __init__(self, data_path):
+        """Initialize Data_Path."""
+
+        self.data_path = data_path
+        self._expand_check()
+        self._exist_check()
+
+    def __repr__(self):
+
+        items = ["=".join([str(k), str(v)]) for k, v in self.__dict__.items()]
+        arguments = " ".join(items)
+        msg = "".join(["<Data_Path " + arguments + ">"])
+        return msg
+
+    def join(self, *args):
+        """Join a file path to the root directory path"""
+
+        return os.path.join(self.data_path, *args)
+
+    def contents(self, *args):
+        """List all content in the data_path or in sub directories."""
+
+        items = glob(self.join(*args, "*"))
+
+        return items
+
+    def folders(self, *args):
+        """List folders in the data_path or in sub directories."""
+
+        items = self.contents(*args)
+        folders = [i for i in items if os.path.isdir(i)]
+
+        return folders
+
+    def files(self, *args):
+        """List files in the data_path or in sub directories."""
+
+        items = self.contents(*args)
+        folders = [i for i in items if os.path.isfile(i)]
+        print(self.join(*args))
+
+        return folders
+
+    def _expand_check(self):
+
+        # Expand the user path if a tilda is present in the root folder path.
+        if "~" in self.data_path:
+            self.data_path = os.path.expanduser(self.data_path)
+
+    def _exist_check(self):
+
+        # Make sure the data path exists.
+        if not os.path.exists(self.data_path):
+            os.makedirs(self.data_path, exist_ok=True)
+
+
+class Dataset_Cache:
+    """A bounded, least recently used cache of open, read-only GDAL datasets
+    and their metadata, keyed by path and modification time.
+
+    Datasets are only shared within a process. A forked process starts
+    with an empty cache rather than sharing its parent's file handles.
+    """
+
+    def __init__(self, maxsize=32):
+        """Initialize Dataset_Cache.
+
+        Parameters
+        ----------
+        maxsize : int
+            The most datasets to keep open at once. The least recently used
+            dataset is closed to make room for a new one. (defaults to 32)
+        """
+
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._pid = os.getpid()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+
+        msg = "<Dataset_Cache size={} maxsize={} hits={} misses={}>".format(
+            len(self), self.maxsize, self.hits, self.misses
+        )
+        return msg
+
+    def info(self, path):
+        """Return the metadata of a raster file.
+
+        Parameters
+        ----------
+        path : str
+            Path to a raster file.
+
+        Returns
+        -------
+        dict
+            crs : str
+                Coordinate reference system in Well-Known Text format.
+            geometry : tuple
+                (top left x coordinate, x resolution, row rotation,
+                 top left y coordinate, column rotation, y resolution)
+            nx : int
+                Number of x-axis grid cells.
+            ny : int
+                Number of y-axis grid cells.
+            nbands : int
+                Number of bands.
+            dtype : int
+                GDAL data type of the first band.
+            navalue : int | float | None
+                Non-value of the first band.
+        """
+
+        return self._get(path)[1]
+
+    def invalidate(self, path=None):
+        """Close and forget a cached dataset, or all of them.
+
+        Parameters
+        ----------
+        path : str
+            Path to a raster file. Clears the whole cache if None.
+        """
+
+        if path is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(self._key(path), None)
+
+    def open(self, path):
+        """Return an open, read-only dataset for a raster file. Don't close
+        or write to it, other callers share it.
+
+        Parameters
+        ----------
+        path : str
+            Path to a raster file.
+
+        Returns
+        -------
+        osgeo.gdal.Dataset
+        """
+
+        return self._get(path)[0]
+
+    def _get(self, path):
+        """Return the dataset and metadata for a path, opening it if it
+        isn't cached or has changed since it was cached."""
+
+        # Don't use handles opened by a parent process
+        if self._pid != os.getpid():
+            self._entries.clear()
+            self._pid = os.getpid()
+
+        # Return the cached entry if the file hasn't changed
+        key = self._key(path)
+        mtime = self._mtime(path)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == mtime:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[1], entry[2]
+
+        # Otherwise open it and read the metadata once
+        self.misses += 1
+        dataset = gdal.Open(path)
+        band = dataset.GetRasterBand(1)
+        info = {"crs": dataset.GetProjection(),
+                "geometry": dataset.GetGeoTransform(),
+                "nx": dataset.RasterXSize,
+                "ny": dataset.RasterYSize,
+                "nbands": dataset.RasterCount,
+                "dtype": band.DataType,
+                "navalue": band.GetNoDataValue()}
+        del band
+
+        # Add it and close the least recently used datasets
+        self._entries[key] = (mtime, dataset, info)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+        return dataset, info
+
+    @staticmethod
+    def _key(path):
+        """Use absolute paths for local files, GDAL's virtual paths as is."""
+
+        path = os.path.expanduser(path)
+        if path.startswith("/vsi"):
+            return path
+        return os.path.abspath(path)
+
+    @staticmethod
+    def _mtime(path):
+        """Return a file's modification time, or None if it has none."""
+
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            stat = gdal.VSIStatL(path)
+            if stat is None:
+                return None
+            return stat.mtime
+
+
+# The dataset cache shared by the functions in this module
+DATASET_CACHE = Dataset_Cache()
+
+
+class Map_Values:
+    """Map a set of keys from an input raster (or rasters) to values in an
+    output raster (or rasters) using a dictionary of key-value pairs."""
+
+    # The mapper each map_files worker process receives once at start up
+    _worker = None
+
+    def __init__(self, val_dict, err_val=-9999, stream=False, window=None):
+        """Initialize Map_Values.
+
+        Parameters
+        ----------
+        val_dict : dict
+            A dictionary of key-value pairs
+        errval : int | float
+            A value to assign where there are no matching keys in val_dict.
+        stream : boolean
+            Read, map, and write rasters one window at a time instead of all
+            at once. This keeps memory use bounded for very large rasters.
+            (defaults to False)
+        window : tuple
+            The (x size, y size) of each window in grid cells when streaming.
+            Defaults to the source raster's own block size.
+        """
+        self.val_dict = val_dict
+        self.err_val = err_val
+        self.stream = stream
+        self.window = window
+        self._compile()
+
+    def map_dask(self, array):
+        """Map dictionary values onto a dask array of keys, one chunk at a
+        time, e.g. from read_dask.
+
+        Parameters
+        ----------
+        array : dask.array.Array
+            An array of keys. Masked cells stay masked.
+
+        Returns
+        -------
+        dask.array.Array
+            A lazy array of the same shape and chunks holding the val_dict
+            values for each key and err_val where keys are missing.
+        """
+
+        # Find the output type from a single key
+        dtype = self.map_array(np.zeros(1, array.dtype)).dtype
+        meta = np.empty((0,) * array.ndim, dtype)
+        mapped = array.map_blocks(self.map_array, dtype=dtype, meta=meta)
+
+        # Carry the mask over
+        if isinstance(array._meta, np.ma.MaskedArray):
+            mapped = da.ma.masked_array(mapped,
+                                        mask=da.ma.getmaskarray(array))
+
+        return mapped
+
+    def map_file(self, src, dst):
+        """Take an input raster file, map values from a dictionary to an output
+        raster file.
+
+        Parameters
+        ----------
+        src : str
+            Path to the input raster file, or a GDAL virtual path, e.g. from
+            zip_members.
+        dst : str
+            Path to the output raster file. Directory will be created if it
+            does not exist.
+
+        Returns
+        -------
+        None.
+        """
+
+        # Create the output path
+        out_folder = os.path.dirname(dst)
+        if out_folder and not dst.startswith("/vsi"):
+            os.makedirs(out_folder, exist_ok=True)
+
+        # Bundle the arguments for map_single (single function)
+        arg = [src, dst]
+
+        # Run it
+        self._map_single(arg)
+
+    def map_files(self, src_files, out_folder, ncpu, vrt=None):
+        """Take a list of tiled raster files, map values from a dictionary to
+        a list of output raster files.
+
+        Parameters
+        ----------
+        src_files : list-like
+            A list of paths to raster files, or GDAL virtual paths, e.g. from
+            zip_members. Outputs keep each file's name.
+        outfolder : str
+            A path to a target directory to store output files. Will be
+            created if it does not exist.
+        ncpu : int
+            The number of cpus to use for multiprocessing.
+        vrt : str
+            Path to a VRT file to build over the output files with mosaic.
+            (defaults to None)
+
+        Returns
+        -------
+        outfiles : list
+            A list of paths to output files.
+        """
+
+        # Create the output paths
+        os.makedirs(out_folder, exist_ok=True)
+        dst_files = []
+        for file in src_files:
+            dst_file = os.path.basename(file)
+            dst_files.append(os.path.join(out_folder, dst_file))
+
+        # Bundle the arguments for map_single (single function)
+        args = list(zip(src_files, dst_files))
+
+        # Each worker reports the pixels and bytes of the file it maps
+        progress = Pool_Progress(len(args), desc="Mapping")
+
+        # Send the compiled mapper to each worker once, tasks only get paths
+        initializer = progress.initializer(Map_Values._init_worker, (self,))
+        with Pool(ncpu, *initializer) as pool:
+            for _ in progress.imap(pool, Map_Values._map_worker, args):
+                pass
+
+        # Read the outputs as one raster
+        if vrt:
+            mosaic(dst_files, vrt, overwrite=True)
+
+        # Return the output file paths
+        return dst_files
+
+    def __getstate__(self):
+        """Pickle the sorted key and value arrays rather than the dictionary
+        and the lookup tables."""
+
+        state = self.__dict__.copy()
+
+        # The dictionary is only needed if it couldn't be compiled
+        if self.keys is not None:
+            state["val_dict"] = None
+            for key in ["_tables", "lut", "int_keys", "int_values"]:
+                state.pop(key, None)
+
+        return state
+
+    def __setstate__(self, state):
+        """Rebuild the lookup tables from the sorted keys and values."""
+
+        self.__dict__.update(state)
+        if self.keys is not None:
+            self._build_tables()
+
+    def map_array(self, array):
+        """Map dictionary values onto an array of keys.
+
+        Parameters
+        ----------
+        array : numpy.ndarray
+            An array of keys, e.g. the values of a raster band.
+
+        Returns
+        -------
+        numpy.ndarray
+            An array of the same shape holding the val_dict values for each
+            key and err_val where keys are missing.
+        """
+
+        array = np.asarray(array)
+
+        # Keys or values that numpy can't sort fall back to the dictionary
+        if self.keys is None:
+            return np.vectorize(self._map_try)(self.val_dict, array)
+
+        # 8 and 16 bit integers index a table covering the whole data type
+        if array.dtype.kind == "b":
+            array = array.view(np.uint8)
+        if array.dtype.kind in "ui" and array.dtype.itemsize <= 2:
+            return self._map_table(array)
+
+        # Other integers use a dense table if the keys are close together
+        if array.dtype.kind in "ui" and self.lut is not None:
+            return self._map_dense(array)
+
+        # Everything else searches through the sorted keys
+        return self._map_sorted(array)
+
+    def _compile(self):
+        """Compile val_dict into sorted key and value arrays."""
+
+        # Use the dictionary directly if these aren't numeric
+        keys = np.array(list(self.val_dict.keys()))
+        values = np.array(list(self.val_dict.values()) + [self.err_val])
+        if keys.dtype.kind not in "buif" or values.dtype.kind not in "buifc":
+            self.keys = None
+            self.values = None
+            self.dtype = values.dtype
+            self._tables = {}
+            return
+
+        # The output type includes the error value, as np.vectorize's would
+        self.dtype = values.dtype
+        values = values[:-1]
+
+        # Sorted keys and values for the binary search
+        if keys.dtype.kind == "b":
+            keys = keys.astype(np.uint8)
+        order = np.argsort(keys, kind="stable")
+        self.keys = keys[order]
+        self.values = values[order]
+
+        # Build the integer lookup tables from these
+        self._build_tables()
+
+    def _build_tables(self):
+        """Build the integer key arrays and, where the integer keys span a
+        small enough range, a dense lookup table from the sorted keys."""
+
+        # Tables are built on demand for each small integer data type
+        self._tables = {}
+        self.lut = None
+        self.lut_min = 0
+
+        # Only whole number keys can match integer arrays
+        keys = self.keys
+        values = self.values
+        if keys.dtype.kind == "f":
+            whole = np.isfinite(keys) & (np.floor(keys) == keys)
+            whole &= np.abs(keys) < 2 ** 63
+            keys = keys[whole]
+            values = values[whole]
+        self.int_keys = keys.astype(np.int64)
+        self.int_values = values.astype(self.dtype)
+
+        # A dense table is the fastest option when the key range is small
+        if self.int_keys.size:
+            kmin = int(self.int_keys.min())
+            span = int(self.int_keys.max()) - kmin + 1
+            if span <= LUT_MAX_SIZE:
+                self.lut = np.full(span, self.err_val, dtype=self.dtype)
+                self.lut[self.int_keys - kmin] = self.int_values
+                self.lut_min = kmin
+
+    @staticmethod
+    def _init_worker(mapper):
+        """Store a mapper in a worker process (a Pool initializer)."""
+
+        Map_Values._worker = mapper
+
+    @staticmethod
+    def _map_worker(arg):
+        """Run _map_single with the worker process' stored mapper."""
+
+        Map_Values._worker._map_single(arg)
+
+    def _map_dense(self, array):
+        """Map an integer array with the dense lookup table."""
+
+        # Shift keys to table positions and flag those outside of the table
+        idx = array.astype(np.int64) - self.lut_min
+        outside = (idx < 0) | (idx >= self.lut.size)
+        idx[outside] = 0
+
+        # Index the table and fill in missing keys
+        new_array = self.lut[idx]
+        new_array[outside] = self.err_val
+
+        return new_array
+
+    def _map_sorted(self, array):
+        """Map an array with a binary search through the sorted keys."""
+
+        # There's nothing to find in an empty dictionary
+        if not self.keys.size:
+            return np.full(array.shape, self.err_val, dtype=self.dtype)
+
+        # Find where each key would be and check that it's actually there
+        idx = np.searchsorted(self.keys, array)
+        idx[idx == self.keys.size] = 0
+        found = self.keys[idx] == array
+
+        return np.where(found, self.values[idx], self.err_val).astype(
+            self.dtype, copy=False
+        )
+
+    def _map_table(self, array):
+        """Map an 8 or 16 bit integer array with a table covering every
+        possible value of its data type."""
+
+        # Signed values are read as unsigned so they index the table directly
+        utype = np.dtype("u{}".format(array.dtype.itemsize))
+        table = self._tables.get(array.dtype.str)
+        if table is None:
+            info = np.iinfo(array.dtype)
+            inside = (self.int_keys >= info.min) & (self.int_keys <= info.max)
+            idx = self.int_keys[inside].astype(array.dtype).view(utype)
+            table = np.full(2 ** (8 * utype.itemsize), self.err_val,
+                            dtype=self.dtype)
+            table[idx] = self.int_values[inside]
+            self._tables[array.dtype.str] = table
+
+        return table[array.view(utype)]
+
+    def _map_single(self, arg, overwrite=True):
+        """Map dictionary values from one raster file to another.
+
+        Parameters
+        ----------
+        arg : list-like
+            A list containing an input raster file path and an output raster
+            file path (bundled for multiprocessing).
+
+        Returns
+        -------
+        None.
+        """
+
+        # Get arguments
+        src = arg[0]
+        dst = arg[1]
+
+        # overwrite
+        if os.path.exists(dst): 
+            if overwrite:
+                os.remove(dst)
+
+        # Try to map values from the mapvals dictionary to a new raster
+        if not os.path.exists(dst):
+            try:
+                # Tell a pool's progress bar how large this file is
+                info = DATASET_CACHE.info(src)
+                pixels = info["nx"] * info["ny"]
+                Progress.size(pixels,
+                              pixels * gdal.GetDataTypeSize(info["dtype"]) // 8)
+
+                if self.stream:
+                    self._map_stream(src, dst)
+                else:
+                    ds = DATASET_CACHE.open(src)
+                    crs = ds.GetProjection()
+                    geom = ds.GetGeoTransform()
+                    array = ds.ReadAsArray()
+                    new_array = self.map_array(array)
+                    to_raster(new_array, dst, crs, geom, navalue=-9999)
+            except Exception as error:
+                print("\n")
+                print(src + ": ")
+                print(error)
+                print("\n")
+                raise
+
+    def _map_stream(self, src, dst):
+        """Map dictionary values from one raster file to another, one window
+        at a time, into an output raster created up front.
+
+        Parameters
+        ----------
+        src : str
+            Path to the input raster file.
+        dst : str
+            Path to the output raster file.
+
+        Returns
+        -------
+        None.
+        """
+
+        # Open the source and find the window size
+        ds = DATASET_CACHE.open(src)
+        band = ds.GetRasterBand(1)
+        nx = ds.RasterXSize
+        ny = ds.RasterYSize
+        xblock, yblock = window_size(band, self.window)
+
+        # Create the whole output raster before writing anything to it
+        image = Raster_Writer(dst, nx, ny, crs=ds.GetProjection(),
+                              geometry=ds.GetGeoTransform(),
+                              bigtiff="IF_SAFER")
+
+        # Read, map, and write each window
+        for xoff, yoff, xsize, ysize in block_windows(nx, ny, xblock, yblock):
+            array = band.ReadAsArray(xoff, yoff, xsize, ysize)
+            image.write(self.map_array(array), xoff, yoff)
+            Progress.report((yoff * nx + (xoff + xsize) * ysize) / (nx * ny))
+
+        # Close target and source rasters
+        image.close()
+        del band, ds
+
+    def _map_try(self, val_dict, key):
+        """Use a key to return a dictionary value, return a specified value for
+        exceptions.
+
+        Parameters
+        ----------
+        val_dict : dict
+            A dictionary of values.
+        key : str | int | float
+            A key that corresponds to a value in val_dict.
+
+        Returns
+        -------
+        x : int | float
+            The value from val_dict corresponding with the key.
+        """
+
+        # Try to retrieve a value with the key
+        try:
+            x = val_dict[key]
+
+        # Return a specified error value if the key is not present
+        except KeyError:
+            x = self.err_val
+
+        return x
+
+
+class Pipeline:
+    """A lazy chain of raster operations that only writes the final product.
+
+    Steps are recorded as they are added and run in order by run. Warps and
+    translations before the last step are set up as in-memory VRTs, so no
+    grid cells are computed until a later step reads them. Value mapping
+    steps before the last step are streamed, one window at a time, to
+    temporary files on disk that are removed when the run ends, so memory
+    use doesn't grow with the raster.
+
+    Example:
+        pipe = Pipeline("landcover.tif")
+        pipe.warp(template="grid.tif", resampleAlg="mode").map_values(costs)
+        pipe.translate(compress="DEFLATE")
+        pipe.run("costs.tif")
+    """
+
+    def __init__(self, src):
+        """Initialize Pipeline.
+
+        Parameters
+        ----------
+        src : str
+            Path to the source raster file.
+        """
+
+        if not src.startswith("/vsi"):
+            src = os.path.abspath(os.path.expanduser(src))
+        self.src = src
+        self.steps = []
+
+    def __repr__(self):
+
+        names = " -> ".join(name for name, _ in self.steps)
+        msg = "<Pipeline src={} steps={}>".format(self.src, names or None)
+        return msg
+
+    def map_values(self, values, err_val=-9999):
+        """Add a step that maps raster values to new values.
+
+        Parameters
+        ----------
+        values : dict | Map_Values
+            A dictionary of key-value pairs, or a Map_Values object.
+        err_val : int | float
+            A value to assign where there are no matching keys in a
+            dictionary. (defaults to -9999)
+
+        Returns
+        -------
+        Pipeline
+            This pipeline, for chaining.
+        """
+
+        if not isinstance(values, Map_Values):
+            values = Map_Values(values, err_val, stream=True)
+        self.steps.append(("map_values", values))
+
+        return self
+
+    def run(self, dst, overwrite=False):
+        """Run each step and write the final product.
+
+        Parameters
+        ----------
+        dst : str
+            Path to the target raster file.
+        overwrite : boolean
+            Replace dst if it exists. (defaults to False)
+
+        Returns
+        -------
+        str
+            Path to the target raster file.
+        """
+
+        # Overwrite existing file
+        if os.path.exists(dst):
+            if overwrite:
+                DATASET_CACHE.invalidate(dst)
+                os.remove(dst)
+            else:
+                print(dst + " exists, use overwrite=True to replace this file.")
+                return dst
+
+        # Nothing to run is just a copy
+        steps = self.steps or [("translate", {})]
+
+        # Each step reads the last one's output
+        src = self.src
+        temps = []
+        folder = None
+        try:
+            for i, (name, step) in enumerate(steps):
+                last = i == len(steps) - 1
+                if last:
+                    target = dst
+                elif name == "map_values":
+                    folder = folder or tempfile.mkdtemp(prefix="pipeline_")
+                    target = os.path.join(folder, "step_{}.tif".format(i))
+                else:
+                    target = "/vsimem/pipeline_{}.vrt".format(uuid.uuid4().hex)
+                if not last:
+                    temps.append(target)
+                self._run_step(name, step, src, target, last)
+                src = target
+
+        # Intermediate datasets only live as long as the run
+        finally:
+            for temp in temps:
+                DATASET_CACHE.invalidate(temp)
+                if temp.startswith("/vsimem/"):
+                    gdal.Unlink(temp)
+            if folder:
+                shutil.rmtree(folder, ignore_errors=True)
+
+        return dst
+
+    def translate(self, **kwargs):
+        """Add a translation step.
+
+        Parameters
+        ----------
+        **kwargs
+            Any key word arguments for translate, e.g. compress="DEFLATE",
+            cog=True, or gdal_translate options. Output options only apply
+            when this is the last step.
+
+        Returns
+        -------
+        Pipeline
+            This pipeline, for chaining.
+        """
+
+        self.steps.append(("translate", kwargs))
+
+        return self
+
+    def warp(self, **kwargs):
+        """Add a warp step.
+
+        Parameters
+        ----------
+        **kwargs
+            Any key word arguments for warp, e.g. template, dtype, or gdalwarp
+            options. Output options only apply when this is the last step.
+
+        Returns
+        -------
+        Pipeline
+            This pipeline, for chaining.
+        """
+
+        self.steps.append(("warp", kwargs))
+
+        return self
+
+    @staticmethod
+    def _run_step(name, step, src, dst, last):
+        """Run one step, as a virtual raster unless it is the last."""
+
+        if name == "map_values":
+            step.map_file(src, dst)
+            return
+
+        # Output options don't apply to virtual rasters
+        kwargs = dict(step)
+        if not last:
+            for key in ["compress", "cog", "resampling", "creationOptions"]:
+                kwargs.pop(key, None)
+            kwargs["format"] = "VRT"
+
+        if name == "warp":
+            warp(src, dst, **kwargs)
+        else:
+            translate(src, dst, **kwargs)
+
+
+class Pool_Progress:
+    """Aggregate the progress of tasks in pool worker processes into one
+    progress bar, with throughput in pixels and megabytes per second.
+
+    Each task reports the fraction it has completed to its own slot in a
+    shared array, through gdal_progress or Progress.report. The parent
+    process sums the slots every interval seconds rather than receiving a
+    message per callback. When the totals aren't known up front, tasks can
+    report their own sizes with Progress.size as they start.
+
+    Example:
+        progress = Pool_Progress(len(args), pixels=nx * ny)
+        with Pool(ncpu, *progress.initializer()) as pool:
+            results = list(progress.imap(pool, tile_single, args))
+    """
+
+    # The shared arrays and the current task number in a worker process
+    _fractions = None
+    _sizes = None
+    _task = None
+
+    def __init__(self, ntasks, pixels=None, nbytes=None, interval=0.5,
+                 desc=None):
+        """Initialize Pool_Progress.
+
+        Parameters
+        ----------
+        ntasks : int
+            Number of tasks that will be run.
+        pixels : int
+            Total number of grid cells all tasks will process, for a pixels
+            per second rate. Defaults to the sizes tasks report themselves.
+        nbytes : int
+            Total number of bytes all tasks will process, for a megabytes per
+            second rate. Defaults to the sizes tasks report themselves.
+        interval : float
+            Number of seconds between progress bar updates. (defaults to 0.5)
+        desc : str
+            A label for the progress bar. (defaults to None)
+        """
+
+        self.ntasks = ntasks
+        self.pixels = pixels
+        self.nbytes = nbytes
+        self.interval = interval
+        self.desc = desc
+        self.fractions = Array("d", max(ntasks, 1), lock=False)
+        self.sizes = Array("d", 2 * max(ntasks, 1), lock=False)
+
+    def __repr__(self):
+
+        msg = "<Pool_Progress ntasks={} complete={:.2f}>".format(
+            self.ntasks, sum(self.fractions)
+        )
+        return msg
+
+    def imap(self, pool, function, args):
+        """Run a function over a list of arguments in a pool, like
+        pool.imap, while updating one progress bar.
+
+        Parameters
+        ----------
+        pool : multiprocessing.pool.Pool
+            A pool created with this object's initializer.
+        function : function
+            A picklable function that takes one argument.
+        args : list-like
+            A list of arguments, one per task.
+
+        Returns
+        -------
+        generator
+            The function's return values, in the order of args.
+        """
+
+        # Number each task so it knows which slot to report to
+        tasks = [(function, i, arg) for i, arg in enumerate(args)]
+        results = pool.imap(Pool_Progress._run_task, tasks)
+
+        # Silent mode runs the tasks without a bar
+        if Progress.silent:
+            for result in results:
+                yield result
+            return
+
+        # Check on the workers between results
+        start = time.time()
+        bar = tqdm(total=len(tasks), position=0, file=sys.stdout,
+                   desc=self.desc)
+        try:
+            for _ in tasks:
+                while True:
+                    try:
+                        result = results.next(timeout=self.interval)
+                        break
+                    except multiprocessing.TimeoutError:
+                        self._update(bar, start)
+                self._update(bar, start)
+                yield result
+        finally:
+            bar.close()
+
+    def initializer(self, initializer=None, initargs=()):
+        """Return Pool initializer arguments that share this object's
+        progress slots with each worker.
+
+        Parameters
+        ----------
+        initializer : function
+            Another Pool initializer to run in each worker.
+            (defaults to None)
+        initargs : tuple
+            Arguments for the other initializer. (defaults to ())
+
+        Returns
+        -------
+        tuple
+            Pool's initializer and initargs arguments.
+        """
+
+        return Pool_Progress._init_worker, (self.fractions, self.sizes,
+                                            initializer, initargs)
+
+    @staticmethod
+    def _init_worker(fractions, sizes, initializer, initargs):
+        """Store the shared progress slots in a worker process (a Pool
+        initializer)."""
+
+        Pool_Progress._fractions = fractions
+        Pool_Progress._sizes = sizes
+        if initializer is not None:
+            initializer(*initargs)
+
+    @staticmethod
+    def _run_task(task):
+        """Run one numbered task in a worker process and mark it complete."""
+
+        function, i, arg = task
+        Pool_Progress._task = i
+        try:
+            return function(arg)
+        finally:
+            Pool_Progress._fractions[i] = 1
+            Pool_Progress._task = None
+
+    def _update(self, bar, start):
+        """Move the bar to the sum of the task fractions and show rates."""
+
+        # Sum the completed fractions of each task
+        complete = sum(self.fractions)
+        bar.n = round(complete, 2)
+
+        # Scale the totals by the share completed so far, or add up the
+        # completed shares of the sizes tasks reported
+        share = complete / max(self.ntasks, 1)
+        fractions = self.fractions[:]
+        pixels = self.pixels * share if self.pixels else np.dot(
+            fractions, self.sizes[0::2]
+        )
+        nbytes = self.nbytes * share if self.nbytes else np.dot(
+            fractions, self.sizes[1::2]
+        )
+        seconds = max(time.time() - start, 1e-9)
+        rates = []
+        if pixels:
+            rates.append("{:,.0f} px/s".format(pixels / seconds))
+        if nbytes:
+            rates.append("{:,.1f} MB/s".format(nbytes / seconds / 1e6))
+
+        bar.set_postfix_str(", ".join(rates), refresh=False)
+        bar.refresh()
+
+
+class Progress:
+    """A GDAL progress callback that recreates the gdal printouts.
+
+    Each call does a constant amount of work and only writes when a new
+    mark is reached, so callbacks from fast, small tasks cost next to
+    nothing. In a Pool_Progress worker it reports to the pool's bar
+    instead of printing. Set Progress.silent = True to turn off progress
+    output from this module.
+    """
+
+    # Turns off all progress printouts and bars
+    silent = False
+
+    def __init__(self, file=None):
+        """Initialize Progress.
+
+        Parameters
+        ----------
+        file : file-like
+            Where to write printouts. (defaults to sys.stdout at call time)
+        """
+
+        self.file = file
+        self._mark = 0
+
+    def __call__(self, complete, message=None, unknown=None):
+        """Print progress marks for a GDAL operation.
+
+        Parameters
+        ----------
+        complete : float
+            Share of the operation completed, between 0 and 1.
+        message : str
+            A GDAL message, unused.
+        unknown : object
+            GDAL callback data, unused.
+
+        Returns
+        -------
+        int
+            1, to let GDAL carry on.
+        """
 
         # We don't need the message or unknown objects
         del message, unknown
 
-        # Between numeric printouts we need three dots
-        dots = [[str(i) + d for d in ["2", "5", "8"]] for i in range(10)]
-        dots = [int(l) for sl in dots for l in sl]
+        # In a worker, just fill in this task's slot
+        if Progress.report(complete):
+            return 1
+
+        if Progress.silent:
+            return 1
+
+        # There are 40 marks, a number every ten percent and dots between
+        mark = int(complete * 40)
+        if mark < self._mark:
+            self._mark = 0
+        if mark > self._mark:
+            marks = [str(m // 4 * 10) if m % 4 == 0 else "."
+                     for m in range(self._mark + 1, mark + 1)]
+            if mark == 40:
+                marks.append(" - done.\n")
+            file = self.file or sys.stdout
+            file.write("".join(marks))
+            file.flush()
+            self._mark = mark % 40
 
-        # If divisible by ten, print the number
-        if percent % 10 == 0 and percent != 0:
-            print("{}".format(percent), end="")
+        return 1
 
-        # If one of three numbers between multiples of 10, print a dot
-        elif percent in dots:
-            print(".", end="")
+    @staticmethod
+    def report(complete):
+        """Report the completed share of the current task to a Pool_Progress
+        bar, if running in one of its workers.
 
-        return 1
+        Parameters
+        ----------
+        complete : float
+            Share of the task completed, between 0 and 1.
 
-    # Overwrite existing file
-    if os.path.exists(dst):
-        if overwrite:
-            if os.path.isfile(dst):
-                os.remove(dst)
-            else:
-                shutil.rmtree(dst)
-        else:
-            print(dst + " exists, use overwrite=True to replace this file.")
-            return
+        Returns
+        -------
+        bool
+            Whether there was a task to report to.
+        """
 
-    # Specifying data types shouldn't be so difficult
-    if isinstance(dtype, str):
-        dtype = dtype.lower().replace("gdt_", "")
-        try:
-            dtype = GDAL_TYPEMAP[dtype]
-        except KeyError:
-            print("\n'" + dtype + "' is not an available data type. "
-                  "Choose a value from this list:")
-            print(str(list(GDAL_TYPEMAP.keys())))
+        if Pool_Progress._task is None:
+            return False
+        Pool_Progress._fractions[Pool_Progress._task] = complete
+        return True
 
-    # Create a spatial reference object
-    spatial_ref = osr.SpatialReference()
+    @staticmethod
+    def size(pixels=None, nbytes=None):
+        """Report the size of the current task to a Pool_Progress bar, if
+        running in one of its workers, so the parent needn't open every
+        input to find its rates.
 
-    # If a template is provided, use its geometry for target figures
-    if template:
-        temp = gdal.Open(template)
-        spatial_ref.ImportFromWkt(temp.GetProjection())
-        srs = spatial_ref.ExportToProj4()
-        width = temp.RasterXSize  # consider using these warp options
-        height = temp.RasterYSize
-        transform = temp.GetGeoTransform()
-        xmin, xres, xrot, ymax, yrot, yres = transform
-        xs = [xmin + xres * i for i in range(width)]
-        ys = [ymax + yres * i for i in range(height)]
-        xmax = max(xs) + 0.5*xres
-        ymax = ymax + 0.5*xres
-        ymin = min(ys)
-        extent = [xmin, ymin, xmax, ymax]
-        kwargs["dstSRS"] = srs
-        kwargs["outputBounds"] = extent
-        kwargs["xRes"] = transform[1]
-        kwargs["yRes"] = transform[-1]  # careful here
-        kwargs["outputType"] = dtype
-    elif not kwargs:
-        print("No warp options provided.")
-        gdal_options("warp")
-        return
+        Parameters
+        ----------
+        pixels : int
+            Number of grid cells the task will process. (defaults to None)
+        nbytes : int
+            Number of bytes the task will process. (defaults to None)
 
-    # Get source srs
-    source = gdal.Open(src)
-    spatial_ref.ImportFromWkt(source.GetProjection())
-    srs = spatial_ref.ExportToProj4()
-    kwargs["srcSRS"] = srs
+        Returns
+        -------
+        bool
+            Whether there was a task to report to.
+        """
 
-    # Use the progress callback
-    kwargs["callback"] = gdal_progress
+        if Pool_Progress._task is None:
+            return False
+        i = 2 * Pool_Progress._task
+        Pool_Progress._sizes[i] = pixels or 0
+        Pool_Progress._sizes[i + 1] = nbytes or 0
+        return True
 
-    # Compress
-    if compress:
-        kwargs["creationOptions"] = ["COMPRESS=" + compress]
 
-    # Check Options: https://gdal.org/python/osgeo.gdal-module.html#WarpOptions
-    ops = gdal_options("warp", **kwargs)
+# A shared progress callback for GDAL functions
+gdal_progress = Progress()
 
-    # Call
-    print("Processing " + dst + " :")
-    ds = gdal.Warp(dst, src, options=ops)
-    del ds
 
+class Raster_Writer:
+    """Write a GeoTiff incrementally, one window at a time, so that outputs
+    larger than memory can be written block by block."""
 
-# CLASSES
-class Data_Path:
-    """Data_Path joins a root directory path to data file paths."""
+    def __init__(self, savepath, nx, ny, nbands=1, crs=None, geometry=None,
+                 template=None, dtype=gdal.GDT_Float32, compress=None,
+                 navalue=-9999, **kwargs):
+        """Initialize Raster_Writer and create the target raster file.
 
-    def __init__(self, data_path):
-        """Initialize Data_Path."""
+        Parameters
+        ----------
+        savepath : str
+            Path to the target raster file.
+        nx : int
+            Number of x-axis grid cells.
+        ny : int
+            Number of y-axis grid cells.
+        nbands : int
+            Number of bands. (defaults to 1)
+        crs : str
+            Coordinate reference system in Well-Known Text format.
+        geometry : tuple
+            Affine transformation information in this order:
+                (top left x coordinate, x resolution, row rotation,
+                top left y coordinate, column rotation, y resolution)
+        template : str
+            Path to a raster file with desired target raster geometry and
+            crs. This will overwrite other arguments provided for these
+            parameters.
+        dtype : str | gdal object
+            GDAL data type. Can be a string or a gdal type object (e.g.
+            gdal.GDT_Float32, "GDT_Float32", "float32").
+        compress : str
+            A compression technique. Available options are "DEFLATE",
+            "JPEG", "LZW"
+        navalue : int | float
+            The number used for non-values in the raster data set. Defaults
+            to -9999.
+        **kwargs
+            Any GeoTiff creation options, e.g. tiled=True, blockxsize=512,
+            predictor=2, num_threads="ALL_CPUS", bigtiff="IF_SAFER". See
+            creation_options.
+        """
 
-        self.data_path = data_path
-        self._expand_check()
-        self._exist_check()
+        self.savepath = savepath
+        self.nbands = nbands
+
+        # Specifying data types shouldn't be so difficult
+        if isinstance(dtype, str):
+            dtype = dtype.lower().replace("gdt_", "")
+            try:
+                dtype = GDAL_TYPEMAP[dtype]
+            except KeyError:
+                print("\n'" + dtype + "' is not an available data type. "
+                      "Choose a value from this list:")
+                print(str(list(GDAL_TYPEMAP.keys())))
+
+        # Use a template file to extract affine transformation and crs
+        if template:
+            template_info = DATASET_CACHE.info(template)
+            geometry = template_info["geometry"]
+            crs = template_info["crs"]
+
+        # Create file
+        driver = gdal.GetDriverByName("GTiff")
+        options = creation_options(compress, **kwargs)
+        self.image = driver.Create(savepath.encode('utf-8'), nx, ny, nbands,
+                                   dtype, options=options)
+
+        # Write attributes to file
+        if geometry:
+            self.image.SetGeoTransform(geometry)
+        if crs:
+            self.image.SetProjection(crs)
+        for band in range(1, nbands + 1):
+            self.image.GetRasterBand(band).SetNoDataValue(navalue)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __setitem__(self, key, array):
+        """Write an array into the window covered by a tuple of slices, so
+        that dask.array.store can write chunks."""
+
+        rows, cols = key[-2:]
+        if len(key) == 3:
+            for i, layer in enumerate(array, key[0].start or 0):
+                self.write(layer, cols.start or 0, rows.start or 0, i + 1)
+        else:
+            self.write(array, cols.start or 0, rows.start or 0)
 
     def __repr__(self):
 
-        items = ["=".join([str(k), str(v)]) for k, v in self.__dict__.items()]
-        arguments = " ".join(items)
-        msg = "".join(["<Data_Path " + arguments + ">"])
+        msg = "<Raster_Writer savepath={} nbands={}>".format(self.savepath,
+                                                            self.nbands)
         return msg
 
-    def join(self, *args):
-        """Join a file path to the root directory path"""
+    def close(self):
+        """Flush everything to disk and close the raster file."""
 
-        return os.path.join(self.data_path, *args)
+        if self.image is not None:
+            self.image.FlushCache()
+            self.image = None
 
-    def contents(self, *args):
-        """List all content in the data_path or in sub directories."""
+    def write(self, array, xoff=0, yoff=0, band=None):
+        """Write an array into a window of the raster file.
 
-        items = glob(self.join(*args, "*"))
+        Parameters
+        ----------
+        array : numpy.ndarray
+            A 2D array for one band or a 3D array with one layer per band.
+        xoff : int
+            The x-axis grid cell offset of the window. (defaults to 0)
+        yoff : int
+            The y-axis grid cell offset of the window. (defaults to 0)
+        band : int
+            The band number to write a 2D array to. Defaults to 1 for 2D
+            arrays and is ignored for 3D arrays.
 
-        return items
+        Returns
+        -------
+        None.
+        """
 
-    def folders(self, *args):
-        """List folders in the data_path or in sub directories."""
+        if array.ndim == 3:
+            for i, layer in enumerate(array):
+                self.image.GetRasterBand(i + 1).WriteArray(layer, xoff, yoff)
+        else:
+            band = band or 1
+            self.image.GetRasterBand(band).WriteArray(array, xoff, yoff)
 
-        items = self.contents(*args)
-        folders = [i for i in items if os.path.isdir(i)]
 
-        return folders
+class Result_Cache:
+    """An opt-in, on-disk cache of output rasters for warp, translate, and
+    rasterize.
 
-    def files(self, *args):
-        """List files in the data_path or in sub directories."""
+    Results are keyed by a hash of the function name, the identity of each
+    input file, and the normalized options. Hits are copied to the requested
+    path, or hard linked with link=True. Each result's last use is kept on a
+    small ".used" file next to it rather than on the result itself, so a hit
+    never changes an output's modification time. When the cache grows past
+    max_size, the least recently used results are removed.
 
-        items = self.contents(*args)
-        folders = [i for i in items if os.path.isfile(i)]
-        print(self.join(*args))
+    A hard linked output and its cache entry are the same file. Opening the
+    output in place, e.g. with gdal.GA_Update to build overviews, silently
+    changes the cached result for every later hit too.
 
-        return folders
+    Example:
+        cache = Result_Cache("~/.cache/gdalmethods", max_size=50e9)
+        warp(src, dst, template=grid, cache=cache)
+    """
 
-    def _expand_check(self):
+    def __init__(self, folder, max_size=10e9, digest=False, link=False):
+        """Initialize Result_Cache.
 
-        # Expand the user path if a tilda is present in the root folder path.
-        if "~" in self.data_path:
-            self.data_path = os.path.expanduser(self.data_path)
+        Parameters
+        ----------
+        folder : str
+            Path to a folder to store results in. Will be created if it does
+            not exist.
+        max_size : int | float
+            The most bytes to store. (defaults to 10 GB)
+        digest : boolean
+            Identify inputs by a SHA-256 digest of their contents rather than
+            their path, size, and modification time. Slower, but survives
+            copies and touches. (defaults to False)
+        link : boolean
+            Serve hits and store results with hard links where possible
+            rather than copies. Faster and smaller, but an output edited in
+            place corrupts its cache entry. (defaults to False)
+        """
 
-<<<<<<< HEAD
-    def _exist_check(self):
-        
-        # Make sure the data path exists.
-        if not os.path.exists(self.data_path):
-            os.makedirs(self.data_path, exist_ok=True)
-=======
-        # Make sure path exists
-        os.makedirs(self.folder_path, exist_ok=True)
+        self.folder = os.path.expanduser(folder)
+        self.max_size = max_size
+        self.digest = digest
+        self.link = link
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.folder, exist_ok=True)
 
->>>>>>> 7d72b59f8f052c79cb5b4c9ac6412f4209066749
+    def __repr__(self):
 
-        
-class Map_Values:
-    """Map a set of keys from an input raster (or rasters) to values in an
-    output raster (or rasters) using a dictionary of key-value pairs."""
+        msg = "<Result_Cache folder={} size={:,} hits={} misses={}>".format(
+            self.folder, self.size(), self.hits, self.misses
+        )
+        return msg
 
-    def __init__(self, val_dict, err_val=-9999):
-        """Initialize Map_Values.
+    def get(self, key, dst):
+        """Place a cached result at dst, if there is one.
 
         Parameters
         ----------
-        val_dict : dict
-            A dictionary of key-value pairs
-        errval : int | float
-            A value to assign where there are no matching keys in val_dict.
+        key : str
+            A key from Result_Cache.key.
+        dst : str
+            Path to the target file.
+
+        Returns
+        -------
+        boolean
+            Whether the result was cached.
         """
-        self.val_dict = val_dict
-        self.err_val = err_val
 
-    def map_file(self, src, dst):
-        """Take an input raster file, map values from a dictionary to an output
-        raster file.
+        entry = self._entry(key, dst)
+        if not os.path.exists(entry):
+            self.misses += 1
+            return False
+
+        # Mark it as recently used and serve it
+        self._touch(entry)
+        self._place(entry, dst)
+        self.hits += 1
+
+        return True
+
+    def key(self, name, inputs, options):
+        """Hash a function name, its input files, and its options.
 
         Parameters
         ----------
-        src : str
-            Path to the input raster file.
-        dst : str
-            Path to the output raster file. Directory will be created if it
-            does not exist.
+        name : str
+            The function name.
+        inputs : list-like
+            Paths to each input dataset. Every file GDAL reads for a dataset
+            is identified, e.g. a shapefile's .dbf and .prj files or a VRT's
+            sources. Missing inputs (None) are skipped.
+        options : dict
+            Every option that changes the output. Values that aren't JSON
+            serializable are hashed by their string representation.
 
         Returns
         -------
-        None.
+        str
+            A hexadecimal SHA-256 hash.
         """
 
-        # Create the output path
-        out_folder = os.path.dirname(dst)
-        os.makedirs(out_folder, exist_ok=True)
-
-        # Bundle the arguments for map_single (single function)
-        arg = [src, dst, self.val_dict]
+        identity = {"name": name,
+                    "inputs": [[self._identity(file)
+                                for file in self._files(path)]
+                               for path in inputs if path is not None],
+                    "options": options}
+        text = json.dumps(identity, sort_keys=True, default=str)
 
-        # Run it
-        self._map_single(arg)
+        return hashlib.sha256(text.encode()).hexdigest()
 
-    def map_files(self, src_files, out_folder, ncpu):
-        """Take a list of tiled raster files, map values from a dictionary to
-        a list of output raster files.
+    def put(self, key, src):
+        """Add a result file to the cache and evict old results.
 
         Parameters
         ----------
-        src_files : list-like
-            A list of paths to raster files.
-        outfolder : str
-            A path to a target directory to store output files. Will be
-            created if it does not exist.
-        ncpu : int
-            The number of cpus to use for multiprocessing.
+        key : str
+            A key from Result_Cache.key.
+        src : str
+            Path to the result file.
 
         Returns
         -------
-        outfiles : list
-            A list of paths to output files.
+        None.
         """
 
-        # Create the output paths
-        os.makedirs(out_folder, exist_ok=True)
-        dst_files = []
-        for file in src_files:
-            dst_file = os.path.basename(file)
-            dst_files.append(os.path.join(out_folder, dst_file))
+        if not os.path.isfile(src):
+            return
 
-        # Bundle the arguments for map_single (single function)
-        dicts = [self.val_dict.copy() for i in range(len(dst_files))]
-        args = list(zip(src_files, dst_files, dicts))
+        # Land the entry in one step so readers never see half of it
+        entry = self._entry(key, src)
+        temp = entry + ".{}.tmp".format(os.getpid())
+        self._place(src, temp)
+        os.replace(temp, entry)
+        self._touch(entry)
 
-        # Run it
-        with Pool(ncpu) as pool:
-            for _ in tqdm(pool.imap(self._map_single, args), position=0,
-                          total=len(dst_files), file=sys.stdout):
+        self._evict()
+
+    def size(self):
+        """Return the total size of the cached results in bytes."""
+
+        return sum(size for _, size, _ in self._entries())
+
+    def _entries(self):
+        """Return the path, size, and last use time of each result."""
+
+        entries = []
+        for name in os.listdir(self.folder):
+            path = os.path.join(self.folder, name)
+            if name.endswith((".tmp", ".used")) or not os.path.isfile(path):
+                continue
+            stat = os.stat(path)
+            used = path + ".used"
+            if os.path.exists(used):
+                last_use = os.stat(used).st_mtime
+            else:
+                last_use = stat.st_mtime
+            entries.append((path, stat.st_size, last_use))
+
+        return entries
+
+    def _entry(self, key, path):
+        """Return the cache path for a key, with the result's extension."""
+
+        return os.path.join(self.folder, key + os.path.splitext(path)[1])
+
+    def _evict(self):
+        """Remove the least recently used results until under max_size."""
+
+        entries = sorted(self._entries(), key=lambda e: e[2])
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_size:
+                break
+            os.remove(path)
+            if os.path.exists(path + ".used"):
+                os.remove(path + ".used")
+            total -= size
+
+    @staticmethod
+    def _files(path):
+        """Return every file GDAL reads for a dataset, or just the path if
+        GDAL can't open it."""
+
+        try:
+            ds = gdal.OpenEx(path)
+            files = ds.GetFileList() or []
+            del ds
+        except RuntimeError:
+            files = []
+
+        return sorted(set(files)) or [path]
+
+    def _identity(self, path):
+        """Identify an input by its contents or its path, size, and
+        modification time."""
+
+        # Virtual file systems and folders (e.g. ESRI grids)
+        if path.startswith("/vsi"):
+            stat = gdal.VSIStatL(path)
+            if stat is None:
+                return path
+            return [path, stat.size, stat.mtime]
+        if os.path.isdir(path):
+            files = sorted(glob(os.path.join(path, "**", "*"), recursive=True))
+            return [self._identity(file) for file in files
+                    if os.path.isfile(file)]
+
+        if not os.path.exists(path):
+            return path
+        path = os.path.abspath(path)
+        if self.digest:
+            sha = hashlib.sha256()
+            with open(path, "rb") as file:
+                for chunk in iter(lambda: file.read(2 ** 20), b""):
+                    sha.update(chunk)
+            return sha.hexdigest()
+
+        stat = os.stat(path)
+        return [path, stat.st_size, stat.st_mtime_ns]
+
+    def _place(self, src, dst):
+        """Hard link a file, or copy it if linking isn't possible."""
+
+        if os.path.exists(dst):
+            os.remove(dst)
+        if self.link:
+            try:
+                os.link(src, dst)
+                return
+            except OSError:
                 pass
+        shutil.copy2(src, dst)
 
-        # Return the output file paths
-        return dst_files
+    @staticmethod
+    def _touch(entry):
+        """Mark a result as just used on its ".used" file."""
 
-    def _map_single(self, arg, overwrite=True):
-        """Map dictionary values from one raster file to another.
+        used = entry + ".used"
+        with open(used, "a"):
+            pass
+        os.utime(used)
+
+
+class Zonal_Stats:
+    """Summarize the values of aligned rasters within the polygons of a
+    vector file, block by block."""
+
+    # The Zonal_Stats each worker process receives once at start up
+    _worker = None
+
+    def __init__(self, zones, attribute, template, all_touch=False):
+        """Initialize Zonal_Stats and rasterize the zones to a temporary,
+        tiled GeoTiff on the template's grid.
 
         Parameters
         ----------
-        arg : list-like
-            A list containing an input raster file path, and output raster file
-            path and a dictionary (bundled for multiprocessing).
+        zones : str
+            Path to a vector file of zone polygons.
+        attribute : str
+            The name of the field identifying each zone.
+        template : str
+            Path to a raster file with the grid the summarized rasters share.
+        all_touch : boolean
+            Wether or not to count all grid cells that touch a zone.
+            (defaults to False)
+        """
+
+        self.attribute = attribute
+        self.template = template
+
+        # The grid every summarized raster must share
+        info = DATASET_CACHE.info(template)
+        self.nx = info["nx"]
+        self.ny = info["ny"]
+        self.geometry = info["geometry"]
+        self.crs = info["crs"]
+
+        # Workers read the zones from disk block by block, only this process
+        # removes them
+        self._pid = os.getpid()
+        self._folder = tempfile.mkdtemp(prefix="zones_")
+        self.path = os.path.join(self._folder, "zones.tif")
+        self.zone_ids = self._burn_zones(zones, all_touch)
+
+    def __repr__(self):
+
+        msg = "<Zonal_Stats attribute={} zones={} template={}>".format(
+            self.attribute, self.zone_ids.size, self.template
+        )
+        return msg
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, *args):
+
+        self.close()
+
+    def __del__(self):
+
+        self.close()
+
+    def close(self):
+        """Remove the rasterized zones."""
+
+        folder = getattr(self, "_folder", None)
+        if os.getpid() == getattr(self, "_pid", None) and folder:
+            shutil.rmtree(folder, ignore_errors=True)
+
+    def stats(self, rasters, ncpu=1):
+        """Summarize one or more rasters within each zone.
+
+        Parameters
+        ----------
+        rasters : str | list
+            Path to a raster file, or a list of paths to raster files, on
+            the template's grid.
+        ncpu : int
+            Number of cpus to use for processing several rasters.
 
         Returns
         -------
-        None.
+        pandas.core.frame.DataFrame
+            count, sum, mean, min, max, and std in each zone, indexed by
+            zone. A list of rasters adds a raster path level to the index.
         """
 
-        # Get arguments
-        src = arg[0]
-        dst = arg[1]
-        val_dict = arg[2]
-
-        # overwrite
-        if os.path.exists(dst): 
-            if overwrite:
-                os.remove(dst)
+        # A single raster gets a single table
+        if isinstance(rasters, str):
+            return self._stats_single(rasters)
+
+        # Send the zones to each worker once, they read them from disk
+        if ncpu > 1:
+            pixels = len(rasters) * self.nx * self.ny
+            progress = Pool_Progress(len(rasters), pixels, desc="Summarizing")
+            initializer = progress.initializer(Zonal_Stats._init_worker,
+                                               (self,))
+            with Pool(ncpu, *initializer) as pool:
+                frames = list(progress.imap(pool, Zonal_Stats._stats_worker,
+                                            rasters))
+        else:
+            frames = [self._stats_single(raster) for raster in rasters]
 
-        # Try to map values from the mapvals dictionary to a new raster
-        if not os.path.exists(dst):
-            ds = gdal.Open(src)
-            crs = ds.GetProjection()
-            geom = ds.GetGeoTransform()
-            array = ds.ReadAsArray()
-            try:
-                new_array = np.vectorize(self._map_try)(val_dict, array)
-                to_raster(new_array, dst, crs, geom, navalue=-9999)
-            except Exception as error:
-                print("\n")
-                print(src + ": ")
-                print(error)
-                print("\n")
-                raise
+        return pd.concat(frames, keys=rasters, names=["raster"])
 
-    def _map_try(self, val_dict, key):
-        """Use a key to return a dictionary value, return a specified value for
-        exceptions.
+    def _burn_zones(self, zones, all_touch):
+        """Number each zone and burn the numbers into self.path, -1 where
+        there are none.
 
         Parameters
         ----------
-        val_dict : dict
-            A dictionary of values.
-        key : str | int | float
-            A key that corresponds to a value in val_dict.
+        zones : str
+            Path to a vector file of zone polygons.
+        all_touch : boolean
+            Wether or not to count all grid cells that touch a zone.
 
         Returns
         -------
-        x : int | float
-            The value from val_dict corresponding with the key.
+        numpy.ndarray
+            The zone values in the order of their numbers.
         """
 
-        # Try to retrieve a value with the key
-        try:
-            x = val_dict[key]
+        # Open the zones and find the attribute
+        src_data = ogr.Open(zones)
+        layer = src_data.GetLayer()
+        field = layer.GetLayerDefn().GetFieldIndex(self.attribute)
+        if field < 0:
+            raise KeyError("Attribute(s) not found in " + zones + ": "
+                           + self.attribute)
+
+        # Number the zones, polygons without a zone value are skipped
+        values = [feature.GetField(field) for feature in layer]
+        zone_ids = np.unique([v for v in values if v is not None])
+        numbers = {v: i for i, v in enumerate(zone_ids.tolist())}
+
+        # An in memory layer holding each polygon's zone number
+        memory = ogr.GetDriverByName("Memory").CreateDataSource("")
+        code_layer = memory.CreateLayer("zones", layer.GetSpatialRef(),
+                                        layer.GetGeomType())
+        code_layer.CreateField(ogr.FieldDefn("zone", ogr.OFTInteger))
+        code_defn = code_layer.GetLayerDefn()
+        layer.ResetReading()
+        for value, src_feature in zip(values, layer):
+            if value is None:
+                continue
+            feature = ogr.Feature(code_defn)
+            feature.SetField(0, numbers[value])
+            feature.SetGeometry(src_feature.GetGeometryRef())
+            code_layer.CreateFeature(feature)
+
+        # Burn the numbers into a tiled file, GDAL writes it in chunks
+        trgt = gdal.GetDriverByName("GTiff").Create(
+            self.path, self.nx, self.ny, 1, gdal.GDT_Int32,
+            ["TILED=YES", "COMPRESS=DEFLATE", "BIGTIFF=IF_SAFER"]
+        )
+        trgt.SetGeoTransform(self.geometry)
+        trgt.SetProjection(self.crs)
+        band = trgt.GetRasterBand(1)
+        band.SetNoDataValue(-1)
+        band.Fill(-1)
+        ops = ["ATTRIBUTE=zone"]
+        if all_touch is True:
+            ops.append("ALL_TOUCHED=TRUE")
+        gdal.RasterizeLayer(trgt, [1], code_layer, options=ops)
+
+        # Close target and source data sets
+        del band, trgt
+        del memory, src_data
+
+        return zone_ids
+
+    @staticmethod
+    def _init_worker(zonal):
+        """Store the zones in a worker process (a Pool initializer)."""
+
+        Zonal_Stats._worker = zonal
+
+    @staticmethod
+    def _stats_worker(raster):
+        """Run _stats_single with the worker process' stored zones."""
+
+        return Zonal_Stats._worker._stats_single(raster)
+
+    def _stats_single(self, raster):
+        """Summarize one raster within each zone, block by block.
 
-        # Return a specified error value if the key is not present
-        except KeyError:
-            x = self.err_val
+        Parameters
+        ----------
+        raster : str
+            Path to a raster file on the template's grid.
 
-        return x
+        Returns
+        -------
+        pandas.core.frame.DataFrame
+            count, sum, mean, min, max, and std in each zone.
+        """
+
+        # Make sure this raster shares the zones' grid
+        info = DATASET_CACHE.info(raster)
+        aligned = ((info["nx"], info["ny"]) == (self.nx, self.ny)
+                   and np.allclose(info["geometry"], self.geometry))
+        if aligned and info["crs"] != self.crs:
+            refs = osr.SpatialReference()
+            refs.ImportFromWkt(self.crs)
+            crs = osr.SpatialReference()
+            crs.ImportFromWkt(info["crs"])
+            aligned = bool(refs.IsSame(crs))
+        if not aligned:
+            raise ValueError(raster + " is not aligned with " + self.template)
+
+        # Read the zones alongside each block
+        zone_data = gdal.Open(self.path)
+        zone_band = zone_data.GetRasterBand(1)
+
+        # Running totals for each zone
+        nzones = self.zone_ids.size
+        count = np.zeros(nzones)
+        total = np.zeros(nzones)
+        sqdev = np.zeros(nzones)
+        mins = np.full(nzones, np.inf)
+        maxs = np.full(nzones, -np.inf)
+
+        ncells = self.nx * self.ny
+        for (xoff, yoff, xsize, ysize), array in read_blocks(raster):
+            Progress.report((yoff * self.nx + (xoff + xsize) * ysize) / ncells)
+
+            # Keep cells with a zone and a value
+            zones = zone_band.ReadAsArray(xoff, yoff, xsize, ysize)
+            keep = (zones >= 0) & ~np.ma.getmaskarray(array)
+            codes = zones[keep]
+            vals = array.data[keep].astype(np.float64)
+            if not codes.size:
+                continue
+
+            # Summarize this block
+            n = np.bincount(codes, minlength=nzones)
+            block_total = np.bincount(codes, weights=vals, minlength=nzones)
+            block_mean = block_total / np.maximum(n, 1)
+            deviations = (vals - block_mean[codes]) ** 2
+            block_sqdev = np.bincount(codes, weights=deviations,
+                                      minlength=nzones)
+            np.minimum.at(mins, codes, vals)
+            np.maximum.at(maxs, codes, vals)
+
+            # Combine squared deviations from the two means (Chan et al.)
+            mean = total / np.maximum(count, 1)
+            combined = count + n
+            sqdev += (block_sqdev + (block_mean - mean) ** 2 * count * n
+                      / np.maximum(combined, 1))
+            total += block_total
+            count = combined
+
+        # Zones without any values get NaNs
+        empty = count == 0
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = total / count
+            std = np.sqrt(sqdev / count)
+        mins[empty] = np.nan
+        maxs[empty] = np.nan
+
+        stats = pd.DataFrame({"count": count.astype(np.int64), "sum": total,
+                              "mean": mean, "min": mins, "max": maxs,
+                              "std": std},
+                             index=pd.Index(self.zone_ids,
+                                            name=self.attribute))
+
+        # Close the zones
+        del zone_band, zone_data
+
+        return stats
@@ -45,5 +45,8 @@ setup(
                       'geopandas',
                       'shapely',
                       'rasterio',
-                      'tqdm']
+                      'tqdm',
+                      'dask[array]'],
+    # The tests need the GDAL bindings that match the system's GDAL
+    extras_require={'test': ['pytest', 'gdal==' + gdal_version]}
 )
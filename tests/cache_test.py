@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the dataset cache.
+"""
+from osgeo import gdal
+from gdalmethods import Dataset_Cache
+
+
+# Constants
+SRCS = ["/vsimem/cache_test_{}.tif".format(i) for i in range(3)]
+
+# Create a few small rasters in memory
+for src in SRCS:
+    DS = gdal.GetDriverByName("GTiff").Create(src, 4, 3, 1, gdal.GDT_Int16)
+    DS.SetGeoTransform((0, 1, 0, 3, 0, -1))
+    DS.GetRasterBand(1).SetNoDataValue(-1)
+    DS = None
+
+
+# Tests
+def test_hits():
+    """Test that repeat opens come from the cache."""
+    cache = Dataset_Cache()
+    first = cache.open(SRCS[0])
+    assert cache.open(SRCS[0]) is first
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_info():
+    """Test that metadata is read from the dataset."""
+    info = Dataset_Cache().info(SRCS[0])
+    assert (info["nx"], info["ny"], info["navalue"]) == (4, 3, -1)
+    assert info["dtype"] == gdal.GDT_Int16
+
+
+def test_eviction():
+    """Test that the least recently used dataset is dropped first."""
+    cache = Dataset_Cache(maxsize=2)
+    for src in SRCS:
+        cache.open(src)
+    assert len(cache) == 2
+    cache.open(SRCS[0])
+    assert cache.misses == 4
+
+
+def test_invalidate():
+    """Test that invalidated datasets are opened again."""
+    cache = Dataset_Cache()
+    cache.open(SRCS[0])
+    cache.invalidate(SRCS[0])
+    cache.open(SRCS[0])
+    assert cache.misses == 2
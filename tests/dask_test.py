@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for dask arrays of rasters.
+"""
+import os
+import numpy as np
+from osgeo import gdal
+from gdalmethods import Map_Values, read_dask, to_raster, write_dask
+
+
+# Constants
+ARRAY = np.arange(40 * 50, dtype=np.int16).reshape(40, 50) % 4
+ARRAY[0, 0] = -1
+GEOMETRY = (0, 1, 0, 40, 0, -1)
+
+
+# Tests
+def test_round_trip(tmp_path):
+    """Test that blocks become chunks and mapped chunks write back out."""
+    src = os.path.join(tmp_path, "keys.tif")
+    dst = os.path.join(tmp_path, "values.tif")
+    to_raster(ARRAY, src, geometry=GEOMETRY, dtype="int16", navalue=-1,
+              tiled=True, blockxsize=16, blockysize=16)
+
+    array = read_dask(src, masked=True)
+    assert array.chunks[0][0] == 16 and array.chunks[1][0] == 16
+
+    mapped = Map_Values({0: 1.5, 1: 2.5, 2: 3.5, 3: 4.5}).map_dask(array)
+    write_dask(mapped, dst, geometry=GEOMETRY, dtype="float32",
+               navalue=-9999)
+
+    expected = np.where(ARRAY == -1, -9999, ARRAY + 1.5)
+    assert np.array_equal(gdal.Open(dst).ReadAsArray(), expected)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for downloads, against a local HTTP server.
+"""
+import os
+import threading
+import zipfile
+from http.server import HTTPServer, SimpleHTTPRequestHandler
+from functools import partial
+import numpy as np
+from gdalmethods import (dlzip, download, download_many, read_raster,
+                         to_raster)
+
+
+# Constants
+DATA = bytes(range(256)) * 400
+
+
+# Helpers
+class Range_Handler(SimpleHTTPRequestHandler):
+    """Serve files with support for "Range: bytes=N-" and "bytes=N-M"
+    requests, and 416 responses for ranges past the end."""
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        if not os.path.isfile(path):
+            self.send_error(404)
+            return None
+        with open(path, "rb") as file:
+            data = file.read()
+        start, end = 0, len(data) - 1
+        if "Range" in self.headers:
+            first, last = self.headers["Range"].split("=")[1].split("-")
+            start = int(first)
+            if start >= len(data):
+                self.send_response(416)
+                self.send_header("Content-Range",
+                                 "bytes */{}".format(len(data)))
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return None
+            end = min(int(last), end) if last else end
+            self.send_response(206)
+            self.send_header("Content-Range", "bytes {}-{}/{}".format(
+                start, end, len(data)
+            ))
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", str(end + 1 - start))
+        self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(data[start: end + 1])
+        return None
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(folder):
+    """Start a server for a folder in a thread and return its url."""
+    handler = partial(Range_Handler, directory=str(folder))
+    server = HTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, "http://127.0.0.1:{}/".format(server.server_port)
+
+
+# Tests
+def test_resume(tmp_path):
+    """Test that a partial download only fetches the rest of the file."""
+    (tmp_path / "data.bin").write_bytes(DATA)
+    server, url = serve(tmp_path)
+    dst = os.path.join(tmp_path, "copy.bin")
+    with open(dst + ".part", "wb") as file:
+        file.write(DATA[:1000])
+    download(url + "data.bin", dst, chunk_size=4096)
+    server.shutdown()
+    with open(dst, "rb") as file:
+        assert file.read() == DATA
+    assert not os.path.exists(dst + ".part")
+
+
+def test_stale_part(tmp_path):
+    """Test that part files that can't belong to the remote file are started
+    over, and a complete one is kept."""
+    (tmp_path / "data.bin").write_bytes(DATA)
+    server, url = serve(tmp_path)
+    for i, stale in enumerate([DATA + b"extra", DATA]):
+        dst = os.path.join(tmp_path, "copy_{}.bin".format(i))
+        with open(dst + ".part", "wb") as file:
+            file.write(stale)
+        download(url + "data.bin", dst)
+        with open(dst, "rb") as file:
+            assert file.read() == DATA
+        assert not os.path.exists(dst + ".part")
+    server.shutdown()
+
+
+def test_many(tmp_path):
+    """Test concurrent downloads, unzipping, and failure reporting."""
+    with zipfile.ZipFile(tmp_path / "archive.zip", "w") as zip_ref:
+        zip_ref.writestr("inner.bin", DATA)
+    server, url = serve(tmp_path)
+    out = tmp_path / "out"
+    out.mkdir()
+    paths = [str(out / "archive.zip"), str(out / "missing.zip")]
+    status = download_many([url + "archive.zip", url + "missing.zip"],
+                           paths, max_workers=2, unzip=True, retries=0)
+    server.shutdown()
+    assert list(status["status"]) == ["downloaded", "failed"]
+    assert (out / "archive" / "inner.bin").read_bytes() == DATA
+    assert not (out / "archive.zip").exists()
+    assert dlzip(url + "archive.zip", paths[0]) == str(out / "archive")
+
+
+def test_vsizip(tmp_path):
+    """Test reading rasters inside kept and remote archives in place."""
+    array = np.arange(12, dtype=np.float32).reshape(3, 4)
+    raster = os.path.join(tmp_path, "grid.tif")
+    to_raster(array, raster, geometry=(0, 1, 0, 3, 0, -1))
+    with zipfile.ZipFile(tmp_path / "rasters.zip", "w") as zip_ref:
+        zip_ref.write(raster, "monthly/grid.tif")
+        zip_ref.writestr("monthly/readme.txt", "not a raster")
+    server, url = serve(tmp_path)
+    out = tmp_path / "out"
+    out.mkdir()
+
+    kept = dlzip(url + "rasters.zip", str(out / "rasters.zip"),
+                 extract=False, pattern="*.tif")
+    remote = dlzip(url + "rasters.zip", None, remote=True, pattern="*.tif")
+    for paths in [kept, remote]:
+        assert len(paths) == 1 and paths[0].startswith("/vsizip/")
+        assert np.array_equal(read_raster(paths[0])[0], array)
+    server.shutdown()
+
+    assert remote[0].startswith("/vsizip//vsicurl/http")
+    assert (out / "rasters.zip").exists()
+    assert not (out / "rasters").exists()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the Map_Values lookup engine.
+"""
+import os
+import numpy as np
+from osgeo import gdal, osr
+from gdalmethods import Map_Values, to_raster
+
+
+# Constants
+VAL_DICT = {1: 10.5, 2: 20.5, 300: 30.5, -4: 40.5}
+ERR_VAL = -9999
+
+
+# Helpers
+def expected(array):
+    """Map values the slow way, one dictionary lookup at a time."""
+    lookup = lambda k: VAL_DICT.get(k, ERR_VAL)
+    return np.vectorize(lookup, otypes=[np.float64])(array)
+
+
+# Tests
+def test_integer_types():
+    """Test that each integer lookup path matches the dictionary."""
+    mapper = Map_Values(VAL_DICT, ERR_VAL)
+    array = np.arange(-10, 310).reshape(20, 16)
+    for dtype in [np.uint8, np.int16, np.uint16, np.int32, np.int64]:
+        keys = array.astype(dtype)
+        assert np.array_equal(mapper.map_array(keys), expected(keys))
+
+
+def test_float_keys():
+    """Test that float arrays use exact matches and miss NaNs."""
+    mapper = Map_Values(VAL_DICT, ERR_VAL)
+    keys = np.array([[1.0, 1.5], [np.nan, 300.0]])
+    assert np.array_equal(mapper.map_array(keys), expected(keys))
+
+
+def test_sparse_keys():
+    """Test that keys too far apart for a dense table still map."""
+    mapper = Map_Values({0: 1, 10 ** 12: 2}, ERR_VAL)
+    keys = np.array([0, 5, 10 ** 12], dtype=np.int64)
+    assert list(mapper.map_array(keys)) == [1, ERR_VAL, 2]
+
+
+def test_dtype():
+    """Test that the output type holds both the values and err_val."""
+    mapper = Map_Values(VAL_DICT, ERR_VAL)
+    assert mapper.map_array(np.zeros(4, dtype=np.uint8)).dtype == np.float64
+
+
+def test_stream(tmp_path):
+    """Test that streaming with uneven windows writes the same raster,
+    non-values included, as mapping the whole array."""
+    src = os.path.join(tmp_path, "keys.tif")
+    keys = (np.arange(37 * 23).reshape(23, 37) % 5).astype(np.int16)
+    keys[0, 0] = keys[22, 36] = -1
+    crs = osr.SpatialReference()
+    crs.ImportFromEPSG(4326)
+    to_raster(keys, src, crs.ExportToWkt(), (0, 1, 0, 23, 0, -1),
+              dtype="int16", navalue=-1)
+
+    outputs = []
+    for stream in [False, True]:
+        dst = os.path.join(tmp_path, "values_{}.tif".format(stream))
+        Map_Values(VAL_DICT, ERR_VAL, stream=stream, window=(8, 5)).map_file(
+            src, dst
+        )
+        outputs.append(gdal.Open(dst))
+
+    whole, streamed = outputs
+    assert np.array_equal(whole.ReadAsArray(), streamed.ReadAsArray())
+    assert np.array_equal(streamed.ReadAsArray(), expected(keys))
+    assert streamed.GetGeoTransform() == whole.GetGeoTransform()
+    for ds in outputs:
+        assert ds.GetRasterBand(1).GetNoDataValue() == ERR_VAL
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for lazy raster pipelines.
+"""
+import os
+import tempfile
+import numpy as np
+from osgeo import gdal, osr
+from gdalmethods import Pipeline, to_raster
+
+
+# Constants
+ARRAY = np.arange(30 * 20, dtype=np.int16).reshape(30, 20) % 5
+VALUES = {0: 10, 1: 20, 2: 30, 3: 40, 4: 50}
+
+
+# Tests
+def test_chain(tmp_path):
+    """Test that warp, map, and translate steps only write the final file."""
+    src = os.path.join(tmp_path, "source.tif")
+    dst = os.path.join(tmp_path, "final.tif")
+    crs = osr.SpatialReference()
+    crs.ImportFromEPSG(4326)
+    to_raster(ARRAY, src, crs.ExportToWkt(), (0, 1, 0, 30, 0, -1),
+              dtype="int16")
+
+    pipe = Pipeline(src)
+    pipe.warp(dstSRS="epsg:4326", xRes=1, yRes=1).map_values(VALUES)
+    pipe.translate(compress="DEFLATE").run(dst)
+
+    ds = gdal.Open(dst)
+    expected = (ARRAY + 1) * 10
+    assert np.array_equal(ds.ReadAsArray(), expected)
+    assert ds.GetMetadata("IMAGE_STRUCTURE")["COMPRESSION"] == "DEFLATE"
+    assert sorted(os.listdir(tmp_path)) == ["final.tif", "source.tif"]
+    temps = gdal.ReadDir("/vsimem") or []
+    assert not [t for t in temps if t.startswith("pipeline_")]
+
+
+def test_mapped_intermediate(tmp_path, monkeypatch):
+    """Test that a mapping before the last step goes to a temporary file on
+    disk that is removed afterwards."""
+    src = os.path.join(tmp_path, "source.tif")
+    dst = os.path.join(tmp_path, "final.tif")
+    temp = os.path.join(tmp_path, "temp")
+    os.makedirs(temp)
+    monkeypatch.setattr(tempfile, "tempdir", temp)
+    crs = osr.SpatialReference()
+    crs.ImportFromEPSG(4326)
+    to_raster(ARRAY, src, crs.ExportToWkt(), (0, 1, 0, 30, 0, -1),
+              dtype="int16")
+
+    Pipeline(src).map_values(VALUES).translate(compress="DEFLATE").run(dst)
+
+    assert np.array_equal(gdal.Open(dst).ReadAsArray(), (ARRAY + 1) * 10)
+    assert os.listdir(temp) == []
+    temps = gdal.ReadDir("/vsimem") or []
+    assert not [t for t in temps if t.startswith("pipeline_")]
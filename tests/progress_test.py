@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for progress reporting.
+"""
+import io
+from multiprocessing import Pool
+from gdalmethods import Pool_Progress, Progress, gdal_progress
+
+
+# Helpers
+def double(x):
+    """Report progress in a few steps and double a number."""
+    for i in range(4):
+        gdal_progress((i + 1) / 4)
+    return 2 * x
+
+
+def sized(x):
+    """Report a task's own size and finish it."""
+    Progress.size(100 * x, 200 * x)
+    gdal_progress(1)
+    return x
+
+
+# Tests
+def test_printouts():
+    """Test that marks are written once each, however often GDAL calls."""
+    file = io.StringIO()
+    progress = Progress(file)
+    for i in range(1001):
+        progress(i / 1000, "", None)
+    assert file.getvalue() == ("...10...20...30...40...50...60...70...80..."
+                               "90...100 - done.\n")
+
+
+def test_pool():
+    """Test that pool results come back in order with every task complete."""
+    progress = Pool_Progress(6, pixels=600, interval=0.01)
+    with Pool(2, *progress.initializer()) as pool:
+        results = list(progress.imap(pool, double, range(6)))
+    assert results == [0, 2, 4, 6, 8, 10]
+    assert sum(progress.fractions) == 6
+
+
+def test_task_sizes():
+    """Test that tasks report their own sizes when totals aren't given."""
+    progress = Pool_Progress(4, interval=0.01)
+    with Pool(2, *progress.initializer()) as pool:
+        results = list(progress.imap(pool, sized, range(4)))
+    assert results == [0, 1, 2, 3]
+    assert list(progress.sizes[0::2]) == [0, 100, 200, 300]
+    assert list(progress.sizes[1::2]) == [0, 200, 400, 600]
+    assert not Progress.size(1, 1)
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for reading and writing rasters.
+"""
+import numpy as np
+from osgeo import gdal
+from gdalmethods import (Raster_Writer, read_blocks, read_raster, to_raster,
+                         translate)
+
+
+# Constants
+SRC = "/vsimem/raster_io_test.tif"
+DST = "/vsimem/raster_io_test_out.tif"
+ARRAY = np.arange(60 * 40, dtype=np.uint8).reshape(60, 40)
+ARRAY[0, :5] = 255
+
+# Create a small raster in memory
+DS = gdal.GetDriverByName("GTiff").Create(SRC, 40, 60, 1, gdal.GDT_Byte)
+DS.SetGeoTransform((0, 1, 0, 60, 0, -1))
+DS.GetRasterBand(1).SetNoDataValue(255)
+DS.GetRasterBand(1).WriteArray(ARRAY)
+DS = None
+
+
+# Tests
+def test_masked():
+    """Test that masked reads keep the data type and mask non-values."""
+    array, _, _ = read_raster(SRC, masked=True)
+    assert array.dtype == np.uint8
+    assert array.mask.sum() == (ARRAY == 255).sum()
+
+
+def test_blocks():
+    """Test that reading in windows returns the whole raster."""
+    array = np.zeros_like(ARRAY)
+    for (xoff, yoff, xsize, ysize), block in read_blocks(SRC, window=(16, 16),
+                                                         masked=False):
+        array[yoff: yoff + ysize, xoff: xoff + xsize] = block
+    assert np.array_equal(array, ARRAY)
+
+
+def test_multiband_options():
+    """Test that 3D arrays become bands and creation options are used."""
+    array = np.stack([ARRAY, ARRAY[::-1]]).astype(np.int16)
+    to_raster(array, DST, geometry=(0, 1, 0, 60, 0, -1), dtype="int16",
+              compress="DEFLATE", tiled=True, blockxsize=16, blockysize=16,
+              predictor=2)
+    ds = gdal.Open(DST)
+    assert ds.RasterCount == 2
+    assert ds.GetRasterBand(1).GetBlockSize() == [16, 16]
+    assert ds.GetMetadata("IMAGE_STRUCTURE")["COMPRESSION"] == "DEFLATE"
+    assert np.array_equal(ds.ReadAsArray(), array)
+
+
+def test_writer():
+    """Test that windows written one at a time add up to the array."""
+    with Raster_Writer(DST, 40, 60, dtype="byte") as writer:
+        for (xoff, yoff, _, _), block in read_blocks(SRC, window=(16, 16),
+                                                     masked=False):
+            writer.write(block, xoff, yoff)
+    assert np.array_equal(gdal.Open(DST).ReadAsArray(), ARRAY)
+
+
+def test_cog():
+    """Test that cloud-optimized output has tiles and overviews."""
+    to_raster(ARRAY, DST, geometry=(0, 1, 0, 60, 0, -1), dtype="byte",
+              navalue=255, cog=True, resampling="nearest", blocksize=16)
+    ds = gdal.Open(DST)
+    band = ds.GetRasterBand(1)
+    assert ds.GetMetadata("IMAGE_STRUCTURE")["LAYOUT"] == "COG"
+    assert band.GetBlockSize() == [16, 16]
+    assert band.GetOverviewCount() > 0
+    assert np.array_equal(ds.ReadAsArray(), ARRAY)
+
+
+def test_cog_creation_options():
+    """Test that a caller's creation options go over the COG defaults."""
+    dst = "/vsimem/raster_io_test_cog.tif"
+    translate(SRC, dst, cog=True,
+              creationOptions=["BLOCKSIZE=16", "overviews=NONE"])
+    ds = gdal.Open(dst)
+    band = ds.GetRasterBand(1)
+    assert ds.GetMetadata("IMAGE_STRUCTURE")["LAYOUT"] == "COG"
+    assert ds.GetMetadata("IMAGE_STRUCTURE")["COMPRESSION"] == "DEFLATE"
+    assert band.GetBlockSize() == [16, 16]
+    assert band.GetOverviewCount() == 0
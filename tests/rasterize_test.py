@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for rasterize.
+"""
+import os
+import numpy as np
+from osgeo import gdal, ogr, osr
+from gdalmethods import rasterize, rasterize_array
+
+
+# Constants
+TRANSFORM = (0, 1, 0, 40, 0, -1)
+NX = 50
+NY = 40
+
+
+# Helpers
+def make_squares(path):
+    """Write a GeoPackage of a few squares with a value field."""
+    srs = osr.SpatialReference()
+    srs.ImportFromEPSG(4326)
+    ds = ogr.GetDriverByName("GPKG").CreateDataSource(path)
+    layer = ds.CreateLayer("squares", srs, ogr.wkbPolygon)
+    layer.CreateField(ogr.FieldDefn("value", ogr.OFTReal))
+    layer.CreateField(ogr.FieldDefn("double", ogr.OFTReal))
+    for i, (x, y) in enumerate([(2, 2), (20, 15), (35, 30)]):
+        wkt = "POLYGON (({0} {1}, {2} {1}, {2} {3}, {0} {3}, {0} {1}))"
+        feature = ogr.Feature(layer.GetLayerDefn())
+        feature.SetField("value", i + 1)
+        feature.SetField("double", 2 * (i + 1))
+        feature.SetGeometry(ogr.CreateGeometryFromWkt(
+            wkt.format(x, y, x + 10, y + 8)
+        ))
+        layer.CreateFeature(feature)
+    ds = None
+
+
+# Tests
+def test_tiled(tmp_path):
+    """Test that tiled, parallel, and VRT outputs match a single pass."""
+    src = os.path.join(tmp_path, "squares.gpkg")
+    make_squares(src)
+
+    outputs = {}
+    for name, kwargs in [("single.tif", {}),
+                         ("tiled.tif", {"tile_size": 16, "ncpu": 2}),
+                         ("mosaic.vrt", {"tile_size": 16, "ncpu": 2})]:
+        dst = os.path.join(tmp_path, name)
+        rasterize(src, dst, "value", t_srs=4326, transform=TRANSFORM,
+                  height=NY, width=NX, **kwargs)
+        outputs[name] = gdal.Open(dst).ReadAsArray()
+
+    assert (outputs["single.tif"] == 3).any()
+    assert np.array_equal(outputs["single.tif"], outputs["tiled.tif"])
+    assert np.array_equal(outputs["single.tif"], outputs["mosaic.vrt"])
+
+
+def test_array(tmp_path):
+    """Test that in memory, multi-attribute rasterization matches rasterize."""
+    src = os.path.join(tmp_path, "squares.gpkg")
+    dst = os.path.join(tmp_path, "single.tif")
+    make_squares(src)
+    rasterize(src, dst, "value", t_srs=4326, transform=TRANSFORM, height=NY,
+              width=NX)
+    expected = gdal.Open(dst).ReadAsArray()
+
+    array, transform, _ = rasterize_array(src, ["value", "double"],
+                                          t_srs=4326, transform=TRANSFORM,
+                                          height=NY, width=NX)
+    assert array.shape == (2, NY, NX)
+    assert transform == TRANSFORM
+    assert np.array_equal(array[0], expected)
+    assert np.array_equal(array[1][expected > 0], 2 * expected[expected > 0])
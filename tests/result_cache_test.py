@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the on-disk result cache.
+"""
+import os
+import shutil
+import time
+import numpy as np
+from osgeo import gdal, ogr, osr
+from gdalmethods import Result_Cache, rasterize, to_raster, translate
+
+
+# Helpers
+def make_shapefile(path, value):
+    """Write a shapefile with one square holding a value."""
+    srs = osr.SpatialReference()
+    srs.ImportFromEPSG(4326)
+    ds = ogr.GetDriverByName("ESRI Shapefile").CreateDataSource(path)
+    layer = ds.CreateLayer("square", srs, ogr.wkbPolygon)
+    layer.CreateField(ogr.FieldDefn("value", ogr.OFTInteger))
+    feature = ogr.Feature(layer.GetLayerDefn())
+    feature.SetField("value", value)
+    feature.SetGeometry(ogr.CreateGeometryFromWkt(
+        "POLYGON ((2 2, 8 2, 8 8, 2 8, 2 2))"
+    ))
+    layer.CreateFeature(feature)
+    ds = None
+
+
+# Tests
+def test_translate(tmp_path):
+    """Test that unchanged work is served from the cache."""
+    src = os.path.join(tmp_path, "source.tif")
+    to_raster(np.ones((10, 10)), src, geometry=(0, 1, 0, 10, 0, -1))
+    cache = Result_Cache(os.path.join(tmp_path, "cache"))
+
+    first = os.path.join(tmp_path, "first.tif")
+    second = os.path.join(tmp_path, "second.tif")
+    translate(src, first, compress="LZW", cache=cache)
+    translate(src, second, compress="LZW", cache=cache)
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert np.array_equal(gdal.Open(second).ReadAsArray(), np.ones((10, 10)))
+
+    # Different options are different results
+    translate(src, os.path.join(tmp_path, "third.tif"), compress="DEFLATE",
+              cache=cache)
+    assert cache.misses == 2
+
+
+def test_eviction(tmp_path):
+    """Test that the least recently used results go first."""
+    cache = Result_Cache(os.path.join(tmp_path, "cache"), max_size=25,
+                         link=False)
+    keys = []
+    for i in range(3):
+        path = os.path.join(tmp_path, "{}.tif".format(i))
+        with open(path, "wb") as file:
+            file.write(b"0" * 10)
+        keys.append(cache.key("test", [path], {}))
+        cache.put(keys[-1], path)
+        time.sleep(0.01)
+
+    assert cache.size() == 20
+    assert not cache.get(keys[0], os.path.join(tmp_path, "out.tif"))
+    assert cache.get(keys[2], os.path.join(tmp_path, "out.tif"))
+
+
+def test_linked_hits(tmp_path):
+    """Test that hits don't touch linked outputs and still count as uses."""
+    cache = Result_Cache(os.path.join(tmp_path, "cache"), max_size=25,
+                         link=True)
+    keys = []
+    for i in range(2):
+        path = os.path.join(tmp_path, "{}.tif".format(i))
+        with open(path, "wb") as file:
+            file.write(b"0" * 10)
+        keys.append(cache.key("test", [path], {}))
+        cache.put(keys[-1], path)
+        time.sleep(0.01)
+
+    # Using the first result keeps it over the second
+    out = os.path.join(tmp_path, "out.tif")
+    mtime = os.stat(os.path.join(tmp_path, "0.tif")).st_mtime_ns
+    assert cache.get(keys[0], out)
+    assert os.stat(out).st_mtime_ns == mtime
+    time.sleep(0.01)
+
+    path = os.path.join(tmp_path, "2.tif")
+    with open(path, "wb") as file:
+        file.write(b"0" * 10)
+    cache.put(cache.key("test", [path], {}), path)
+    assert cache.get(keys[0], out)
+    assert not cache.get(keys[1], out)
+
+
+def test_sidecar_files(tmp_path):
+    """Test that editing only a shapefile's .dbf misses the cache."""
+    src = os.path.join(tmp_path, "square.shp")
+    other = os.path.join(tmp_path, "other", "square.shp")
+    os.makedirs(os.path.dirname(other))
+    make_shapefile(src, 1)
+    make_shapefile(other, 2)
+    cache = Result_Cache(os.path.join(tmp_path, "cache"))
+    kwargs = {"t_srs": 4326, "transform": (0, 1, 0, 10, 0, -1), "height": 10,
+              "width": 10, "overwrite": True, "cache": cache}
+
+    dst = os.path.join(tmp_path, "burned.tif")
+    rasterize(src, dst, "value", **kwargs)
+    rasterize(src, dst, "value", **kwargs)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # Swap in a .dbf with another value, leaving the .shp alone
+    shp_mtime = os.stat(src).st_mtime_ns
+    time.sleep(0.01)
+    shutil.copyfile(other.replace(".shp", ".dbf"), src.replace(".shp", ".dbf"))
+    assert os.stat(src).st_mtime_ns == shp_mtime
+
+    rasterize(src, dst, "value", **kwargs)
+    assert cache.misses == 2
+    assert gdal.Open(dst).ReadAsArray().max() == 2
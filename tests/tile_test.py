@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the tiling grid.
+"""
+import os
+import numpy as np
+import pytest
+from osgeo import gdal
+from gdalmethods import tile_grid, tile_raster
+
+
+# Constants
+SRC = "/vsimem/tile_test.tif"
+NX = 100
+NY = 50
+
+# Create a small raster in memory
+DS = gdal.GetDriverByName("GTiff").Create(SRC, NX, NY, 1, gdal.GDT_Byte,
+                                          options=["TILED=YES",
+                                                   "BLOCKXSIZE=16",
+                                                   "BLOCKYSIZE=16"])
+DS.SetGeoTransform((0, 10, 0, 500, 0, -10))
+DS.GetRasterBand(1).WriteArray(np.arange(NX * NY).reshape(NY, NX) % 251)
+DS = None
+
+
+# Tests
+def test_cover():
+    """Test that tile cores cover the raster exactly once."""
+    tiles = tile_grid(SRC, ntiles=4)
+    assert len(tiles) == 4
+    assert sum(t["core"][2] * t["core"][3] for t in tiles) == NX * NY
+
+
+def test_extent():
+    """Test that extents follow the outer edges of the grid cells."""
+    tiles = tile_grid(SRC, ntiles=1)
+    assert tiles[0]["extent"] == [0, 0, 1000, 500]
+
+
+def test_blocks_and_halo():
+    """Test block multiple tiles and halos trimmed at the raster edges."""
+    tiles = tile_grid(SRC, block_multiple=2, halo=3)
+    assert tiles[0]["core"] == (0, 0, 32, 32)
+    assert tiles[0]["window"] == (0, 0, 35, 35)
+    assert tiles[5]["window"] == (29, 29, 38, 21)
+
+
+def test_mosaic(tmp_path):
+    """Test that a VRT over overlapping tiles reads as the source raster."""
+    src = os.path.join(tmp_path, "source.tif")
+    vrt = os.path.join(tmp_path, "mosaic.vrt")
+    gdal.Translate(src, SRC)
+    tiles = tile_raster(src, os.path.join(tmp_path, "tiles"), 4, 2, halo=2,
+                        vrt=vrt)
+    assert len(tiles) == 4
+    assert np.array_equal(gdal.Open(vrt).ReadAsArray(),
+                          gdal.Open(src).ReadAsArray())
+
+
+def test_failed_tile(tmp_path):
+    """Test that a failed tile is named and the others are still written."""
+    src = os.path.join(tmp_path, "source.tif")
+    out_folder = os.path.join(tmp_path, "tiles")
+    gdal.Translate(src, SRC)
+
+    # A dangling link into a missing folder can't be written through
+    os.makedirs(out_folder)
+    bad = os.path.join(out_folder, "source_01.tif")
+    os.symlink(os.path.join(tmp_path, "missing", "source_01.tif"), bad)
+
+    with pytest.raises(RuntimeError, match="source_01.tif"):
+        tile_raster(src, out_folder, 4, 2)
+    for i in [0, 2, 3]:
+        tile = os.path.join(out_folder, "source_{:02d}.tif".format(i))
+        assert gdal.Open(tile).RasterCount == 1
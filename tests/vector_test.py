@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for vector reprojection.
+"""
+import os
+import numpy as np
+import pandas as pd
+from osgeo import ogr, osr
+from gdalmethods import csv_to_geo, reproject_vector, to_geo
+
+
+# Constants
+ALBERS = ("+proj=aea +lat_1=20 +lat_2=60 +lat_0=40 +lon_0=-96 +x_0=0 "
+          "+y_0=0 +ellps=GRS80 +towgs84=0,0,0,0,0,0,0 +units=m +no_defs ")
+NPOINTS = 25
+POLYGONS = [
+    "MULTIPOLYGON (((-97 39, -95 39, -95 41, -97 41, -97 39), "
+    "(-96.5 39.5, -96.5 40.5, -95.5 40.5, -95.5 39.5, -96.5 39.5)), "
+    "((-94 39, -93 39, -93 40, -94 39)))",
+    "MULTIPOLYGON (((-90 35, -89 35, -89 36, -90 35)))"
+]
+
+
+# Helpers
+def make_points(path):
+    """Write a small GeoPackage of WGS84 points with one field."""
+    srs = osr.SpatialReference()
+    srs.ImportFromEPSG(4326)
+    ds = ogr.GetDriverByName("GPKG").CreateDataSource(path)
+    layer = ds.CreateLayer("points", srs, ogr.wkbPoint)
+    layer.CreateField(ogr.FieldDefn("id", ogr.OFTInteger))
+    for i in range(NPOINTS):
+        feature = ogr.Feature(layer.GetLayerDefn())
+        feature.SetField("id", i)
+        feature.SetGeometry(ogr.CreateGeometryFromWkt(
+            "POINT ({} {})".format(-96 + i * 0.1, 40)
+        ))
+        layer.CreateFeature(feature)
+    ds = None
+
+
+def make_polygons(path):
+    """Write a GeoPackage of multipolygons, one with a hole."""
+    srs = osr.SpatialReference()
+    srs.ImportFromEPSG(4326)
+    ds = ogr.GetDriverByName("GPKG").CreateDataSource(path)
+    layer = ds.CreateLayer("shapes", srs, ogr.wkbMultiPolygon)
+    layer.CreateField(ogr.FieldDefn("id", ogr.OFTInteger))
+    for i, wkt in enumerate(POLYGONS):
+        feature = ogr.Feature(layer.GetLayerDefn())
+        feature.SetField("id", i)
+        feature.SetGeometry(ogr.CreateGeometryFromWkt(wkt))
+        layer.CreateFeature(feature)
+    ds = None
+
+
+# Tests
+def test_reproject_points(tmp_path):
+    """Test that points are reprojected with their fields to a new format."""
+    src = os.path.join(tmp_path, "points.gpkg")
+    dst = os.path.join(tmp_path, "points_albers.fgb")
+    make_points(src)
+    assert reproject_vector(src, dst, ALBERS, batch_size=10) == NPOINTS
+
+    layer = ogr.Open(dst).GetLayer()
+    feature = layer.GetNextFeature()
+    assert feature.GetField("id") == 0
+    x, y, _ = feature.GetGeometryRef().GetPoint()
+    assert abs(x) < 1e-6 and abs(y) < 1e-6
+
+
+def test_reproject_shapes(tmp_path):
+    """Test that batched vertices match transforming each geometry."""
+    src = os.path.join(tmp_path, "shapes.gpkg")
+    dst = os.path.join(tmp_path, "shapes_albers.gpkg")
+    make_polygons(src)
+    assert reproject_vector(src, dst, ALBERS, batch_size=10) == 2
+
+    src_srs = osr.SpatialReference()
+    src_srs.ImportFromEPSG(4326)
+    trgt_srs = osr.SpatialReference()
+    trgt_srs.ImportFromProj4(ALBERS)
+    if hasattr(osr, "OAMS_TRADITIONAL_GIS_ORDER"):
+        src_srs.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+        trgt_srs.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+    transform = osr.CoordinateTransformation(src_srs, trgt_srs)
+
+    layer = ogr.Open(dst).GetLayer()
+    for feature, wkt in zip(layer, POLYGONS):
+        expected = ogr.CreateGeometryFromWkt(wkt)
+        expected.Transform(transform)
+        geom = feature.GetGeometryRef()
+        assert geom.GetGeometryCount() == expected.GetGeometryCount()
+        assert np.allclose(geom.GetEnvelope(), expected.GetEnvelope())
+        assert np.isclose(geom.GetArea(), expected.GetArea())
+
+
+def test_reproject_parallel(tmp_path):
+    """Test that parallel parts merge back into one complete layer."""
+    src = os.path.join(tmp_path, "points.gpkg")
+    dst = os.path.join(tmp_path, "points_albers.gpkg")
+    make_points(src)
+    assert reproject_vector(src, dst, ALBERS, ncpu=2) == NPOINTS
+
+    layer = ogr.Open(dst).GetLayer()
+    assert layer.GetFeatureCount() == NPOINTS
+    assert sorted(f.GetField("id") for f in layer) == list(range(NPOINTS))
+    assert not os.path.exists(os.path.join(tmp_path, "points_albers_parts"))
+
+
+def test_reproject_parallel_fid_gaps(tmp_path):
+    """Test that feature id ranges cover every feature once despite gaps."""
+    src = os.path.join(tmp_path, "points.gpkg")
+    dst = os.path.join(tmp_path, "points_albers.gpkg")
+    make_points(src)
+    ds = ogr.Open(src, 1)
+    layer = ds.GetLayer()
+    for fid in [2, 3, 4, 10]:
+        layer.DeleteFeature(fid)
+    ds = None
+    assert reproject_vector(src, dst, ALBERS, ncpu=3) == NPOINTS - 4
+
+    layer = ogr.Open(dst).GetLayer()
+    ids = sorted(f.GetField("id") for f in layer)
+    assert ids == [i for i in range(NPOINTS) if i + 1 not in [2, 3, 4, 10]]
+
+
+def test_reproject_parallel_no_append(tmp_path):
+    """Test that parts merge into a driver that can't append to a file."""
+    src = os.path.join(tmp_path, "points.gpkg")
+    dst = os.path.join(tmp_path, "points_albers.fgb")
+    make_points(src)
+    assert reproject_vector(src, dst, ALBERS, batch_size=4, ncpu=3) == NPOINTS
+
+    layer = ogr.Open(dst).GetLayer()
+    assert sorted(f.GetField("id") for f in layer) == list(range(NPOINTS))
+    assert not os.path.exists(os.path.join(tmp_path, "points_albers_parts"))
+
+
+def test_to_geo():
+    """Test that points are built without changing the caller's data."""
+    df = pd.DataFrame({"lon": [-96, -95], "lat": [40, 41]})
+    gdf = to_geo(df)
+    assert "geometry" not in df
+    assert gdf.geometry.x.tolist() == [-96, -95]
+
+
+def test_csv_to_geo(tmp_path):
+    """Test that chunks of a CSV add up to one GeoPackage layer."""
+    src = os.path.join(tmp_path, "points.csv")
+    dst = os.path.join(tmp_path, "points.gpkg")
+    pd.DataFrame({"lon": range(-100, -90), "lat": 40}).to_csv(src,
+                                                              index=False)
+    assert csv_to_geo(src, dst, chunksize=3) == 10
+    assert ogr.Open(dst).GetLayer().GetFeatureCount() == 10
+    assert csv_to_geo(src, dst, chunksize=3) == 0
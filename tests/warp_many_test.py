@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for warping many rasters to one template.
+"""
+import os
+import numpy as np
+from osgeo import gdal, osr
+from gdalmethods import to_raster, warp_many
+
+
+# Constants
+ARRAY = np.arange(20 * 30, dtype=np.float32).reshape(20, 30)
+
+
+# Tests
+def test_warp_many(tmp_path):
+    """Test that every file lands on the template grid with a status."""
+    crs = osr.SpatialReference()
+    crs.ImportFromEPSG(4326)
+    crs = crs.ExportToWkt()
+    template = os.path.join(tmp_path, "template.tif")
+    to_raster(np.zeros((10, 15)), template, crs, (0, 2, 0, 20, 0, -2))
+    srcs = []
+    for i in range(3):
+        src = os.path.join(tmp_path, "month_{}.tif".format(i))
+        to_raster(ARRAY + i, src, crs, (0, 1, 0, 20, 0, -1))
+        srcs.append(src)
+    srcs.append(os.path.join(tmp_path, "missing.tif"))
+
+    status = warp_many(srcs, os.path.join(tmp_path, "warped"), template,
+                       ncpu=2)
+    assert list(status["status"]) == ["warped"] * 3 + ["failed"]
+    for dst in status["dst"][:3]:
+        ds = gdal.Open(dst)
+        assert (ds.RasterXSize, ds.RasterYSize) == (15, 10)
+        assert ds.GetGeoTransform() == (0, 2, 0, 20, 0, -2)
+
+    again = warp_many(srcs[:3], os.path.join(tmp_path, "warped"), template)
+    assert list(again["status"]) == ["skipped"] * 3
+
+
+def test_user_threads(tmp_path):
+    """Test that a caller's NUM_THREADS warp option still warps each file
+    onto the template, north-up, with a timing."""
+    crs = osr.SpatialReference()
+    crs.ImportFromEPSG(4326)
+    crs = crs.ExportToWkt()
+    template = os.path.join(tmp_path, "template.tif")
+    src = os.path.join(tmp_path, "month.tif")
+    to_raster(np.zeros((10, 15)), template, crs, (0, 2, 0, 20, 0, -2))
+    to_raster(ARRAY, src, crs, (0, 1, 0, 20, 0, -1))
+
+    status = warp_many([src], os.path.join(tmp_path, "warped"), template,
+                       threads=4, warpOptions=["NUM_THREADS=2"])
+    assert list(status["status"]) == ["warped"]
+    assert status["seconds"].iloc[0] >= 0
+    ds = gdal.Open(status["dst"].iloc[0])
+    assert (ds.RasterXSize, ds.RasterYSize) == (15, 10)
+    assert ds.GetGeoTransform() == (0, 2, 0, 20, 0, -2)
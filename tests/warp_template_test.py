@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for warping onto a template's grid.
+"""
+import os
+import numpy as np
+import pytest
+from osgeo import gdal, osr
+from gdalmethods import to_raster, warp
+from gdalmethods.gdalmethods import _thread_options
+
+
+# Constants
+ARRAY = np.arange(100 * 80, dtype=np.float32).reshape(100, 80)
+NORTH_UP = (0.5, 0.25, 0, 40.75, 0, -0.5)
+SOUTH_UP = (0.5, 0.25, 0, 30.75, 0, 0.5)
+NX = 30
+NY = 20
+
+
+# Helpers
+def make_rasters(tmp_path, geometry):
+    """Write a source raster and a template raster with the given grid."""
+    crs = osr.SpatialReference()
+    crs.ImportFromEPSG(4326)
+    crs = crs.ExportToWkt()
+    src = os.path.join(tmp_path, "source.tif")
+    template = os.path.join(tmp_path, "template.tif")
+    to_raster(ARRAY, src, crs, (0, 0.25, 0, 45, 0, -0.25))
+    to_raster(np.zeros((NY, NX)), template, crs, geometry)
+    return src, template
+
+
+# Tests
+@pytest.mark.parametrize("geometry", [NORTH_UP, SOUTH_UP])
+def test_template_grid(tmp_path, geometry):
+    """Test that the output covers the template's cells exactly, north-up."""
+    src, template = make_rasters(tmp_path, geometry)
+    dst = os.path.join(tmp_path, "warped.tif")
+    warp(src, dst, template=template)
+
+    ds = gdal.Open(dst)
+    assert (ds.RasterXSize, ds.RasterYSize) == (NX, NY)
+    assert ds.GetGeoTransform() == NORTH_UP
+
+
+def test_user_threads(tmp_path):
+    """Test that a caller's NUM_THREADS warp option still lands on the
+    template's grid."""
+    src, template = make_rasters(tmp_path, NORTH_UP)
+    dst = os.path.join(tmp_path, "warped.tif")
+    warp(src, dst, template=template, ncpu=4, warpOptions=["NUM_THREADS=2"])
+
+    ds = gdal.Open(dst)
+    assert (ds.RasterXSize, ds.RasterYSize) == (NX, NY)
+    assert ds.GetGeoTransform() == NORTH_UP
+
+
+def test_thread_options():
+    """Test that NUM_THREADS is only added when the caller didn't set it."""
+    assert _thread_options(None, 4) == ["NUM_THREADS=4"]
+    assert _thread_options(["INIT_DEST=0"], 4) == ["INIT_DEST=0",
+                                                   "NUM_THREADS=4"]
+    assert _thread_options(["num_threads=2"], 4) == ["num_threads=2"]
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for zonal statistics.
+"""
+import os
+import numpy as np
+import pytest
+from osgeo import ogr, osr
+from gdalmethods import to_raster, zonal_stats
+
+
+# Constants
+TRANSFORM = (0, 1, 0, 40, 0, -1)
+WKT = "POLYGON ((0 0, 20 0, 20 40, 0 40, 0 0))"
+ARRAY = np.arange(40 * 50, dtype=np.float32).reshape(40, 50)
+ARRAY[0, 0] = -9999
+
+
+# Helpers
+def make_zone(path):
+    """Write a GeoPackage with one zone covering the left 20 columns."""
+    srs = osr.SpatialReference()
+    srs.ImportFromEPSG(4326)
+    ds = ogr.GetDriverByName("GPKG").CreateDataSource(path)
+    layer = ds.CreateLayer("zones", srs, ogr.wkbPolygon)
+    layer.CreateField(ogr.FieldDefn("name", ogr.OFTString))
+    feature = ogr.Feature(layer.GetLayerDefn())
+    feature.SetField("name", "left")
+    feature.SetGeometry(ogr.CreateGeometryFromWkt(WKT))
+    layer.CreateFeature(feature)
+    ds = None
+
+
+# Tests
+def test_zonal_stats(tmp_path):
+    """Test that block-wise statistics match numpy's and skip non-values."""
+    zones = os.path.join(tmp_path, "zones.gpkg")
+    rasters = [os.path.join(tmp_path, "values_{}.tif".format(i))
+               for i in range(2)]
+    make_zone(zones)
+    crs = osr.SpatialReference()
+    crs.ImportFromEPSG(4326)
+    for raster in rasters:
+        to_raster(ARRAY, raster, crs.ExportToWkt(), TRANSFORM, tiled=True,
+                  blockxsize=16, blockysize=16)
+
+    stats = zonal_stats(zones, rasters, "name", ncpu=2)
+    values = ARRAY[:, :20].ravel()[1:]
+    for raster in rasters:
+        row = stats.loc[(raster, "left")]
+        assert row["count"] == values.size
+        assert np.isclose(row["mean"], values.mean())
+        assert np.isclose(row["std"], values.std())
+        assert row["min"] == values.min()
+        assert row["max"] == values.max()
+
+
+def test_misaligned(tmp_path):
+    """Test that a raster with the same shape on a shifted grid is refused."""
+    zones = os.path.join(tmp_path, "zones.gpkg")
+    rasters = [os.path.join(tmp_path, "values.tif"),
+               os.path.join(tmp_path, "shifted.tif")]
+    make_zone(zones)
+    crs = osr.SpatialReference()
+    crs.ImportFromEPSG(4326)
+    to_raster(ARRAY, rasters[0], crs.ExportToWkt(), TRANSFORM)
+    to_raster(ARRAY, rasters[1], crs.ExportToWkt(), (5, 1, 0, 40, 0, -1))
+
+    with pytest.raises(ValueError, match="shifted.tif"):
+        zonal_stats(zones, rasters, "name")